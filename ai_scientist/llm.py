@@ -2,6 +2,7 @@ import json
 import os
 import re
 from typing import Any
+from ai_scientist.utils import llm_cache, llm_clients, rate_limiter
 from ai_scientist.utils.token_tracker import track_token_usage
 
 import anthropic
@@ -216,18 +217,37 @@ def make_llm_call(client, model, temperature, system_message, prompt):
         anthropic.RateLimitError,
     ),
 )
-def get_response_from_llm(
+def _query_llm(
     prompt,
     client,
     model,
     system_message,
-    print_debug=False,
-    msg_history=None,
-    temperature=0.7,
+    msg_history,
+    temperature,
+) -> tuple[str, list[dict[str, Any]]]:
+    # wait for the shared rate limits before every attempt (see utils/rate_limiter.py)
+    prompt_tokens = rate_limiter.estimate_tokens((system_message, msg_history, prompt))
+    return rate_limiter.limited_call(
+        model,
+        lambda: _send_llm_request(
+            prompt, client, model, system_message, msg_history, temperature
+        ),
+        prompt=(system_message, msg_history, prompt),
+        max_tokens=MAX_NUM_TOKENS,
+        count_tokens=lambda result: prompt_tokens
+        + rate_limiter.estimate_tokens(result[0]),
+    )
+
+
+def _send_llm_request(
+    prompt,
+    client,
+    model,
+    system_message,
+    msg_history,
+    temperature,
 ) -> tuple[str, list[dict[str, Any]]]:
     msg = prompt
-    if msg_history is None:
-        msg_history = []
 
     if "claude" in model:
         new_msg_history = msg_history + [
@@ -374,6 +394,36 @@ def get_response_from_llm(
     else:
         raise ValueError(f"Model {model} not supported.")
 
+    return content, new_msg_history
+
+
+def get_response_from_llm(
+    prompt,
+    client,
+    model,
+    system_message,
+    print_debug=False,
+    msg_history=None,
+    temperature=0.7,
+) -> tuple[str, list[dict[str, Any]]]:
+    if msg_history is None:
+        msg_history = []
+
+    # served from the response cache when it is enabled (see utils/llm_cache.py)
+    content, new_msg_history = llm_cache.cached_call(
+        "llm.get_response_from_llm",
+        {
+            "model": model,
+            "system_message": system_message,
+            "messages": msg_history + [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": MAX_NUM_TOKENS,
+        },
+        lambda: _query_llm(
+            prompt, client, model, system_message, msg_history, temperature
+        ),
+    )
+
     if print_debug:
         print()
         print("*" * 20 + " LLM START " + "*" * 20)
@@ -417,25 +467,26 @@ def extract_json_between_markers(llm_output: str) -> dict | None:
 def create_client(model) -> tuple[Any, str]:
     if model.startswith("claude-"):
         print(f"Using Anthropic API with model {model}.")
-        return anthropic.Anthropic(), model
+        return llm_clients.get_client("anthropic"), model
     elif model.startswith("bedrock") and "claude" in model:
         client_model = model.split("/")[-1]
         print(f"Using Amazon Bedrock with model {client_model}.")
-        return anthropic.AnthropicBedrock(), client_model
+        return llm_clients.get_client("bedrock"), client_model
     elif model.startswith("vertex_ai") and "claude" in model:
         client_model = model.split("/")[-1]
         print(f"Using Vertex AI with model {client_model}.")
-        return anthropic.AnthropicVertex(), client_model
+        return llm_clients.get_client("vertex"), client_model
     elif "gpt" in model:
         print(f"Using OpenAI API with model {model}.")
-        return openai.OpenAI(), model
+        return llm_clients.get_client("openai"), model
     elif "o1" in model or "o3" in model:
         print(f"Using OpenAI API with model {model}.")
-        return openai.OpenAI(), model
+        return llm_clients.get_client("openai"), model
     elif model == "deepseek-coder-v2-0724":
         print(f"Using OpenAI API with {model}.")
         return (
-            openai.OpenAI(
+            llm_clients.get_client(
+                "openai",
                 api_key=os.environ["DEEPSEEK_API_KEY"],
                 base_url="https://api.deepseek.com",
             ),
@@ -447,7 +498,8 @@ def create_client(model) -> tuple[Any, str]:
         if "HUGGINGFACE_API_KEY" not in os.environ:
             raise ValueError("HUGGINGFACE_API_KEY environment variable not set")
         return (
-            openai.OpenAI(
+            llm_clients.get_client(
+                "openai",
                 api_key=os.environ["HUGGINGFACE_API_KEY"],
                 base_url="https://api-inference.huggingface.co/models/agentica-org/DeepCoder-14B-Preview",
             ),
@@ -456,7 +508,8 @@ def create_client(model) -> tuple[Any, str]:
     elif model == "llama3.1-405b":
         print(f"Using OpenAI API with {model}.")
         return (
-            openai.OpenAI(
+            llm_clients.get_client(
+                "openai",
                 api_key=os.environ["OPENROUTER_API_KEY"],
                 base_url="https://openrouter.ai/api/v1",
             ),
@@ -465,7 +518,8 @@ def create_client(model) -> tuple[Any, str]:
     elif 'gemini' in model:
         print(f"Using OpenAI API with {model}.")
         return (
-            openai.OpenAI(
+            llm_clients.get_client(
+                "openai",
                 api_key=os.environ["GEMINI_API_KEY"],
                 base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
             ),
@@ -1,11 +1,12 @@
 from typing import List, Optional, Dict, Callable, Any, Tuple
 import pickle
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from enum import Enum, auto
 from pathlib import Path
 import logging
 from .parallel_agent import ParallelAgent
 from .journal import Journal, Node
+from .journal_log import JournalLog, load_journal_log
 import copy
 import re
 from .backend import query, FunctionSpec
@@ -13,6 +14,9 @@ import json
 from rich import print
 from .utils.serialize import parse_markdown_to_dict
 from .utils.metric import WorstMetricValue
+from ai_scientist.utils.token_tracker import set_stage
+from . import tracing
+from .tracing import traced
 
 
 logger = logging.getLogger(__name__)
@@ -121,7 +125,9 @@ class StageTransition:
 
 
 class AgentManager:
-    def __init__(self, task_desc: str, cfg: Any, workspace_dir: Path):
+    def __init__(
+        self, task_desc: str, cfg: Any, workspace_dir: Path, resume: bool = False
+    ):
         self.task_desc = json.loads(task_desc)
         for k in [
             "Title",
@@ -165,8 +171,20 @@ class AgentManager:
                 - Conduct systematic component analysis that reveals the contribution of each part
                 - Use the same datasets you used from the previous stage""",
         }
-        # Create initial stage
-        self._create_initial_stage()
+        self.journal_log: Optional[JournalLog] = None
+        if cfg.journal_log.enabled:
+            self.journal_log = JournalLog(
+                Path(cfg.log_dir) / "journal_log.jsonl", fsync=cfg.journal_log.fsync
+            )
+        # sub-stage to continue when resuming from the journal log
+        self._resume_substage: Optional[Stage] = None
+        if resume and self.journal_log and self.journal_log.path.exists():
+            self._restore_from_log()
+        else:
+            if resume:
+                logger.warning("No journal log to resume from, starting a new run")
+            # Create initial stage
+            self._create_initial_stage()
 
     def _get_max_iterations(self, stage_number: int) -> int:
         """Get max iterations for a stage from config or default"""
@@ -212,6 +230,67 @@ Your research idea:\n\n
         self.stages.append(initial_stage)
         self.current_stage = initial_stage
         self.journals[initial_stage.name] = Journal()
+        self._log_stage(initial_stage, main=True)
+        self._flush_log()
+
+    def _log_stage(
+        self,
+        stage: Stage,
+        main: bool,
+        transition: Optional[StageTransition] = None,
+    ) -> None:
+        if self.journal_log is None:
+            return
+        if transition is not None:
+            self.journal_log.record("transition", transition=asdict(transition))
+        self.journal_log.record("stage", stage=asdict(stage), main=main)
+
+    @traced("journal_log")
+    def _flush_log(self, full: bool = False) -> None:
+        """Append the nodes added or changed since the last flush to the journal log.
+        With `full`, every node is compared with its last record instead (which also
+        catches in-place updates of node attributes)."""
+        if self.journal_log is None:
+            return
+        try:
+            for stage_name, journal in self.journals.items():
+                changed = journal.nodes if full else journal.pop_changed()
+                self.journal_log.record_nodes(stage_name, changed)
+            self.journal_log.flush()
+        except Exception as e:
+            logger.error(f"Failed to write journal log: {e}")
+
+    def _restore_from_log(self) -> None:
+        """Rebuild stages, stage history and journals from the journal log."""
+        state = load_journal_log(self.journal_log.path)
+        if not state["stages"]:
+            logger.warning("Journal log has no stages, starting a new run")
+            self._create_initial_stage()
+            return
+        self.stages = [Stage(**record["stage"]) for record in state["stages"]]
+        self.stage_history = [StageTransition(**t) for t in state["transitions"]]
+        self.journals = {
+            stage.name: state["journals"].get(stage.name, Journal())
+            for stage in self.stages
+        }
+        for (stage_name, _), data in state["node_records"]:
+            self.journal_log.mark_written(stage_name, data)
+        for journal in self.journals.values():
+            journal.pop_changed()
+        self.current_stage_number = self.stages[0].stage_number
+        if state["finished"]:
+            self.current_stage = None
+        else:
+            self.current_stage = next(
+                Stage(**record["stage"])
+                for record in reversed(state["stages"])
+                if record["main"]
+            )
+            self._resume_substage = self.stages[-1]
+        logger.info(
+            f"Resumed from {self.journal_log.path}: {len(self.stages)} stages, "
+            f"{sum(len(j) for j in self.journals.values())} nodes"
+        )
 
     def _curate_task_desc(self, stage: Stage) -> str:
         task_desc = self._get_task_desc_str()
@@ -246,6 +325,7 @@ Your research idea:\n\n
 
         return task_desc
 
+    @traced("checkpoint")
     def _save_checkpoint(self):
         """Save the current state of the experiment"""
         if self.current_stage is None:
@@ -270,6 +350,7 @@ Your research idea:\n\n
         print("Saving checkpoint to ", save_path)
         with open(save_path, "wb") as f:
             pickle.dump(checkpoint, f)
+        self._flush_log(full=True)
 
     def _create_agent_for_stage(self, stage: Stage) -> ParallelAgent:
         """Create a ParallelAgent configured for the given stage"""
@@ -340,6 +421,7 @@ Your research idea:\n\n
         feedback += f"VLM Feedback Summary: {node.vlm_feedback_summary}\n"
         return feedback
 
+    @traced("substage_check")
     def _check_substage_completion(
         self, current_substage: Stage, journal: Journal
     ) -> bool:
@@ -407,6 +489,7 @@ Your research idea:\n\n
         print(f"[green]Stage {current_substage.name} not completed[/green]")
         return False
 
+    @traced("stage_check")
     def _check_stage_completion(self, stage: Stage) -> bool:
         """Check if current stage is complete based on criteria"""
         journal = self.journals[stage.name]
@@ -635,6 +718,7 @@ Your research idea:\n\n
             Continue progress on main stage objectives while addressing current issues.
             """
 
+    @traced("stage_planning")
     def _create_next_substage(
         self, current_substage: Stage, journal: Journal, substage_feedback: str
     ) -> Optional[Stage]:
@@ -661,6 +745,7 @@ Your research idea:\n\n
             stage_number=current_substage.stage_number + 1,
         )
 
+    @traced("stage_planning")
     def _create_next_main_stage(
         self, current_substage: Stage, journal: Journal
     ) -> Optional[Stage]:
@@ -694,15 +779,24 @@ Your research idea:\n\n
         while self.current_stage:  # Main stage loop
             main_stage = self.parse_stage_names(self.current_stage.name)[0]
             print(f"[green]Starting main stage: {main_stage}[/green]")
+            stage_span = tracing.start_span("stage", stage=main_stage)
             print(f"[cyan]Goals: {self.current_stage.goals}[/cyan]")
 
             current_substage = self.current_stage
+            resuming = self._resume_substage is not None
+            if resuming:
+                current_substage = self._resume_substage
+                self._resume_substage = None
             while current_substage:  # Sub-stage loop
                 print(f"[green]Starting sub-stage: {current_substage.name}[/green]")
+                set_stage(current_substage.name)
 
-                with self._create_agent_for_stage(current_substage) as agent:
+                with tracing.span(
+                    "substage", stage=current_substage.name
+                ), self._create_agent_for_stage(current_substage) as agent:
                     # Initialize with best result from previous sub-stage if available
-                    if self.stage_history:
+                    # (a resumed sub-stage already got it before the interruption)
+                    if self.stage_history and not resuming:
                         prev_stage = self.stage_history[-1].from_stage
                         print(f"[cyan]prev_stage: {prev_stage}[/cyan]")
                         print(f"[cyan]self.stage_history: {self.stage_history}[/cyan]")
@@ -716,10 +810,13 @@ Your research idea:\n\n
                             self.current_stage = None
                             current_substage = None
                             break
+                    resuming = False
+                    self._flush_log()
 
                     # Run until sub-stage completion
                     while True:
                         agent.step(exec_callback)
+                        self._flush_log()
                         if step_callback:
                             step_callback(
                                 current_substage, self.journals[current_substage.name]
@@ -734,6 +831,9 @@ Your research idea:\n\n
                             f"[cyan]Feedback from _check_stage_completion: {main_stage_feedback}[/cyan]"
                         )
                         if main_stage_complete:
+                            # nodes still running in steady-state mode
+                            agent.collect_in_flight()
+                            self._flush_log()
                             # After main stage completion, run multi-seed eval on the best node
                             if current_substage.stage_number in [1, 2, 3, 4]:
                                 best_node = self._get_best_implementation(
@@ -743,12 +843,14 @@ Your research idea:\n\n
                                     seed_nodes = agent._run_multi_seed_evaluation(
                                         best_node
                                     )
+                                    self._flush_log()
                                     if step_callback:
                                         step_callback(
                                             current_substage,
                                             self.journals[current_substage.name],
                                         )
                                     agent._run_plot_aggregation(best_node, seed_nodes)
+                                    self._flush_log()
                                     if step_callback:
                                         step_callback(
                                             current_substage,
@@ -777,6 +879,9 @@ Your research idea:\n\n
                         )
 
                         if substage_complete:
+                            # nodes still running in steady-state mode
+                            agent.collect_in_flight()
+                            self._flush_log()
                             # Create next sub-stage
                             next_substage = self._create_next_substage(
                                 current_substage,
@@ -797,6 +902,12 @@ Your research idea:\n\n
                                 # Setup new sub-stage
                                 self.stages.append(next_substage)
                                 self.journals[next_substage.name] = Journal()
+                                self._log_stage(
+                                    next_substage,
+                                    main=False,
+                                    transition=self.stage_history[-1],
+                                )
+                                self._flush_log()
                                 current_substage = next_substage
                             else:
                                 # If no next sub-stage could be created, end this main stage
@@ -822,11 +933,19 @@ Your research idea:\n\n
                     self.stages.append(next_main_stage)
                     self.journals[next_main_stage.name] = Journal()
                     self.current_stage = next_main_stage
+                    self._log_stage(
+                        next_main_stage, main=True, transition=self.stage_history[-1]
+                    )
+                    self._flush_log()
                 else:
                     # Exit the outer loop if no more main stages
                     logger.info(f"Completed stage: {self.current_stage.name}")
                     logger.info("No more stages to run -- exiting the loop...")
                     self.current_stage = None
+            if self.current_stage is None and self.journal_log is not None:
+                self.journal_log.record("finished")
+                self._flush_log()
+            stage_span.end()
 
     def _create_stage_analysis_prompt(
         self,
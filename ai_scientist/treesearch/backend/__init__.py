@@ -1,3 +1,7 @@
+from ai_scientist.utils import llm_cache
+from ai_scientist.utils.token_tracker import token_tracker
+
+from .. import tracing
 from . import backend_anthropic, backend_openai
 from .utils import FunctionSpec, OutputType, PromptType, compile_prompt_to_md
 
@@ -53,11 +57,32 @@ def query(
         model_kwargs["max_tokens"] = max_tokens
 
     query_func = backend_anthropic.query if "claude-" in model else backend_openai.query
-    output, req_time, in_tok_count, out_tok_count, info = query_func(
-        system_message=compile_prompt_to_md(system_message) if system_message else None,
-        user_message=compile_prompt_to_md(user_message) if user_message else None,
-        func_spec=func_spec,
-        **model_kwargs,
-    )
+    system_message = compile_prompt_to_md(system_message) if system_message else None
+    user_message = compile_prompt_to_md(user_message) if user_message else None
+
+    def send():
+        with tracing.span("llm", model=model):
+            output, req_time, in_tok_count, out_tok_count, info = query_func(
+                system_message=system_message,
+                user_message=user_message,
+                func_spec=func_spec,
+                **model_kwargs,
+            )
+        token_tracker.record_call(
+            info.get("model", model),
+            prompt_tokens=in_tok_count,
+            completion_tokens=out_tok_count,
+            latency=req_time,
+            system_message=system_message,
+            prompt=user_message,
+            response=output,
+        )
+        return output
 
-    return output
+    request = {
+        "system_message": system_message,
+        "user_message": user_message,
+        "func_spec": func_spec.to_dict() if func_spec is not None else None,
+        **model_kwargs,
+    }
+    return llm_cache.cached_call("backend.query", request, send)
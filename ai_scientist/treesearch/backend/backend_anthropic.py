@@ -2,11 +2,10 @@ import time
 import os
 
 from .utils import FunctionSpec, OutputType, opt_messages_to_list, backoff_create
-from funcy import notnone, once, select_values
+from funcy import notnone, select_values
 import anthropic
 
-# _client: anthropic.Anthropic = None  # type: ignore
-_client: anthropic.Anthropic = None  # type: ignore
+from ai_scientist.utils import llm_clients
 
 ANTHROPIC_TIMEOUT_EXCEPTIONS = (
     anthropic.RateLimitError,
@@ -17,10 +16,9 @@ ANTHROPIC_TIMEOUT_EXCEPTIONS = (
 )
 
 
-@once
-def _setup_anthropic_client():
-    global _client
-    _client = anthropic.Anthropic(max_retries=0)
+def _get_anthropic_client() -> anthropic.Anthropic:
+    # retries are done by backoff_create
+    return llm_clients.get_client("anthropic", max_retries=0)
 
 
 def query(
@@ -29,7 +27,7 @@ def query(
     func_spec: FunctionSpec | None = None,
     **model_kwargs,
 ) -> tuple[OutputType, float, int, int, dict]:
-    _setup_anthropic_client()
+    client = _get_anthropic_client()
 
     filtered_kwargs: dict = select_values(notnone, model_kwargs)  # type: ignore
     if "max_tokens" not in filtered_kwargs:
@@ -53,7 +51,7 @@ def query(
 
     t0 = time.time()
     message = backoff_create(
-        _client.messages.create,
+        client.messages.create,
         ANTHROPIC_TIMEOUT_EXCEPTIONS,
         messages=messages,
         **filtered_kwargs,
@@ -3,13 +3,13 @@ import logging
 import time
 
 from .utils import FunctionSpec, OutputType, opt_messages_to_list, backoff_create
-from funcy import notnone, once, select_values
+from funcy import notnone, select_values
 import openai
 from rich import print
 
-logger = logging.getLogger("ai-scientist")
+from ai_scientist.utils import llm_clients
 
-_client: openai.OpenAI = None  # type: ignore
+logger = logging.getLogger("ai-scientist")
 
 OPENAI_TIMEOUT_EXCEPTIONS = (
     openai.RateLimitError,
@@ -19,10 +19,9 @@ OPENAI_TIMEOUT_EXCEPTIONS = (
 )
 
 
-@once
-def _setup_openai_client():
-    global _client
-    _client = openai.OpenAI(max_retries=0)
+def _get_openai_client() -> openai.OpenAI:
+    # retries are done by backoff_create
+    return llm_clients.get_client("openai", max_retries=0)
 
 
 def query(
@@ -31,7 +30,7 @@ def query(
     func_spec: FunctionSpec | None = None,
     **model_kwargs,
 ) -> tuple[OutputType, float, int, int, dict]:
-    _setup_openai_client()
+    client = _get_openai_client()
     filtered_kwargs: dict = select_values(notnone, model_kwargs)  # type: ignore
 
     messages = opt_messages_to_list(system_message, user_message)
@@ -43,7 +42,7 @@ def query(
 
     t0 = time.time()
     completion = backoff_create(
-        _client.chat.completions.create,
+        client.chat.completions.create,
         OPENAI_TIMEOUT_EXCEPTIONS,
         messages=messages,
         **filtered_kwargs,
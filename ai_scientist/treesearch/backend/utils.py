@@ -12,6 +12,8 @@ import backoff
 import logging
 from typing import Callable
 
+from ai_scientist.utils import rate_limiter
+
 logger = logging.getLogger("ai-scientist")
 
 
@@ -24,7 +26,13 @@ def backoff_create(
     create_fn: Callable, retry_exceptions: list[Exception], *args, **kwargs
 ):
     try:
-        return create_fn(*args, **kwargs)
+        # wait for the shared rate limits before every attempt (see utils/rate_limiter.py)
+        return rate_limiter.limited_call(
+            kwargs.get("model"),
+            lambda: create_fn(*args, **kwargs),
+            prompt=(kwargs.get("system"), kwargs.get("messages")),
+            max_tokens=kwargs.get("max_tokens") or kwargs.get("max_completion_tokens"),
+        )
     except retry_exceptions as e:
         logger.info(f"Backoff exception: {e}")
         return False
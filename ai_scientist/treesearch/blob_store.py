@@ -0,0 +1,103 @@
+"""
+Content-addressed store for large node fields (code, terminal output, ...).
+
+Blobs are JSON-encoded values stored under the SHA-256 of their encoding, so
+the main process and the workers can exchange a short key instead of the value,
+and identical values (e.g. the code shared by all seeds of a node) are stored
+once. Blobs are written to a temporary file and renamed into place, so
+concurrent writers of the same blob don't need locking. Since blobs never
+change, recently read values are kept in a small in-memory LRU cache.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# values smaller than this are not worth a blob
+MIN_BLOB_BYTES = 1024
+
+
+def approx_size(value: Any) -> int:
+    """Rough size in characters of the strings in a (nested) value."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(approx_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(approx_size(v) for v in value.values())
+    return 0
+
+
+class BlobStore:
+    def __init__(self, root: Path | str, cache_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            root (Path | str): directory holding the blobs, shared by all processes of a run
+            cache_bytes (int, optional): total encoded size of the decoded values kept in memory. Defaults to 64MiB.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.cache_bytes = cache_bytes
+        # key -> (value, encoded size), least recently used first
+        self._cache: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._cached_bytes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def put(self, value: Any) -> str:
+        """Store a JSON-serializable value and return its key."""
+        data = json.dumps(value).encode()
+        key = hashlib.sha256(data).hexdigest()
+        path = self._path(key)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.parent / f".tmp-{uuid.uuid4().hex}"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return key
+
+    def get(self, key: str) -> Any:
+        cached = self._cache.get(key)
+        if cached is None:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            cached = (json.loads(data), len(data))
+            self._cache[key] = cached
+            self._cached_bytes += cached[1]
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                self._cached_bytes -= self._cache.popitem(last=False)[1][1]
+        else:
+            self._cache.move_to_end(key)
+        value = cached[0]
+        # callers may modify lists and dicts, the cached value must stay intact
+        return value if isinstance(value, str) else copy.deepcopy(value)
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+
+class BlobRef:
+    """Reference to a value in a `BlobStore`, standing in for the value itself."""
+
+    __slots__ = ("store", "key")
+
+    def __init__(self, store: BlobStore, key: str):
+        self.store = store
+        self.key = key
+
+    def load(self) -> Any:
+        return self.store.get(self.key)
+
+    def __deepcopy__(self, memo):
+        # immutable
+        return self
+
+    def __repr__(self) -> str:
+        return f"BlobRef({self.key[:12]})"
@@ -0,0 +1,308 @@
+"""
+Content-addressed cache of code executions.
+
+An entry is keyed by the hash of the executed code, a manifest of the input
+data and the environment variables passed to the interpreter (the seeds of the
+tree search are set in the code itself), and stores the `ExecutionResult` together with the files the execution
+wrote to the `working/` directory (and the spill file of its bounded output,
+if any). On a hit the files are restored and the stored result is returned
+instead of running the code again.
+
+The cache lives on disk and is shared by all worker processes: entries are
+written to a temporary directory and renamed into place, and hit/miss events
+are appended to a log file, so no locking is needed. The size of the cache is
+tracked from that log, so the entries are only walked when it exceeds the
+limit (and every `EVICT_EVERY` stores, for the age limit).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from .interpreter import ExecutionResult
+
+logger = logging.getLogger("ai-scientist")
+
+# outcomes that depend on the host rather than on the code and are never cached
+UNCACHEABLE_EXC_TYPES = ("TimeoutError", "MemoryError", "ResourceLimitExceeded")
+# stores between two eviction passes of a process that are due to the age limit
+EVICT_EVERY = 50
+
+
+def snapshot(directory: Path) -> dict[str, tuple[int, int]]:
+    """Map relative file paths below `directory` to (size, mtime_ns)."""
+    files = {}
+    if not directory.exists():
+        return files
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = Path(root) / name
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files[str(path.relative_to(directory))] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _dir_size(directory: Path) -> int:
+    return sum(size for size, _ in snapshot(directory).values())
+
+
+class ExecutionCache:
+    def __init__(
+        self,
+        cache_dir: Path | str,
+        input_dirs: list[Path | str] | None = None,
+        max_size_mb: float | None = 2048,
+        max_age_hours: float | None = 72,
+        max_entry_mb: float | None = 256,
+    ):
+        """
+        Args:
+            cache_dir (Path | str): directory holding the cache entries, may be shared by several processes
+            input_dirs (list[Path | str] | None, optional): directories whose file listing (paths, sizes, mtimes) is part of the key. Defaults to None.
+            max_size_mb (float | None, optional): total size above which the least recently used entries are evicted. Defaults to 2048.
+            max_age_hours (float | None, optional): entries not used for this long are evicted. Defaults to 72.
+            max_entry_mb (float | None, optional): executions producing more artifacts than this are not cached. Defaults to 256.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.input_dirs = [Path(d) for d in input_dirs or []]
+        self.max_size_mb = max_size_mb
+        self.max_age_hours = max_age_hours
+        self.max_entry_mb = max_entry_mb
+        self._manifest_digest: str | None = None
+        # running totals of the event log up to _events_offset, see `stats`
+        self._events_offset = 0
+        self._counts = {"hit": 0, "miss": 0, "store": 0, "evict": 0}
+        self._saved_time = 0.0
+        self._sizes: dict[str, int] = {}
+        self._total_size = 0
+        self._stores = 0
+
+    @property
+    def entries_dir(self) -> Path:
+        return self.cache_dir / "entries"
+
+    @property
+    def events_path(self) -> Path:
+        return self.cache_dir / "events.jsonl"
+
+    def manifest_digest(self) -> str:
+        """Hash of the input data listing, computed once since inputs don't change during a run."""
+        if self._manifest_digest is None:
+            h = hashlib.sha256()
+            for directory in self.input_dirs:
+                h.update(str(directory.resolve()).encode())
+                for rel_path, (size, mtime) in sorted(snapshot(directory).items()):
+                    h.update(f"{rel_path}\0{size}\0{mtime}\n".encode())
+            self._manifest_digest = h.hexdigest()
+        return self._manifest_digest
+
+    def make_key(self, code: str, env_vars: dict[str, str] | None = None) -> str:
+        payload = json.dumps(
+            {
+                "code": code,
+                "inputs": self.manifest_digest(),
+                "env": sorted((env_vars or {}).items()),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def snapshot(self, working_dir: Path) -> dict[str, tuple[int, int]]:
+        """Snapshot of `working_dir` to pass to `store` after the execution."""
+        return snapshot(working_dir)
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.entries_dir / key[:2] / key
+
+    def _log_event(self, event: str, key: str, **extra) -> None:
+        record = {"event": event, "key": key, "time": time.time(), **extra}
+        # a single small O_APPEND write, so concurrent writers don't interleave
+        with open(self.events_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def lookup(
+        self, key: str, working_dir: Path, spill_path: Path | None = None
+    ) -> ExecutionResult | None:
+        """
+        Return the cached result for `key` and restore its artifacts into `working_dir`
+        and its output spill file (if it had one) to `spill_path`.
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(entry / "result.json") as f:
+                result = ExecutionResult.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(
+                    f"Discarding unreadable execution cache entry {key}: {e}"
+                )
+                shutil.rmtree(entry, ignore_errors=True)
+            self._log_event("miss", key)
+            return None
+
+        artifacts = entry / "artifacts"
+        if artifacts.exists():
+            shutil.copytree(artifacts, working_dir, dirs_exist_ok=True)
+        # the stored path points into the workspace of the run that produced it
+        result.output_spill_path = None
+        if spill_path is not None and (entry / "output.log").exists():
+            shutil.copy2(entry / "output.log", spill_path)
+            result.output_spill_path = str(spill_path)
+        # mark as recently used for LRU eviction
+        os.utime(entry / "result.json")
+        self._log_event("hit", key, saved_time=result.exec_time)
+        logger.info(f"Execution cache hit for {key[:12]}")
+        return result
+
+    def store(
+        self,
+        key: str,
+        result: ExecutionResult,
+        working_dir: Path,
+        before: dict[str, tuple[int, int]],
+    ) -> bool:
+        """
+        Store `result` and the files in `working_dir` that were created or modified
+        since the `before` snapshot. Returns whether the entry was stored.
+        """
+        if result.exc_type in UNCACHEABLE_EXC_TYPES:
+            return False
+        after = snapshot(working_dir)
+        produced = [path for path, stat in after.items() if before.get(path) != stat]
+        produced_bytes = sum(after[path][0] for path in produced)
+        spill = Path(result.output_spill_path) if result.output_spill_path else None
+        if spill is not None and spill.exists():
+            produced_bytes += spill.stat().st_size
+        if (
+            self.max_entry_mb is not None
+            and produced_bytes > self.max_entry_mb * 1024 * 1024
+        ):
+            logger.info(
+                f"Not caching execution {key[:12]}: {produced_bytes} bytes of artifacts"
+            )
+            return False
+
+        entry = self._entry_dir(key)
+        tmp = self.entries_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            for rel_path in produced:
+                target = tmp / "artifacts" / rel_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(working_dir / rel_path, target)
+            tmp.mkdir(parents=True, exist_ok=True)
+            if spill is not None and spill.exists():
+                shutil.copy2(spill, tmp / "output.log")
+            with open(tmp / "result.json", "w") as f:
+                json.dump(result.to_dict(), f)
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(tmp, entry)
+        except OSError:
+            # another process stored the same key first (or the artifacts vanished)
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        self._log_event("store", key, size=_dir_size(entry))
+        self._stores += 1
+        # the log also holds the stores of the other processes
+        self._read_events()
+        if self._stores % EVICT_EVERY == 0 or (
+            self.max_size_mb is not None
+            and self._total_size > self.max_size_mb * 1024 * 1024
+        ):
+            self.evict()
+        return True
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """(last use, size, path) of all entries."""
+        entries = []
+        if not self.entries_dir.exists():
+            return entries
+        for prefix in self.entries_dir.iterdir():
+            if not prefix.is_dir() or prefix.name.startswith(".tmp-"):
+                continue
+            for entry in prefix.iterdir():
+                try:
+                    last_use = (entry / "result.json").stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((last_use, _dir_size(entry), entry))
+        return entries
+
+    def evict(self) -> int:
+        """Evict entries older than `max_age_hours`, then the least recently used ones
+        until the cache is below `max_size_mb`. Returns the number of evicted entries.
+        """
+        entries = sorted(self._entries())
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for last_use, size, entry in entries:
+            too_old = (
+                self.max_age_hours is not None
+                and now - last_use > self.max_age_hours * 3600
+            )
+            too_big = (
+                self.max_size_mb is not None and total > self.max_size_mb * 1024 * 1024
+            )
+            if not (too_old or too_big):
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            self._log_event("evict", entry.name, size=size)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def _read_events(self) -> None:
+        """Fold the events appended to the log since the last call into the running totals."""
+        try:
+            with open(self.events_path, "rb") as f:
+                f.seek(self._events_offset)
+                for line in f:
+                    # a line that is still being written is read again next time
+                    if not line.endswith(b"\n"):
+                        break
+                    self._events_offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    event = record["event"]
+                    self._counts[event] = self._counts.get(event, 0) + 1
+                    self._saved_time += record.get("saved_time") or 0.0
+                    if event == "store":
+                        size = record.get("size") or 0
+                        self._total_size += size - self._sizes.get(record["key"], 0)
+                        self._sizes[record["key"]] = size
+                    elif event == "evict":
+                        self._total_size -= self._sizes.pop(record["key"], 0)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        """
+        Hit/miss statistics aggregated over all processes using this cache.
+        Only the events logged since the previous call are read, and the number
+        and size of the entries are tracked from the store/evict events instead
+        of walking the cache directory.
+        """
+        self._read_events()
+        counts = self._counts
+        lookups = counts["hit"] + counts["miss"]
+        return {
+            "hits": counts["hit"],
+            "misses": counts["miss"],
+            "hit_rate": counts["hit"] / lookups if lookups else 0.0,
+            "stores": counts["store"],
+            "evictions": counts["evict"],
+            "saved_exec_time": self._saved_time,
+            "entries": len(self._sizes),
+            "size_mb": self._total_size / 1024**2,
+        }
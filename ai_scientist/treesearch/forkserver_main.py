@@ -0,0 +1,30 @@
+"""
+Imported by the interpreter's forkserver to load the parent's main module once.
+
+A child started from a forkserver imports the parent's main script (or `-m`
+module) again before it runs, unless the server has already loaded it. The
+forkserver is meant to do that when "__main__" is preloaded, but Python 3.11
+drops the main path (and the parent's sys.path) on the way to the server, so
+every child re-ran the script's imports (about a second per execution for the
+launch script). The parent passes both through the environment instead, see
+`interpreter.WarmContext.ensure_running`.
+"""
+
+import json
+import os
+from multiprocessing import process, spawn
+
+ENV_MAIN = "AI_SCIENTIST_FORKSERVER_MAIN"
+
+_current = process.current_process()
+_main = json.loads(os.environ.get(ENV_MAIN) or "{}")
+# a child that imports this module while it is being prepared has its main already
+if _main and not getattr(_current, "_inheriting", False):
+    _current._inheriting = True
+    try:
+        spawn.prepare(_main)
+    except Exception:
+        # the children import the main module themselves, as without preloading
+        pass
+    finally:
+        del _current._inheriting
@@ -4,22 +4,43 @@ Supports:
 - captures stdout and stderr
 - captures exceptions and stack traces
 - limits execution time
+- optionally hands out pre-forked children from a warm forkserver
 """
 
+import collections
+import io
+import json
 import logging
+import multiprocessing
 import os
 import queue
+import resource
 import signal
 import sys
+import threading
 import time
 import traceback
 from dataclasses import dataclass
-from multiprocessing import Process, Queue
+from multiprocessing import Process, Queue, forkserver, popen_forkserver, spawn, util
+from multiprocessing.context import (
+    ForkServerContext,
+    ForkServerProcess,
+    reduction,
+    set_spawning_popen,
+)
+from multiprocessing.connection import Connection, wait
+from multiprocessing.util import Finalize
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import humanize
 from dataclasses_json import DataClassJsonMixin
 
+from . import forkserver_main
+
+if TYPE_CHECKING:
+    from .exec_cache import ExecutionCache
+
 logger = logging.getLogger("ai-scientist")
 
 
@@ -35,6 +56,18 @@ class ExecutionResult(DataClassJsonMixin):
     exc_type: str | None
     exc_info: dict | None = None
     exc_stack: list[tuple] | None = None
+    # length of the complete output (in characters, not bytes) and where it was
+    # spilled to (bounded capture only)
+    output_chars: int | None = None
+    output_lines: int | None = None
+    output_spill_path: str | None = None
+    # wall time of `Interpreter.run` not spent executing the code itself
+    # (process hand-out, start handshake, completion detection, output collection)
+    supervisor_time: float | None = None
+    # resources used by the execution (see `resource_usage`)
+    resources: dict | None = None
+    # whether the result was restored from an `ExecutionCache` instead of running the code
+    cache_hit: bool = False
 
 
 def exception_summary(e, working_dir, exec_file_name, format_tb_ipython):
@@ -67,6 +100,163 @@ def exception_summary(e, working_dir, exec_file_name, format_tb_ipython):
     return tb_str, e.__class__.__name__, exc_info, exc_stack
 
 
+class ResourceLimitExceeded(Exception):
+    """Raised in the executed code when it exceeds one of the interpreter's resource limits."""
+
+
+# environment variables read by the common BLAS/OpenMP thread pools
+THREAD_LIMIT_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def _read_proc_file(name: str, pid: int | str = "self") -> dict[str, int]:
+    """Parse a `key: value` file from /proc/<pid> (empty if unavailable, e.g. on macOS)."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/{name}") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                value = value.split()
+                if value and value[0].isdigit():
+                    values[key.strip()] = int(value[0])
+    except OSError:
+        pass
+    return values
+
+
+def _descendants(pid: int) -> list[int]:
+    try:
+        children = []
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children += [int(c) for c in f.read().split()]
+    except (OSError, ValueError):
+        return []
+    return children + [d for c in children for d in _descendants(c)]
+
+
+def _rss_mb(pids: list[int]) -> float:
+    # VmRSS is reported in kB
+    return sum(_read_proc_file("status", pid).get("VmRSS", 0) for pid in pids) / 1024
+
+
+class ResourceSampler:
+    """
+    Records the peak number of threads and descendant processes of the current
+    process while code is executing. getrusage has no notion of either, so they
+    are sampled from /proc in a background thread.
+
+    If `max_rss_mb` is set, the sampler also enforces it: once the combined RSS
+    of the process and its descendants exceeds the limit, the descendants are
+    killed and a MemoryError is raised in the main thread (via SIGUSR1).
+    """
+
+    def __init__(self, interval: float = 1.0, max_rss_mb: int | None = None):
+        self.interval = interval
+        self.max_rss_mb = max_rss_mb
+        self.peak_threads = 0
+        self.peak_procs = 0
+        self._armed = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if max_rss_mb is not None:
+            signal.signal(signal.SIGUSR1, self._raise_memory_error)
+
+    def _raise_memory_error(self, signum, frame):
+        # the signal can arrive just after execution finished
+        if not self._armed:
+            return
+        self._armed = False
+        raise MemoryError(
+            f"Process exceeded the memory limit of {self.max_rss_mb} MB (resident set size)"
+        )
+
+    def sample(self):
+        pid = os.getpid()
+        descendants = _descendants(pid)
+        self.peak_threads = max(
+            self.peak_threads, _read_proc_file("status").get("Threads", 0)
+        )
+        self.peak_procs = max(self.peak_procs, len(descendants))
+        if (
+            self.max_rss_mb is not None
+            and not self._stop.is_set()
+            and _rss_mb([pid, *descendants]) > self.max_rss_mb
+        ):
+            for child in descendants:
+                try:
+                    os.kill(child, signal.SIGKILL)
+                except OSError:
+                    pass
+            self._stop.set()
+            os.kill(pid, signal.SIGUSR1)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._stop.clear()
+        self.peak_threads = self.peak_procs = 0
+        self.sample()
+        self._armed = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._armed = False
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def _resource_snapshot() -> dict:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io = _read_proc_file("io")
+    return {
+        "cpu_user": own.ru_utime + children.ru_utime,
+        "cpu_sys": own.ru_stime + children.ru_stime,
+        # ru_maxrss is in KiB on Linux
+        "maxrss_kb": max(own.ru_maxrss, children.ru_maxrss),
+        "ctx_switches_voluntary": own.ru_nvcsw + children.ru_nvcsw,
+        "ctx_switches_involuntary": own.ru_nivcsw + children.ru_nivcsw,
+        # rchar/wchar include pipes and page-cache hits, not just disk I/O
+        "read_bytes": io.get("rchar", 0),
+        "write_bytes": io.get("wchar", 0),
+    }
+
+
+def resource_usage(before: dict, after: dict, sampler: ResourceSampler) -> dict:
+    """
+    Resources used between two snapshots taken in the executing process.
+    CPU times and context switches cover the process and its reaped children;
+    the thread and process counts exclude the sampler thread and the threads
+    that were already running before execution started (the output queue's
+    feeder thread is started lazily, so it is counted once on the first write).
+    """
+    usage = {
+        key: after[key] - before[key]
+        for key in (
+            "cpu_user",
+            "cpu_sys",
+            "ctx_switches_voluntary",
+            "ctx_switches_involuntary",
+            "read_bytes",
+            "write_bytes",
+        )
+    }
+    usage["peak_rss_mb"] = after["maxrss_kb"] / 1024
+    usage["threads_spawned"] = max(0, sampler.peak_threads - before["threads"] - 1)
+    usage["procs_spawned"] = sampler.peak_procs
+    return usage
+
+
 class RedirectQueue:
     def __init__(self, queue):
         self.queue = queue
@@ -77,6 +267,277 @@ class RedirectQueue:
     def flush(self):
         pass
 
+    def finalize(self):
+        """Called at the end of every execution, before the EOF marker is sent."""
+        pass
+
+
+class BoundedOutput:
+    """
+    stdout/stderr replacement that batches writes into large chunks and only keeps
+    a bounded head and tail of the output in memory. Once the output outgrows
+    head + tail, everything is streamed to a spill file on disk instead.
+
+    Nothing is sent to the parent until `finalize`, which puts the head, a
+    truncation marker, the tail and a stats dict on the queue.
+    """
+
+    def __init__(
+        self,
+        queue,
+        spill_path: Path,
+        chunk_chars: int = 64 * 1024,
+        head_chars: int = 32 * 1024,
+        tail_chars: int = 32 * 1024,
+    ):
+        self.queue = queue
+        self.spill_path = spill_path
+        self.chunk_chars = chunk_chars
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self._reset()
+
+    def _reset(self):
+        self._pending: list[str] = []
+        self._pending_len = 0
+        self._head: list[str] = []
+        self._head_len = 0
+        self._tail: collections.deque[str] = collections.deque()
+        self._tail_len = 0
+        self._spill = None
+        self.n_chars = 0
+        self.n_lines = 0
+
+    def write(self, msg):
+        if not msg:
+            return 0
+        self._pending.append(msg)
+        self._pending_len += len(msg)
+        if self._pending_len >= self.chunk_chars:
+            self._flush_chunk()
+        return len(msg)
+
+    def flush(self):
+        pass
+
+    def _flush_chunk(self):
+        if not self._pending:
+            return
+        chunk = "".join(self._pending)
+        self._pending.clear()
+        self._pending_len = 0
+        self.n_chars += len(chunk)
+        self.n_lines += chunk.count("\n")
+
+        if self._spill is not None:
+            self._spill.write(chunk)
+
+        head_room = self.head_chars - self._head_len
+        if head_room > 0:
+            self._head.append(chunk[:head_room])
+            self._head_len += min(head_room, len(chunk))
+            chunk = chunk[head_room:]
+        if not chunk:
+            return
+
+        self._tail.append(chunk)
+        self._tail_len += len(chunk)
+        if self._tail_len > self.tail_chars:
+            if self._spill is None:
+                # caps hit for the first time -> dump what we have and keep streaming
+                self._spill = open(self.spill_path, "w")
+                self._spill.write("".join(self._head))
+                self._spill.write("".join(self._tail))
+            while self._tail_len - len(self._tail[0]) >= self.tail_chars:
+                self._tail_len -= len(self._tail.popleft())
+            excess = self._tail_len - self.tail_chars
+            if excess > 0:
+                self._tail[0] = self._tail[0][excess:]
+                self._tail_len -= excess
+
+    def finalize(self):
+        self._flush_chunk()
+        if self._head:
+            self.queue.put("".join(self._head))
+        kept = self._head_len + self._tail_len
+        if kept < self.n_chars:
+            self.queue.put(
+                f"\n ... [{self.n_chars - kept} characters truncated, "
+                f"full output ({self.n_lines} lines) in {self.spill_path.name}] ... \n"
+            )
+        if self._tail:
+            self.queue.put("".join(self._tail))
+        spill_path = None
+        if self._spill is not None:
+            self._spill.close()
+            spill_path = str(self.spill_path)
+        self.queue.put(
+            {
+                "output_chars": self.n_chars,
+                "output_lines": self.n_lines,
+                "output_spill_path": spill_path,
+            }
+        )
+        self._reset()
+
+
+# The warm pool reuses private parts of CPython's multiprocessing (the
+# forkserver's launch sequence, ForkServer instances and spawn.prepare), which
+# change between minor versions, so it is only enabled on the versions it was
+# written against.
+WARM_PYTHON_VERSIONS = ((3, 11),)
+if sys.implementation.name != "cpython":
+    _warm_unsupported = f"{sys.implementation.name} is not CPython"
+elif sys.version_info[:2] not in WARM_PYTHON_VERSIONS:
+    _warm_unsupported = "Python {}.{} is not one of {}".format(
+        *sys.version_info[:2], ", ".join(f"{a}.{b}" for a, b in WARM_PYTHON_VERSIONS)
+    )
+else:
+    _warm_unsupported = None
+
+
+class _WarmPopen(popen_forkserver.Popen):
+    """Starts a child from the forkserver of its `_WarmProcess` instead of the global one."""
+
+    def _launch(self, process_obj):
+        # same as popen_forkserver.Popen._launch, except for the server it connects to
+        prep_data = spawn.get_preparation_data(process_obj._name)
+        buf = io.BytesIO()
+        set_spawning_popen(self)
+        try:
+            reduction.dump(prep_data, buf)
+            reduction.dump(process_obj, buf)
+        finally:
+            set_spawning_popen(None)
+
+        self.sentinel, w = process_obj._server.connect_to_new_process(self._fds)
+        # the parent keeps a duplicate of the data pipe as the child's parent sentinel
+        _parent_w = os.dup(w)
+        self.finalizer = Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+        with open(w, "wb", closefd=True) as f:
+            f.write(buf.getbuffer())
+        self.pid = forkserver.read_signed(self.sentinel)
+
+
+class _WarmProcess(ForkServerProcess):
+    _server: forkserver.ForkServer
+
+    @staticmethod
+    def _Popen(process_obj):
+        return _WarmPopen(process_obj)
+
+    def __getstate__(self):
+        # the process object is pickled into the child, the server handle stays here
+        state = self.__dict__.copy()
+        state.pop("_server", None)
+        return state
+
+
+class WarmContext(ForkServerContext):
+    """
+    Forkserver context with its own server process, which imports `preload_modules`
+    (and the parent's main module) once before it forks any child.
+
+    Unlike `multiprocessing.get_context("forkserver")`, the server is not the
+    process-wide singleton of `multiprocessing.forkserver`, so its preload list
+    can't be overridden elsewhere, and a process forked from the owner (e.g. a
+    tree search worker) never talks to a server that isn't its child: it gets a
+    context of its own from `get_warm_context`.
+    """
+
+    def __init__(self, preload_modules: list[str]):
+        if _warm_unsupported is not None:
+            raise RuntimeError(
+                f"The warm forkserver is not supported here ({_warm_unsupported}); "
+                "set exec.preload_modules to [] to start a cold process per execution"
+            )
+        super().__init__()
+        self.owner_pid = os.getpid()
+        self._server = forkserver.ForkServer()
+        # this module is needed to unpickle the session target in every child
+        self._server.set_forkserver_preload(
+            [forkserver_main.__name__, __name__, *preload_modules]
+        )
+        self._start_lock = threading.Lock()
+
+    def Process(self, *args, **kwargs) -> _WarmProcess:
+        self.ensure_running()
+        process = _WarmProcess(*args, **kwargs)
+        process._server = self._server
+        return process
+
+    def ensure_running(self) -> None:
+        """Start the server, or restart it if it died."""
+        # The server is started with the environment of this process, extended by:
+        # - the package root on PYTHONPATH: the server starts with the interpreter's
+        #   default sys.path, where this package is only importable from the
+        #   repository root
+        # - the parent's sys.path and main module for forkserver_main: Python 3.11
+        #   drops both on the way to the server, so every child would import the
+        #   main script again
+        package_root = str(Path(__file__).resolve().parents[2])
+        main = spawn.get_preparation_data("ignore")
+        env = {
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, (package_root, os.environ.get("PYTHONPATH")))
+            ),
+            forkserver_main.ENV_MAIN: json.dumps(
+                {
+                    k: v
+                    for k, v in main.items()
+                    if k in ("sys_path", "init_main_from_path", "init_main_from_name")
+                }
+            ),
+        }
+        with self._start_lock:
+            saved = {key: os.environ.get(key) for key in env}
+            os.environ.update(env)
+            try:
+                self._server.ensure_running()
+            finally:
+                for key, value in saved.items():
+                    if value is None:
+                        del os.environ[key]
+                    else:
+                        os.environ[key] = value
+
+
+# warm contexts of this process by preload list
+_warm_contexts: dict[tuple[str, ...], WarmContext] = {}
+
+
+def get_warm_context(preload_modules: list[str]) -> WarmContext:
+    """
+    Return a forkserver context whose server process has already imported
+    `preload_modules`. Children forked from it start without paying for those
+    imports again.
+
+    Contexts (and their servers) are shared by all interpreters of a process with
+    the same preload list. Modules that fail to import are skipped by the server.
+
+    Only available on the CPython versions in `WARM_PYTHON_VERSIONS`, elsewhere
+    this raises a RuntimeError.
+
+    The server also imports the main module of this process, like every spawn or
+    forkserver child does, so a main script that starts interpreters must guard
+    its entry point with `if __name__ == "__main__":` (otherwise multiprocessing
+    raises a RuntimeError about the bootstrapping phase).
+    """
+    key = tuple(preload_modules)
+    ctx = _warm_contexts.get(key)
+    if ctx is None or ctx.owner_pid != os.getpid():
+        # contexts inherited from the process this one was forked from belong
+        # to a server that is not our child
+        ctx = _warm_contexts[key] = WarmContext(preload_modules)
+    ctx.ensure_running()
+    return ctx
+
+
+def _kill_process(process: Process | None) -> None:
+    if process is not None and process.is_alive():
+        process.kill()
+        process.join(timeout=2)
+
 
 class Interpreter:
     def __init__(
@@ -86,6 +547,17 @@ class Interpreter:
         format_tb_ipython: bool = False,
         agent_file_name: str = "runfile.py",
         env_vars: dict[str, str] = {},
+        preload_modules: list[str] | None = None,
+        output_mode: str = "stream",
+        output_chunk_chars: int = 64 * 1024,
+        output_head_chars: int = 32 * 1024,
+        output_tail_chars: int = 32 * 1024,
+        max_memory_mb: int | None = None,
+        max_rss_mb: int | None = None,
+        max_cpu_seconds: int | None = None,
+        max_open_files: int | None = None,
+        max_threads: int | None = None,
+        cache: "ExecutionCache | None" = None,
     ):
         """
         Simulates a standalone Python REPL with an execution time limit.
@@ -96,6 +568,17 @@ class Interpreter:
             format_tb_ipython (bool, optional): Whether to use IPython or default python REPL formatting for exceptions. Defaults to False.
             agent_file_name (str, optional): The name for the agent's code file. Defaults to "runfile.py".
             env_vars (dict[str, str], optional): Environment variables to set in the child process. Defaults to {}.
+            preload_modules (list[str] | None, optional): If given, children are forked from a warm forkserver that has already imported these modules, and the next child is pre-forked while the current one is cleaned up. The calling script needs an `if __name__ == "__main__":` guard, see `get_warm_context`. Defaults to None (a cold child process per session).
+            output_mode (str, optional): "stream" sends every write to the parent as its own message, "bounded" batches writes in the child and only returns a bounded head and tail, spilling the full output to disk. Defaults to "stream".
+            output_chunk_chars (int, optional): Characters per write batch in "bounded" mode. Defaults to 65536.
+            output_head_chars (int, optional): Characters kept from the start of the output in "bounded" mode. Defaults to 32768.
+            output_tail_chars (int, optional): Characters kept from the end of the output in "bounded" mode. Defaults to 32768.
+            max_memory_mb (int | None, optional): Address space limit (RLIMIT_AS) of the child process, allocations beyond it raise MemoryError. Defaults to None (no limit).
+            max_rss_mb (int | None, optional): Resident memory limit of the child process and its descendants, checked 5 times a second; exceeding it kills the descendants and raises MemoryError. Defaults to None (no limit).
+            max_cpu_seconds (int | None, optional): CPU time limit (RLIMIT_CPU) per execution, exceeding it raises ResourceLimitExceeded. Defaults to None (no limit).
+            max_open_files (int | None, optional): Limit on open file descriptors (RLIMIT_NOFILE) of the child process. Defaults to None (no limit).
+            max_threads (int | None, optional): Thread count for OpenMP/BLAS thread pools, set through OMP_NUM_THREADS and friends (and torch.set_num_threads if torch is preloaded). Defaults to None (no limit).
+            cache (ExecutionCache | None, optional): If given, fresh-session executions of code that ran before (with the same inputs and env vars) return the cached result and restore the files it wrote to `working/`. Defaults to None.
         """
         # this really needs to be a path, otherwise causes issues that don't raise exc
         self.working_dir = Path(working_dir).resolve()
@@ -107,15 +590,75 @@ class Interpreter:
         self.agent_file_name = agent_file_name
         self.process: Process = None  # type: ignore
         self.env_vars = env_vars
+        self.preload_modules = preload_modules
+        if output_mode not in ("stream", "bounded"):
+            raise ValueError(f"Unknown output_mode: {output_mode}")
+        self.output_mode = output_mode
+        self.output_chunk_chars = output_chunk_chars
+        self.output_head_chars = output_head_chars
+        self.output_tail_chars = output_tail_chars
+        self.max_memory_mb = max_memory_mb
+        self.max_rss_mb = max_rss_mb
+        self.max_cpu_seconds = max_cpu_seconds
+        self.max_open_files = max_open_files
+        self.max_threads = max_threads
+        self.cache = cache
+        self._ctx = (
+            get_warm_context(preload_modules)
+            if preload_modules
+            else multiprocessing.get_context()
+        )
+        # pre-forked child (with its queues and the environment it was started with)
+        # that is handed out by the next `create_process` call
+        self._spare: tuple | None = None
+        self._spare_finalizer: Finalize | None = None
+
+    def __getstate__(self):
+        # the session target is pickled into forkserver children, which must not
+        # receive handles to the parent's processes and queues
+        state = self.__dict__.copy()
+        for key in (
+            "process",
+            "code_inq",
+            "result_outq",
+            "event_conn",
+            "_ctx",
+            "_spare",
+            "_spare_finalizer",
+        ):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.process = None  # type: ignore
+        self._ctx = None
+        self._spare = None
+        self._spare_finalizer = None
 
-    def child_proc_setup(self, result_outq: Queue) -> None:
+    @property
+    def spill_path(self) -> Path:
+        """Where the full output is written when it exceeds the bounded capture."""
+        return self.working_dir / f"{Path(self.agent_file_name).stem}_output.log"
+
+    def child_proc_setup(
+        self, result_outq: Queue, parent_env: dict[str, str]
+    ) -> RedirectQueue | BoundedOutput:
         # disable all warnings (before importing anything)
         import shutup
 
         shutup.mute_warnings()
 
+        # children forked from a forkserver inherit the server's environment,
+        # not the one of the process that requested them
+        os.environ.clear()
+        os.environ.update(parent_env)
+        if self.max_threads is not None:
+            for key in THREAD_LIMIT_ENV_VARS:
+                os.environ[key] = str(self.max_threads)
         for key, value in self.env_vars.items():
             os.environ[key] = value
+        self._apply_resource_limits()
 
         os.chdir(str(self.working_dir))
 
@@ -124,24 +667,108 @@ class Interpreter:
         sys.path.append(str(self.working_dir))
 
         # capture stdout and stderr
+        if self.output_mode == "bounded":
+            capture = BoundedOutput(
+                result_outq,
+                spill_path=self.spill_path,
+                chunk_chars=self.output_chunk_chars,
+                head_chars=self.output_head_chars,
+                tail_chars=self.output_tail_chars,
+            )
+        else:
+            capture = RedirectQueue(result_outq)
         # trunk-ignore(mypy/assignment)
-        sys.stdout = sys.stderr = RedirectQueue(result_outq)
+        sys.stdout = sys.stderr = capture
+        return capture
+
+    def _apply_resource_limits(self) -> None:
+        """Apply the per-process resource limits, called in the child process."""
+        if self.max_memory_mb is not None:
+            limit = self.max_memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if self.max_open_files is not None:
+            _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            limit = (
+                self.max_open_files
+                if hard == resource.RLIM_INFINITY
+                else min(self.max_open_files, hard)
+            )
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, limit))
+        if self.max_threads is not None and "torch" in sys.modules:
+            # a preloaded torch has already sized its thread pool from the
+            # forkserver's environment
+            sys.modules["torch"].set_num_threads(self.max_threads)
+        if self.max_cpu_seconds is not None:
+            signal.signal(signal.SIGXCPU, self._raise_cpu_limit_exceeded)
+
+    def _set_cpu_limit(self, armed: bool) -> None:
+        # RLIMIT_CPU counts the CPU time of the whole process, so the soft limit is
+        # moved to (CPU time used so far + max_cpu_seconds) for every execution.
+        # The hard limit is left alone since it could never be raised again.
+        if self.max_cpu_seconds is None:
+            return
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = hard
+        if armed:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime) + 1 + self.max_cpu_seconds
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    def _raise_cpu_limit_exceeded(self, signum, frame):
+        # SIGXCPU is repeated every second once the soft limit is exceeded
+        self._set_cpu_limit(armed=False)
+        raise ResourceLimitExceeded(
+            f"Execution exceeded the CPU time limit of {self.max_cpu_seconds} seconds"
+        )
+
+    @staticmethod
+    def _wait_for_code(code_inq: Queue) -> str:
+        # a pre-forked child may idle for a long time, so make sure it does not
+        # outlive the process that created it
+        parent = multiprocessing.parent_process()
+        while True:
+            try:
+                return code_inq.get(timeout=1)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    os._exit(0)
 
     def _run_session(
-        self, code_inq: Queue, result_outq: Queue, event_outq: Queue
+        self,
+        code_inq: Queue,
+        result_outq: Queue,
+        event_conn: Connection,
+        parent_env: dict[str, str],
     ) -> None:
-        self.child_proc_setup(result_outq)
+        capture = self.child_proc_setup(result_outq, parent_env)
 
         global_scope: dict = {}
+        sampler = ResourceSampler(
+            interval=1.0 if self.max_rss_mb is None else 0.2,
+            max_rss_mb=self.max_rss_mb,
+        )
         while True:
-            code = code_inq.get()
+            code = self._wait_for_code(code_inq)
             os.chdir(str(self.working_dir))
             with open(self.agent_file_name, "w") as f:
                 f.write(code)
 
-            event_outq.put(("state:ready",))
+            event_conn.send(("state:ready", time.time()))
+            usage_before = _resource_snapshot()
+            usage_before["threads"] = _read_proc_file("status").get("Threads", 0)
+            sampler.start()
+            self._set_cpu_limit(armed=True)
             try:
-                exec(compile(code, self.agent_file_name, "exec"), global_scope)
+                try:
+                    exec(compile(code, self.agent_file_name, "exec"), global_scope)
+                finally:
+                    # a limit can still fire in here, in which case it is reported
+                    # like any other exception raised by the code (both disarm
+                    # themselves when they fire, so they can't fire twice)
+                    sampler.stop()
+                    self._set_cpu_limit(armed=False)
             except BaseException as e:
                 tb_str, e_cls_name, exc_info, exc_stack = exception_summary(
                     e,
@@ -149,29 +776,71 @@ class Interpreter:
                     self.agent_file_name,
                     self.format_tb_ipython,
                 )
-                result_outq.put(tb_str)
+                capture.write(tb_str)
                 if e_cls_name == "KeyboardInterrupt":
                     e_cls_name = "TimeoutError"
-
-                event_outq.put(("state:finished", e_cls_name, exc_info, exc_stack))
             else:
-                event_outq.put(("state:finished", None, None, None))
+                e_cls_name, exc_info, exc_stack = None, None, None
+
+            end_time = time.time()
+            usage = resource_usage(usage_before, _resource_snapshot(), sampler)
+            event_conn.send(
+                ("state:finished", e_cls_name, exc_info, exc_stack, end_time, usage)
+            )
 
             # put EOF marker to indicate that we're done
+            capture.finalize()
             result_outq.put("<|EOF|>")
 
-    def create_process(self) -> None:
-        # we use three queues to communicate with the child process:
+    def _start_child(self) -> tuple:
+        # we use two queues and a pipe to communicate with the child process:
         # - code_inq: send code to child to execute
         # - result_outq: receive stdout/stderr from child
-        # - event_outq: receive events from child (e.g. state:ready, state:finished)
+        # - event_conn: receive events from child (e.g. state:ready, state:finished);
+        #   a pipe so that it can be waited on together with the process sentinel
         # trunk-ignore(mypy/var-annotated)
-        self.code_inq, self.result_outq, self.event_outq = Queue(), Queue(), Queue()
-        self.process = Process(
+        code_inq, result_outq = self._ctx.Queue(), self._ctx.Queue()
+        event_conn, child_event_conn = self._ctx.Pipe(duplex=False)
+        parent_env = dict(os.environ)
+        process = self._ctx.Process(
             target=self._run_session,
-            args=(self.code_inq, self.result_outq, self.event_outq),
+            args=(code_inq, result_outq, child_event_conn, parent_env),
+        )
+        process.start()
+        # only the child writes to the pipe
+        child_event_conn.close()
+        return process, code_inq, result_outq, event_conn, parent_env
+
+    def _prefork(self) -> None:
+        """Start the child for the next session ahead of time (warm pool only)."""
+        if not self.preload_modules or self._spare is not None:
+            return
+        self._spare = self._start_child()
+        # non-daemonic children are joined at interpreter exit, so the idle spare
+        # has to be killed before that happens
+        self._spare_finalizer = Finalize(
+            self, _kill_process, args=(self._spare[0],), exitpriority=10
         )
-        self.process.start()
+
+    def _take_spare(self) -> tuple | None:
+        spare, self._spare = self._spare, None
+        if self._spare_finalizer is not None:
+            self._spare_finalizer.cancel()
+            self._spare_finalizer = None
+        if spare is None:
+            return None
+        process, *_, parent_env = spare
+        # a spare started under a different environment (e.g. another
+        # CUDA_VISIBLE_DEVICES assignment) can't be reused
+        if not process.is_alive() or parent_env != dict(os.environ):
+            _kill_process(process)
+            process.close()
+            return None
+        return spare
+
+    def create_process(self) -> None:
+        child = self._take_spare() or self._start_child()
+        self.process, self.code_inq, self.result_outq, self.event_conn, _ = child
 
     def _drain_queues(self):
         """Quickly drain all in-flight messages to prevent blocking."""
@@ -181,11 +850,11 @@ class Interpreter:
             except Exception:
                 break
 
-        while not self.event_outq.empty():
-            try:
-                self.event_outq.get_nowait()
-            except Exception:
-                break
+        try:
+            while self.event_conn.poll():
+                self.event_conn.recv()
+        except (EOFError, OSError):
+            pass
 
         while not self.code_inq.empty():
             try:
@@ -209,6 +878,17 @@ class Interpreter:
         # don't wait for gc, clean up immediately
         self.process.close()
         self.process = None  # type: ignore
+        self.event_conn.close()
+        # get the next child ready while the caller is busy with other work
+        self._prefork()
+
+    def close(self) -> None:
+        """Terminate the current session and any pre-forked child."""
+        self.cleanup_session()
+        spare = self._take_spare()
+        if spare is not None:
+            _kill_process(spare[0])
+            spare[0].close()
 
     def run(self, code: str, reset_session=True) -> ExecutionResult:
         """
@@ -222,7 +902,26 @@ class Interpreter:
             ExecutionResult: Object containing the output and metadata of the code execution.
 
         """
+        # only fresh sessions are cached, their outcome doesn't depend on earlier runs
+        if self.cache is None or not reset_session:
+            return self._run(code, reset_session)
+
+        artifacts_dir = self.working_dir / "working"
+        key = self.cache.make_key(code, self.env_vars)
+        result = self.cache.lookup(key, artifacts_dir, self.spill_path)
+        if result is not None:
+            # the session didn't run this code, so it can't be continued either
+            if self.process is not None:
+                self.cleanup_session()
+            result.cache_hit = True
+            return result
+
+        before = self.cache.snapshot(artifacts_dir)
+        result = self._run(code, reset_session)
+        self.cache.store(key, result, artifacts_dir, before)
+        return result
 
+    def _run(self, code: str, reset_session: bool) -> ExecutionResult:
         logger.debug(f"REPL is executing code (reset_session={reset_session})")
 
         if reset_session:
@@ -236,34 +935,50 @@ class Interpreter:
 
         assert self.process.is_alive()
 
+        run_start = time.time()
         self.code_inq.put(code)
 
         # wait for child to actually start execution (we don't want interrupt child setup)
         try:
-            state = self.event_outq.get(timeout=10)
-        except queue.Empty:
+            if not self.event_conn.poll(timeout=10):
+                raise EOFError
+            state = self.event_conn.recv()
+        except EOFError:
             msg = "REPL child process failed to start execution"
             logger.critical(msg)
             while not self.result_outq.empty():
                 logger.error(f"REPL output queue dump: {self.result_outq.get()}")
             raise RuntimeError(msg) from None
         assert state[0] == "state:ready", state
+        child_start_time = state[1]
         start_time = time.time()
 
         # this flag indicates that the child ahs exceeded the time limit and an interrupt was sent
         # if the child process dies without this flag being set, it's an unexpected termination
         child_in_overtime = False
+        # set if the child had to be killed, in which case it never sends its output
+        child_killed = False
+        deadline = None if self.timeout is None else start_time + self.timeout
 
         while True:
-            try:
-                # check if the child is done
-                state = self.event_outq.get(timeout=1)  # wait for state:finished
-                assert state[0] == "state:finished", state
-                exec_time = time.time() - start_time
-                break
-            except queue.Empty:
-                # we haven't heard back from the child -> check if it's still alive (assuming overtime interrupt wasn't sent yet)
-                if not child_in_overtime and not self.process.is_alive():
+            # block until the child reports completion, dies or the deadline passes
+            wait_timeout = None if deadline is None else max(0, deadline - time.time())
+            ready = wait([self.event_conn, self.process.sentinel], timeout=wait_timeout)
+
+            if self.event_conn in ready:
+                try:
+                    state = self.event_conn.recv()  # state:finished
+                except EOFError:
+                    # the pipe also becomes ready when the child exits and closes it
+                    self.process.join(timeout=1)
+                    ready = [self.process.sentinel]
+                else:
+                    assert state[0] == "state:finished", state
+                    exec_time = time.time() - start_time
+                    break
+
+            if self.process.sentinel in ready:
+                if not child_in_overtime:
                     msg = "REPL child process died unexpectedly"
                     logger.critical(msg)
                     while not self.result_outq.empty():
@@ -271,36 +986,51 @@ class Interpreter:
                             f"REPL output queue dump: {self.result_outq.get()}"
                         )
                     raise RuntimeError(msg) from None
+                # the interrupt took the child down before it could report back
+                logger.warning("Child died after being interrupted")
+                self.cleanup_session()
+                state = (None, "TimeoutError", {}, [], None, None)
+                exec_time = self.timeout
+                child_killed = True
+                break
 
-                # child is alive and still executing -> check if we should sigint..
-                if self.timeout is None:
-                    continue
-                running_time = time.time() - start_time
-                if running_time > self.timeout:
-                    # [TODO] handle this in a better way
-                    assert reset_session, "Timeout ocurred in interactive session"
-
-                    # send interrupt to child
-                    os.kill(self.process.pid, signal.SIGINT)  # type: ignore
-                    child_in_overtime = True
-                    # terminate if we're overtime by more than a minute
-                    if running_time > self.timeout + 60:
-                        logger.warning("Child failed to terminate, killing it..")
-                        self.cleanup_session()
-
-                        state = (None, "TimeoutError", {}, [])
-                        exec_time = self.timeout
-                        break
+            # deadline passed without hearing back from the child
+            if not child_in_overtime:
+                # [TODO] handle this in a better way
+                assert reset_session, "Timeout ocurred in interactive session"
+
+                # send interrupt to child
+                os.kill(self.process.pid, signal.SIGINT)  # type: ignore
+                child_in_overtime = True
+                # terminate if we're overtime by more than a minute
+                deadline += 60
+            else:
+                logger.warning("Child failed to terminate, killing it..")
+                self.cleanup_session()
+
+                state = (None, "TimeoutError", {}, [], None, None)
+                exec_time = self.timeout
+                child_killed = True
+                break
 
         output: list[str] = []
+        output_stats: dict = {}
         # read all stdout/stderr from child up to the EOF marker
         # waiting until the queue is empty is not enough since
         # the feeder thread in child might still be adding to the queue
-        while not self.result_outq.empty() or not output or output[-1] != "<|EOF|>":
-            output.append(self.result_outq.get())
-        output.pop()  # remove the EOF marker
+        while not child_killed and (
+            not self.result_outq.empty() or not output or output[-1] != "<|EOF|>"
+        ):
+            msg = self.result_outq.get()
+            if isinstance(msg, dict):
+                # output stats sent by a bounded capture
+                output_stats = msg
+                continue
+            output.append(msg)
+        if output:
+            output.pop()  # remove the EOF marker
 
-        e_cls_name, exc_info, exc_stack = state[1:]
+        e_cls_name, exc_info, exc_stack, child_end_time, resources = state[1:]
 
         if e_cls_name == "TimeoutError":
             output.append(
@@ -310,4 +1040,20 @@ class Interpreter:
             output.append(
                 f"Execution time: {humanize.naturaldelta(exec_time)} seconds (time limit is {humanize.naturaldelta(self.timeout)})."
             )
-        return ExecutionResult(output, exec_time, e_cls_name, exc_info, exc_stack)
+
+        run_time = time.time() - run_start
+        child_exec_time = (
+            child_end_time - child_start_time if child_end_time else exec_time
+        )
+        supervisor_time = max(0.0, run_time - child_exec_time)
+        logger.debug(f"REPL supervisor overhead: {1000 * supervisor_time:.1f}ms")
+        return ExecutionResult(
+            output,
+            exec_time,
+            e_cls_name,
+            exc_info,
+            exc_stack,
+            **output_stats,
+            supervisor_time=supervisor_time,
+            resources=resources,
+        )
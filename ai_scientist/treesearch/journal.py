@@ -1,19 +1,19 @@
 from __future__ import annotations
 import time
 import uuid
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Literal, Optional
 import copy
 import os
 import json
 
 from dataclasses_json import DataClassJsonMixin
+from .blob_store import MIN_BLOB_BYTES, BlobRef, BlobStore, approx_size
 from .interpreter import ExecutionResult
 from .utils.metric import MetricValue, WorstMetricValue
 from .utils.response import trim_long_string
 from .backend import FunctionSpec, query
 
-from rich import print
 
 import logging
 from pathlib import Path
@@ -40,8 +40,31 @@ node_selection_spec = FunctionSpec(
 )
 
 
-@dataclass(eq=False)
-class Node(DataClassJsonMixin):
+@dataclass
+class SubtreeStats:
+    """Aggregates of a node and its subtree, maintained incrementally by the Journal."""
+
+    root_id: str
+    depth: int = 0
+    debug_depth: int = 0
+    leaf_count: int = 1
+    buggy_leaf_count: int = 0
+    # best metric among the good nodes of the subtree
+    best_metric: MetricValue | None = None
+    best_node_id: str | None = None
+
+    @property
+    def all_leaves_buggy(self) -> bool:
+        return self.buggy_leaf_count == self.leaf_count
+
+
+class _NodeSlots:
+    # state kept by the journals containing a node (see `Journal.append`)
+    __slots__ = ("_journals", "_subtree_stats")
+
+
+@dataclass(eq=False, slots=True)
+class Node(_NodeSlots, DataClassJsonMixin):
     """A single node in the solution tree. Contains code, execution results, and evaluation information."""
 
     # ---- code & plan ----
@@ -65,6 +88,8 @@ class Node(DataClassJsonMixin):
     exc_type: str | None = field(default=None, kw_only=True)
     exc_info: dict | None = field(default=None, kw_only=True)
     exc_stack: list[tuple] | None = field(default=None, kw_only=True)
+    # cpu time, peak rss, context switches, i/o and spawned threads/processes
+    exec_resources: dict | None = field(default=None, kw_only=True)
 
     # ---- parsing info ----
     parse_metrics_plan: str = field(default="", kw_only=True)
@@ -74,6 +99,7 @@ class Node(DataClassJsonMixin):
     parse_exc_type: str | None = field(default=None, kw_only=True)
     parse_exc_info: dict | None = field(default=None, kw_only=True)
     parse_exc_stack: list[tuple] | None = field(default=None, kw_only=True)
+    parse_exec_resources: dict | None = field(default=None, kw_only=True)
 
     # ---- plot execution info ----
     plot_term_out: list[str] = field(default=None, kw_only=True)  # type: ignore
@@ -81,6 +107,7 @@ class Node(DataClassJsonMixin):
     plot_exc_type: str | None = field(default=None, kw_only=True)
     plot_exc_info: dict | None = field(default=None, kw_only=True)
     plot_exc_stack: list[tuple] | None = field(default=None, kw_only=True)
+    plot_exec_resources: dict | None = field(default=None, kw_only=True)
 
     # ---- evaluation ----
     # post-execution result analysis (findings/feedback)
@@ -125,6 +152,28 @@ class Node(DataClassJsonMixin):
         if self.parent is not None and not isinstance(self.parent, str):
             self.parent.children.add(self)
 
+    def __setattr__(self, name, value):
+        # (no zero-argument super() in a slots dataclass)
+        old_value = getattr(self, name, None) if name in _INDEXED_ATTRS else None
+        object.__setattr__(self, name, value)
+        # keep the index and change tracking of the journals containing this node up to date
+        for journal in getattr(self, "_journals", ()):
+            journal._node_updated(self, name, old_value)
+
+    def _raw_items(self):
+        """(name, value) of all set attributes, with offloaded fields as their `BlobRef`"""
+        for f in fields(self):
+            lazy = _LAZY_DESCRIPTORS.get(f.name)
+            try:
+                if lazy is not None:
+                    yield f.name, lazy.slot.__get__(self, Node)
+                else:
+                    yield f.name, getattr(self, f.name)
+            except AttributeError:
+                continue
+        # ad-hoc attributes such as `_agent`
+        yield from getattr(self, "__dict__", {}).items()
+
     def __deepcopy__(self, memo):
         # Create a new instance with copied attributes
         cls = self.__class__
@@ -132,7 +181,7 @@ class Node(DataClassJsonMixin):
         memo[id(self)] = result
 
         # Copy all attributes except parent and children to avoid circular references
-        for k, v in self.__dict__.items():
+        for k, v in self._raw_items():
             if k not in ("parent", "children"):
                 setattr(result, k, copy.deepcopy(v, memo))
 
@@ -144,16 +193,43 @@ class Node(DataClassJsonMixin):
 
     def __getstate__(self):
         """Return state for pickling"""
-        state = self.__dict__.copy()
-        # Ensure id is included in the state
-        if hasattr(self, "id"):
-            state["id"] = self.id
+        # offloaded fields are loaded, so that the pickle is self-contained;
+        # journals (and the stats they maintain) aren't sent along with the node
+        state = {}
+        for k, v in self._raw_items():
+            state[k] = v.load() if type(v) is BlobRef else v
         return state
 
     def __setstate__(self, state):
         """Set state during unpickling"""
-        # Ensure all required attributes are present
-        self.__dict__.update(state)
+        for k, v in state.items():
+            if k not in ("_journals", "_subtree_stats"):
+                object.__setattr__(self, k, v)
+
+    def offload(self, blobs: BlobStore, min_bytes: int = MIN_BLOB_BYTES) -> int:
+        """
+        Move the large values of `LAZY_FIELDS` to a blob store. Every access
+        returns a fresh copy from the store (see `BlobStore.get`), so they must be
+        replaced rather than modified in place afterwards. Returns the number of
+        offloaded fields.
+        """
+        offloaded = 0
+        for name, lazy in _LAZY_DESCRIPTORS.items():
+            value = lazy.slot.__get__(self, Node)
+            if value is None or type(value) is BlobRef:
+                continue
+            if approx_size(value) >= min_bytes:
+                lazy.slot.__set__(self, BlobRef(blobs, blobs.put(value)))
+                offloaded += 1
+        return offloaded
+
+    def blob_ref(self, name: str) -> BlobRef | None:
+        """The `BlobRef` of an offloaded field, None if the value is in memory."""
+        lazy = _LAZY_DESCRIPTORS.get(name)
+        if lazy is None:
+            return None
+        value = lazy.slot.__get__(self, Node)
+        return value if type(value) is BlobRef else None
 
     @property
     def stage_name(self) -> Literal["draft", "debug", "improve"]:
@@ -174,6 +250,7 @@ class Node(DataClassJsonMixin):
         self.exc_type = exec_result.exc_type
         self.exc_info = exec_result.exc_info
         self.exc_stack = exec_result.exc_stack
+        self.exec_resources = exec_result.resources
 
     def absorb_plot_exec_result(self, plot_exec_result: ExecutionResult):
         """Absorb the result of executing the plotting code from this node."""
@@ -182,6 +259,7 @@ class Node(DataClassJsonMixin):
         self.plot_exc_type = plot_exec_result.exc_type
         self.plot_exc_info = plot_exec_result.exc_info
         self.plot_exc_stack = plot_exec_result.exc_stack
+        self.plot_exec_resources = plot_exec_result.resources
 
     @property
     def term_out(self) -> str:
@@ -199,6 +277,11 @@ class Node(DataClassJsonMixin):
     def __hash__(self):
         return hash(self.id)
 
+    @property
+    def subtree_stats(self) -> SubtreeStats | None:
+        """Aggregates of this node's subtree, None until the node is added to a journal."""
+        return getattr(self, "_subtree_stats", None)
+
     @property
     def debug_depth(self) -> int:
         """
@@ -207,6 +290,9 @@ class Node(DataClassJsonMixin):
         - 1 if the parent is buggy but the skip parent isn't
         - n if there were n consecutive debugging steps
         """
+        stats = self.subtree_stats
+        if stats is not None:
+            return stats.debug_depth
         if self.stage_name != "debug":
             return 0
         return self.parent.debug_depth + 1  # type: ignore
@@ -231,10 +317,13 @@ class Node(DataClassJsonMixin):
             "parse_exc_type": self.parse_exc_type,
             "parse_exc_info": self.parse_exc_info,
             "parse_exc_stack": self.parse_exc_stack,
+            "parse_exec_resources": self.parse_exec_resources,
             "exec_time": self.exec_time,
             "exc_type": self.exc_type,
             "exc_info": self.exc_info,
             "exc_stack": self.exc_stack,
+            "exec_resources": self.exec_resources,
+            "plot_exec_resources": self.plot_exec_resources,
             "analysis": self.analysis,
             "exp_results_dir": (
                 str(Path(self.exp_results_dir).resolve().relative_to(os.getcwd()))
@@ -328,6 +417,47 @@ class Node(DataClassJsonMixin):
         return node
 
 
+class _LazyField:
+    """
+    Data descriptor wrapping the slot of a large `Node` field. The slot holds either
+    the value or a `BlobRef`, which is loaded from its store on access. The node
+    doesn't keep the loaded value, the store's LRU cache does.
+    """
+
+    __slots__ = ("slot",)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = self.slot.__get__(obj, objtype)
+        if type(value) is BlobRef:
+            return value.load()
+        return value
+
+    def __set__(self, obj, value):
+        self.slot.__set__(obj, value)
+
+
+# large node fields that can live in a blob store (see `Node.offload`)
+LAZY_FIELDS = (
+    "code",
+    "plot_code",
+    "parse_metrics_code",
+    "_term_out",
+    "parse_term_out",
+    "plot_term_out",
+    "analysis",
+    "plot_analyses",
+    "vlm_feedback_summary",
+)
+_LAZY_DESCRIPTORS = {name: _LazyField(Node.__dict__[name]) for name in LAZY_FIELDS}
+for _name, _descriptor in _LAZY_DESCRIPTORS.items():
+    setattr(Node, _name, _descriptor)
+
+
 @dataclass
 class InteractiveSession(DataClassJsonMixin):
     """
@@ -358,11 +488,79 @@ class InteractiveSession(DataClassJsonMixin):
         return "\n".join(trace).strip()
 
 
+# node partitions indexed by the journal
+_PARTITIONS = {
+    "draft": lambda n: n.parent is None,
+    "buggy": lambda n: bool(n.is_buggy),
+    "good": lambda n: n.is_buggy is False and n.is_buggy_plots is False,
+    "leaf": lambda n: not n.children,
+}
+# node attributes that change the partitions a node belongs to (or its subtree stats)
+_INDEXED_ATTRS = frozenset(
+    {"parent", "children", "is_buggy", "is_buggy_plots", "metric"}
+)
+
+
 @dataclass
 class Journal:
     """A collection of nodes representing the solution tree."""
 
     nodes: list[Node] = field(default_factory=list)
+    # LLM-based best node selections, memoized per `only_good` on the candidates and their metrics
+    _best_node_memo: dict = field(default_factory=dict, repr=False)
+    # number of get_best_node calls, LLM queries, memo hits and metric-only selections
+    best_node_stats: dict = field(
+        default_factory=lambda: {
+            "calls": 0,
+            "llm_queries": 0,
+            "memo_hits": 0,
+            "metric_only": 0,
+        },
+        repr=False,
+    )
+    # index maintained by `append` and by status updates of the nodes (see `Node.__setattr__`):
+    # node id -> position in `nodes`, and id -> node dicts per partition (see `_PARTITIONS`)
+    _positions: dict = field(default_factory=dict, repr=False)
+    _partitions: dict = field(
+        default_factory=lambda: {name: {} for name in _PARTITIONS}, repr=False
+    )
+    _unordered: set = field(default_factory=set, repr=False)
+    _indexed_len: int = field(default=0, repr=False)
+    # ids of the nodes appended or assigned to since the last `pop_changed`
+    _changed: set = field(default_factory=set, repr=False)
+    # bumped whenever a node is appended or assigned to (see `changed_since`), and the
+    # revision of each node's last change, ordered by revision
+    revision: int = field(default=0, repr=False)
+    _node_revisions: dict = field(default_factory=dict, repr=False)
+
+    def __getstate__(self):
+        # nodes don't pickle their journal registrations and subtree stats (see
+        # `Node.__getstate__`), so the index is rebuilt from the nodes instead
+        state = self.__dict__.copy()
+        for key in ("_positions", "_partitions", "_unordered"):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._positions = {}
+        self._partitions = {name: {} for name in _PARTITIONS}
+        self._unordered = set()
+        # -1: the nodes are unchanged, only the index is missing (see `_ensure_index`)
+        self._indexed_len = -1
+
+    def __deepcopy__(self, memo):
+        result = self.__class__.__new__(self.__class__)
+        memo[id(self)] = result
+        result.__setstate__(copy.deepcopy(self.__getstate__(), memo))
+        # a copied node keeps its original parent and no children (see
+        # `Node.__deepcopy__`), so link the copies with each other instead
+        copies = {node.id: node for node in result.nodes}
+        for node in result.nodes:
+            if node.parent is not None and node.parent.id in copies:
+                node.parent = copies[node.parent.id]
+                node.parent.children.add(node)
+        return result
 
     def __getitem__(self, idx: int) -> Node:
         return self.nodes[idx]
@@ -373,52 +571,247 @@ class Journal:
 
     def append(self, node: Node) -> None:
         """Append a new node to the journal."""
+        self._ensure_index()
         node.step = len(self.nodes)
         self.nodes.append(node)
+        self._positions[node.id] = node.step
+        self._indexed_len = len(self.nodes)
+        self._register(node)
+        self._index_node(node)
+        self._touch(node.id)
+        # the parent got a child, so it is no longer a leaf
+        if node.parent is not None and node.parent.id in self._positions:
+            self._index_node(node.parent)
+        object.__setattr__(node, "_subtree_stats", SubtreeStats(root_id=node.id))
+        self._update_identity(node)
+        self._update_aggregates(node)
+
+    def _register(self, node: Node) -> None:
+        """Let `node` notify this journal about attribute updates."""
+        journals = getattr(node, "_journals", None)
+        if journals is None:
+            journals = []
+            object.__setattr__(node, "_journals", journals)
+        if not any(j is self for j in journals):
+            journals.append(self)
+
+    def _ensure_index(self) -> None:
+        # rebuild the index if `nodes` was modified without going through `append`,
+        # or after unpickling or copying the journal
+        if self._indexed_len == len(self.nodes):
+            return
+        restored = self._indexed_len < 0
+        self._positions = {}
+        self._partitions = {name: {} for name in _PARTITIONS}
+        self._unordered = set()
+        for pos, node in enumerate(self.nodes):
+            self._positions[node.id] = pos
+            self._register(node)
+            self._index_node(node)
+            object.__setattr__(node, "_subtree_stats", SubtreeStats(root_id=node.id))
+        if not restored:
+            for node_id in self._positions:
+                self._touch(node_id)
+        for node in self.nodes:
+            if node.parent is None or node.parent.subtree_stats is None:
+                self._update_identity(node)
+        # children are appended after their parents
+        for node in reversed(self.nodes):
+            self._update_aggregates(node, propagate=False)
+        self._indexed_len = len(self.nodes)
+
+    def pop_changed(self) -> list[Node]:
+        """Nodes appended or assigned to since the last call, in journal order.
+        In-place updates of mutable attributes (e.g. appending to `node.plots`) aren't tracked."""
+        self._ensure_index()
+        changed = sorted(
+            self._positions[node_id]
+            for node_id in self._changed
+            if node_id in self._positions
+        )
+        self._changed = set()
+        return [self.nodes[pos] for pos in changed]
+
+    def changed_since(self, revision: int) -> list[Node]:
+        """Nodes appended or assigned to after `revision` (a past value of `self.revision`),
+        in journal order. Unlike `pop_changed`, this can be used by any number of readers."""
+        self._ensure_index()
+        changed = []
+        for node_id, node_revision in reversed(self._node_revisions.items()):
+            if node_revision <= revision:
+                break
+            if node_id in self._positions:
+                changed.append(self._positions[node_id])
+        return [self.nodes[pos] for pos in sorted(changed)]
+
+    def _touch(self, node_id: str) -> None:
+        self._changed.add(node_id)
+        self.revision += 1
+        # move the node to the end, so `_node_revisions` stays ordered by revision
+        self._node_revisions.pop(node_id, None)
+        self._node_revisions[node_id] = self.revision
+
+    def _node_updated(self, node: Node, attr: str, old_value) -> None:
+        """Called by nodes of this journal when one of their attributes is assigned."""
+        if node.id not in self._positions:
+            return
+        self._touch(node.id)
+        if attr not in _INDEXED_ATTRS:
+            return
+        self._index_node(node)
+        if node.subtree_stats is None:
+            return
+        if attr == "parent":
+            if old_value is not None:
+                self._update_aggregates(old_value)
+            self._update_identity(node)
+        elif attr == "is_buggy":
+            # the debug depth of the children depends on whether this node is buggy
+            for child in node.children:
+                self._update_identity(child)
+        self._update_aggregates(node)
+
+    @staticmethod
+    def _update_identity(node: Node) -> None:
+        """Recompute root id, depth and debug depth of `node` and its descendants."""
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            stats = n.subtree_stats
+            if stats is None:
+                continue
+            parent = n.parent
+            if parent is None:
+                stats.root_id, stats.depth, stats.debug_depth = n.id, 0, 0
+            else:
+                parent_stats = parent.subtree_stats
+                if parent_stats is None:
+                    # parent isn't in a journal, fall back to walking the ancestors
+                    root, depth = parent, 1
+                    while root.parent is not None:
+                        root, depth = root.parent, depth + 1
+                    parent_stats = SubtreeStats(
+                        root_id=root.id, depth=depth - 1, debug_depth=parent.debug_depth
+                    )
+                stats.root_id = parent_stats.root_id
+                stats.depth = parent_stats.depth + 1
+                stats.debug_depth = parent_stats.debug_depth + 1 if parent.is_buggy else 0
+            stack.extend(n.children)
+
+    @staticmethod
+    def _update_aggregates(node: Node, propagate: bool = True) -> None:
+        """Recompute leaf counts and the best metric of `node` (and its ancestors) from its children."""
+        n = node
+        while n is not None:
+            stats = n.subtree_stats
+            if stats is None:
+                break
+            children = [c.subtree_stats for c in n.children if c.subtree_stats]
+            if children:
+                stats.leaf_count = sum(c.leaf_count for c in children)
+                stats.buggy_leaf_count = sum(c.buggy_leaf_count for c in children)
+            else:
+                stats.leaf_count = 1
+                stats.buggy_leaf_count = 1 if n.is_buggy else 0
+            best_metric, best_node_id = None, None
+            if _PARTITIONS["good"](n) and n.metric is not None:
+                best_metric, best_node_id = n.metric, n.id
+            for c in children:
+                if c.best_metric is not None and (
+                    best_metric is None or c.best_metric > best_metric
+                ):
+                    best_metric, best_node_id = c.best_metric, c.best_node_id
+            stats.best_metric, stats.best_node_id = best_metric, best_node_id
+            if not propagate:
+                break
+            n = n.parent
+
+    def _index_node(self, node: Node) -> None:
+        """(Re)classify a node into the draft/buggy/good/leaf partitions."""
+        pos = self._positions.get(node.id)
+        if pos is None:
+            return
+        for name, belongs in _PARTITIONS.items():
+            partition = self._partitions[name]
+            if belongs(node):
+                if node.id in partition:
+                    continue
+                # partitions are kept in journal order, re-sorted lazily if a
+                # status change inserts a node behind a later one
+                if partition and self._positions[next(reversed(partition))] > pos:
+                    self._unordered.add(name)
+                partition[node.id] = node
+            else:
+                partition.pop(node.id, None)
+
+    def _partition(self, name: str) -> list[Node]:
+        self._ensure_index()
+        partition = self._partitions[name]
+        if name in self._unordered:
+            ordered = sorted(partition.values(), key=lambda n: self._positions[n.id])
+            self._partitions[name] = partition = {n.id: n for n in ordered}
+            self._unordered.discard(name)
+        return list(partition.values())
 
     @property
     def draft_nodes(self) -> list[Node]:
         """Return a list of nodes representing intial coding drafts"""
-        return [n for n in self.nodes if n.parent is None]
+        return self._partition("draft")
 
     @property
     def buggy_nodes(self) -> list[Node]:
         """Return a list of nodes that are considered buggy by the agent."""
-        return [n for n in self.nodes if n.is_buggy]
+        return self._partition("buggy")
 
     @property
     def good_nodes(self) -> list[Node]:
         """Return a list of nodes that are not considered buggy by the agent."""
-        list_of_nodes = [
-            [
-                n.step,
-                n.parent.step if n.parent else None,
-                n.id,
-                n.is_buggy,
-                n.is_buggy_plots,
-            ]
-            for n in self.nodes
-        ]
-        print(
-            f"[purple]all nodes ID and is_buggy/is_buggy_plots flags: {list_of_nodes}[/purple]"
-        )
-        return [
-            n for n in self.nodes if n.is_buggy is False and n.is_buggy_plots is False
-        ]
+        return self._partition("good")
+
+    @property
+    def leaf_nodes(self) -> list[Node]:
+        """Return a list of nodes without children."""
+        return self._partition("leaf")
 
     def get_node_by_id(self, node_id: str) -> Optional[Node]:
         """Get a node by its ID."""
-        for node in self.nodes:
-            if node.id == node_id:
-                return node
-        return None
+        self._ensure_index()
+        pos = self._positions.get(node_id)
+        return None if pos is None else self.nodes[pos]
+
+    def _best_good_node(self) -> Optional[Node]:
+        """Good node with the best metric, from the subtree stats of the drafts."""
+        self._ensure_index()
+        best = None
+        for root in self._partitions["draft"].values():
+            stats = root.subtree_stats
+            if stats is None:
+                # not maintained for this tree, scan all good nodes instead
+                candidates = [n for n in self.good_nodes if n.metric is not None]
+                return max(candidates, key=lambda n: n.metric, default=None)
+            if stats.best_metric is not None and (
+                best is None or stats.best_metric > best.best_metric
+            ):
+                best = stats
+        return None if best is None else self.get_node_by_id(best.best_node_id)
 
     def get_metric_history(self) -> list[MetricValue]:
         """Return a list of all metric values in the journal."""
         return [n.metric for n in self.nodes]
 
     def get_best_node(self, only_good=True, use_val_metric_only=False) -> None | Node:
-        """Return the best solution found so far."""
+        """
+        Return the best solution found so far.
+
+        The best node is selected by an LLM, which is only queried again when the
+        candidate nodes or their metrics change. Callers that only need to display
+        the best node (UI, exports) should pass use_val_metric_only=True, which
+        picks the node with the best metric without querying the LLM.
+        """
+        self.best_node_stats["calls"] += 1
+        if only_good and use_val_metric_only:
+            self.best_node_stats["metric_only"] += 1
+            return self._best_good_node()
         if only_good:
             nodes = self.good_nodes
             if not nodes:
@@ -427,11 +820,22 @@ class Journal:
             nodes = self.nodes
 
         if use_val_metric_only:
+            self.best_node_stats["metric_only"] += 1
             return max(nodes, key=lambda n: n.metric)
 
         if len(nodes) == 1:
             return nodes[0]
 
+        memo_key = tuple(
+            sorted((n.id, repr(n.metric.value) if n.metric else None) for n in nodes)
+        )
+        memo = self._best_node_memo.get(only_good)
+        if memo is not None and memo[0] == memo_key:
+            selected_node = next((n for n in nodes if n.id == memo[1]), None)
+            if selected_node is not None:
+                self.best_node_stats["memo_hits"] += 1
+                return selected_node
+
         # Create evaluation prompt for LLM
         prompt = {
             "Introduction": (
@@ -467,6 +871,7 @@ class Journal:
                 prompt["Candidates"] += candidate_info
 
         try:
+            self.best_node_stats["llm_queries"] += 1
             selection = query(
                 system_message=prompt,
                 user_message=None,
@@ -485,6 +890,7 @@ class Journal:
                     f"Selected node {selected_node.id} as best implementation"
                 )
                 logger.warning(f"Reasoning: {selection['reasoning']}")
+                self._best_node_memo[only_good] = (memo_key, selected_node.id)
                 return selected_node
             else:
                 logger.warning("Falling back to metric-based selection")
@@ -556,6 +962,20 @@ class Journal:
         """Convert journal to a JSON-serializable dictionary"""
         return {"nodes": [node.to_dict() for node in self.nodes]}
 
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Journal":
+        """Create a Journal from `to_dict` output or a dict written by `serialize.dumps_json`"""
+        journal = cls()
+        node2parent = data.get("node2parent", {})
+        # nodes are stored in step order, so parents are appended before their children
+        for node_data in data["nodes"]:
+            node = Node.from_dict(node_data, journal)
+            if node.id in node2parent:
+                node.parent = journal.get_node_by_id(node2parent[node.id])
+                node.__post_init__()
+            journal.append(node)
+        return journal
+
     def save_experiment_notes(self, workspace_dir: str, stage_name: str):
         """Save experimental notes and summaries to files"""
         notes_dir = os.path.join(workspace_dir, "experiment_notes")
@@ -583,15 +1003,16 @@ class Journal:
                     json.dump(summary, f, indent=2)
 
         # Generate and save stage summary using the already collected summaries
+        best_node = self.get_best_node()
         summary_prompt = {
             "Introduction": "Synthesize the experimental findings from this stage",
             "Node Summaries": node_summaries,
             "Best Node": (
                 {
-                    "id": self.get_best_node().id,
-                    "metric": str(self.get_best_node().metric),
+                    "id": best_node.id,
+                    "metric": str(best_node.metric),
                 }
-                if self.get_best_node()
+                if best_node
                 else None
             ),
         }
@@ -0,0 +1,182 @@
+"""
+Append-only log of the tree search, written while the experiment runs.
+
+`save_run` snapshots a whole journal, and `AgentManager._save_checkpoint` pickles
+all journals only at the end of a main stage, so a crash loses the work of the
+current stage. This log instead receives, after every step, one record per node
+that was added or changed since the previous step, plus records for stage
+creation and transitions. Each flush is a single append terminated by a commit
+record and fsynced, so after a crash the log holds either the whole batch or
+none of it. `load_journal_log` replays the committed records into journals,
+which `AgentManager` uses to resume a run.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+from .journal import Journal, Node
+
+logger = logging.getLogger("ai-scientist")
+
+
+def _node_record(node: Node) -> dict:
+    data = node.to_dict()
+    # children are restored from the parent ids of the children
+    data.pop("children", None)
+    return data
+
+
+class JournalLog:
+    def __init__(self, path: Path | str, fsync: bool = True):
+        """
+        Args:
+            path (Path | str): the JSONL log file, created on the first flush and appended to afterwards
+            fsync (bool, optional): whether to fsync after every flush, so that committed batches survive a host crash and not only a process crash. Defaults to True.
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        # (stage, node id) -> digest of the last record written for the node
+        self._digests: dict[tuple[str, str], str] = {}
+        self._pending: list[str] = []
+        self._discard_torn_tail()
+
+    def _discard_torn_tail(self) -> None:
+        """Cut a partially written last line, so new records don't get appended to it."""
+        try:
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def record(self, record_type: str, **data) -> None:
+        """Queue a record for the next flush."""
+        self._pending.append(json.dumps({"type": record_type, **data}))
+
+    def record_nodes(self, stage_name: str, nodes: Iterable[Node]) -> int:
+        """Queue the nodes whose serialized form changed since they were last written."""
+        queued = 0
+        for node in nodes:
+            line = json.dumps(_node_record(node))
+            digest = hashlib.sha1(line.encode()).hexdigest()
+            key = (stage_name, node.id)
+            if self._digests.get(key) == digest:
+                continue
+            self._digests[key] = digest
+            self._pending.append(
+                f'{{"type": "node", "stage": {json.dumps(stage_name)}, "node": {line}}}'
+            )
+            queued += 1
+        return queued
+
+    def flush(self) -> int:
+        """Append the queued records as one committed batch. Returns the number of records."""
+        if not self._pending:
+            return 0
+        num_records = len(self._pending)
+        self.record("commit", records=num_records)
+        data = ("\n".join(self._pending) + "\n").encode()
+        self._pending = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        return num_records
+
+    def mark_written(self, stage_name: str, record: dict) -> None:
+        """Register a node record that is already in the log (when resuming)."""
+        line = json.dumps(record)
+        self._digests[(stage_name, record["id"])] = hashlib.sha1(
+            line.encode()
+        ).hexdigest()
+
+
+def read_committed_records(path: Path | str) -> list[dict]:
+    """Records of all committed batches, in order. Records after the last commit are dropped."""
+    records, batch = [], []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # torn write: the batch never got its commit record
+                batch = []
+                continue
+            if record.get("type") == "commit":
+                records.extend(batch)
+                batch = []
+            else:
+                batch.append(record)
+    if batch:
+        logger.warning(f"Ignoring {len(batch)} uncommitted records at the end of {path}")
+    return records
+
+
+def load_journal_log(path: Path | str) -> dict:
+    """
+    Replay a journal log. Returns a dict with
+    - "records": the committed records
+    - "stages": stage records (dicts with "stage" and "main"), in creation order
+    - "transitions": stage transition dicts, in order
+    - "journals": stage name -> Journal rebuilt from the latest record of each node
+    - "node_records": (stage name, node record) of the latest record of each node
+    - "finished": whether the run completed
+    """
+    records = read_committed_records(path)
+    stages, transitions = [], []
+    latest: dict[str, dict] = {}
+    stage_nodes: dict[str, list[str]] = {}
+    node_records: dict[tuple[str, str], dict] = {}
+    finished = False
+    for record in records:
+        record_type = record.get("type")
+        if record_type == "stage":
+            stages.append(record)
+        elif record_type == "transition":
+            transitions.append(record["transition"])
+        elif record_type == "node":
+            data = record["node"]
+            latest[data["id"]] = data
+            order = stage_nodes.setdefault(record["stage"], [])
+            if (record["stage"], data["id"]) not in node_records:
+                order.append(data["id"])
+            node_records[(record["stage"], data["id"])] = data
+        elif record_type == "finished":
+            finished = True
+
+    nodes = {
+        node_id: Node.from_dict({k: v for k, v in data.items() if k != "parent_id"})
+        for node_id, data in latest.items()
+    }
+    for node_id, data in latest.items():
+        parent = nodes.get(data.get("parent_id"))
+        if parent is not None:
+            nodes[node_id].parent = parent
+            parent.children.add(nodes[node_id])
+
+    journals = {}
+    for stage_name, node_ids in stage_nodes.items():
+        journal = Journal()
+        for node_id in node_ids:
+            journal.append(nodes[node_id])
+        journals[stage_name] = journal
+
+    return {
+        "records": records,
+        "stages": stages,
+        "transitions": transitions,
+        "journals": journals,
+        "node_records": list(node_records.items()),
+        "finished": finished,
+    }
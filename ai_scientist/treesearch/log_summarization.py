@@ -2,15 +2,15 @@ import json
 import os
 import sys
 
-import openai
 
 from .journal import Node, Journal
 
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 sys.path.insert(0, parent_dir)
 from ai_scientist.llm import get_response_from_llm, extract_json_between_markers
+from ai_scientist.utils import llm_clients
 
-client = openai.OpenAI()
+client = llm_clients.get_client("openai")
 model = "gpt-4o-2024-08-06"
 
 report_summarizer_sys_msg = """You are an expert machine learning researcher.
@@ -1,20 +1,38 @@
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from typing import List, Optional, Set, Any, Callable, cast, Dict, Tuple
 import random
 import subprocess
 import os
+import time
 from queue import Queue
 import logging
 import humanize
 from .backend import FunctionSpec, compile_prompt_to_md, query
+from .blob_store import BlobStore
+from .exec_cache import ExecutionCache
+from .pipeline import (
+    SlotOccupancy,
+    execution_slot,
+    init_worker,
+    make_slot_queue,
+)
 from .interpreter import ExecutionResult
 from .journal import Journal, Node
+from .selection import make_policy
 from .utils import data_preview
 from .utils.config import Config
 from .utils.metric import MetricValue, WorstMetricValue
 from .utils.response import extract_code, extract_text_up_to_code, wrap_code
+from ai_scientist.utils.token_tracker import set_stage
+from . import tracing
+from .tracing import traced
+from .work_order import (
+    make_result_delta,
+    make_work_order,
+    merge_result_delta,
+    read_work_order,
+)
 import copy
-import pickle
 from dataclasses import asdict
 from omegaconf import OmegaConf
 
@@ -28,14 +46,41 @@ logger = logging.getLogger("ai-scientist")
 ExecCallbackType = Callable[[str, bool], ExecutionResult]
 
 
-def _safe_pickle_test(obj, name="object"):
-    """Test if an object can be pickled"""
-    try:
-        pickle.dumps(obj)
-        return True
-    except Exception as e:
-        logger.error(f"Cannot pickle {name}: {str(e)}")
-        return False
+def _output_capture_kwargs(cfg: Config) -> dict:
+    """Interpreter keyword arguments for the configured output capture mode."""
+    capture = cfg.exec.output_capture
+    return {
+        "output_mode": capture.mode,
+        "output_chunk_chars": capture.chunk_chars,
+        "output_head_chars": capture.head_chars,
+        "output_tail_chars": capture.tail_chars,
+    }
+
+
+def _resource_limit_kwargs(cfg: Config) -> dict:
+    """Interpreter keyword arguments for the configured per-execution resource limits."""
+    limits = cfg.exec.limits
+    return {
+        "max_memory_mb": limits.memory_mb,
+        "max_rss_mb": limits.rss_mb,
+        "max_cpu_seconds": limits.cpu_seconds,
+        "max_open_files": limits.open_files,
+        "max_threads": limits.threads,
+    }
+
+
+def _execution_cache(cfg: Config) -> ExecutionCache | None:
+    """The shared execution cache if it is enabled."""
+    cache_cfg = cfg.exec.cache
+    if not cache_cfg.enabled:
+        return None
+    return ExecutionCache(
+        cache_cfg.dir or Path(cfg.workspace_dir) / "exec_cache",
+        input_dirs=[Path(cfg.workspace_dir) / "input"],
+        max_size_mb=cache_cfg.max_size_mb,
+        max_age_hours=cache_cfg.max_age_hours,
+        max_entry_mb=cache_cfg.max_entry_mb,
+    )
 
 
 def _parse_keyword_prefix_response(
@@ -450,6 +495,7 @@ class MinimalAgent:
             )
         }
 
+    @traced("draft")
     def _draft(self) -> Node:
         prompt: Any = {
             "Introduction": (
@@ -491,6 +537,7 @@ class MinimalAgent:
         print("MinimalAgent: Draft complete")
         return Node(plan=plan, code=code)
 
+    @traced("debug")
     def _debug(self, parent_node: Node) -> Node:
         prompt: Any = {
             "Introduction": (
@@ -520,6 +567,7 @@ class MinimalAgent:
         plan, code = self.plan_and_code_query(prompt)
         return Node(plan=plan, code=code, parent=parent_node)
 
+    @traced("improve")
     def _improve(self, parent_node: Node) -> Node:
         prompt: Any = {
             "Introduction": (
@@ -546,6 +594,7 @@ class MinimalAgent:
             parent=parent_node,
         )
 
+    @traced("seed_node")
     def _generate_seed_node(self, parent_node: Node):
         return Node(
             plan="Seed node",
@@ -554,6 +603,7 @@ class MinimalAgent:
             is_seed_node=True,
         )
 
+    @traced("hyperparam_node")
     def _generate_hyperparam_tuning_node(
         self, parent_node: Node, hyperparam_idea: HyperparamTuningIdea
     ):
@@ -602,6 +652,7 @@ class MinimalAgent:
             hyperparam_name=hyperparam_idea.name,
         )
 
+    @traced("ablation_node")
     def _generate_ablation_node(self, parent_node: Node, ablation_idea: AblationIdea):
         prompt: Any = {
             "Introduction": (
@@ -680,6 +731,7 @@ class MinimalAgent:
         print("Final plan + code extraction attempt failed, giving up...")
         return "", completion_text  # type: ignore
 
+    @traced("review")
     def parse_exec_result(
         self, node: Node, exec_result: ExecutionResult, workspace: str
     ):
@@ -717,6 +769,7 @@ class MinimalAgent:
         )
         print(response)
 
+    @traced("plot_codegen")
     def _generate_plotting_code(
         self, node: Node, working_dir: str, plot_code_from_prev_stage: str = None
     ) -> str:
@@ -891,6 +944,7 @@ class MinimalAgent:
         )
         return [""]
 
+    @traced("vlm_analysis")
     def _analyze_plots_with_vlm(self, node: Node) -> None:
         """Analyze experimental plots using VLM"""
         if not node.plot_paths:
@@ -1117,6 +1171,107 @@ class GPUManager:
             del self.gpu_assignments[process_id]
 
 
+def get_available_memory_mb() -> float | None:
+    """Get the memory available to new processes on this host, None if unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (ValueError, OSError):
+        return None
+
+
+class MemoryAdmissionController:
+    """Delays submitting new nodes to the process pool while host memory is low"""
+
+    def __init__(
+        self,
+        min_free_memory_mb: int,
+        poll_interval: float = 5.0,
+        max_wait: float | None = 600.0,
+    ):
+        self.min_free_memory_mb = min_free_memory_mb
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+
+    def admit(self, running: List[Future]) -> float:
+        """
+        Blocks until the host has at least `min_free_memory_mb` available or
+        `max_wait` seconds have passed, and returns the time spent waiting.
+        While waiting, wakes up early when one of the `running` futures finishes,
+        since that is what usually frees memory.
+        """
+        if self.min_free_memory_mb <= 0:
+            return 0.0
+        start = time.time()
+        warned = False
+        while True:
+            available = get_available_memory_mb()
+            if available is None or available >= self.min_free_memory_mb:
+                break
+            waited = time.time() - start
+            if self.max_wait is not None and waited >= self.max_wait:
+                logger.warning(
+                    f"Only {available:.0f}MB memory available after waiting {waited:.0f}s, submitting anyway"
+                )
+                break
+            if not warned:
+                logger.info(
+                    f"Only {available:.0f}MB memory available (< {self.min_free_memory_mb}MB), delaying submission"
+                )
+                warned = True
+            pending = [f for f in running if not f.done()]
+            if pending:
+                wait(pending, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(self.poll_interval)
+        return time.time() - start
+
+
+class WorkerUtilization:
+    """Tracks how busy the worker slots are, as seen from the main process"""
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self.start_time: Optional[float] = None
+        self.busy_time = 0.0
+        self.completed = 0
+        self._running: Dict[Future, float] = {}  # future -> submit time
+
+    def task_started(self, future: Future):
+        now = time.time()
+        if self.start_time is None:
+            self.start_time = now
+        self._running[future] = now
+        # runs in the executor's management thread as soon as the worker is done,
+        # not when the main process gets around to collecting the result
+        future.add_done_callback(self._task_finished)
+
+    def _task_finished(self, future: Future):
+        started = self._running.pop(future, None)
+        if started is not None:
+            self.busy_time += time.time() - started
+            self.completed += 1
+
+    def summary(self) -> Dict[str, float]:
+        if self.start_time is None:
+            return {"utilization": 0.0, "completed": 0, "running": 0, "elapsed": 0.0}
+        now = time.time()
+        elapsed = now - self.start_time
+        busy = self.busy_time + sum(now - t for t in list(self._running.values()))
+        return {
+            "utilization": busy / (self.num_workers * elapsed) if elapsed else 0.0,
+            "completed": self.completed,
+            "running": len(self._running),
+            "elapsed": elapsed,
+        }
+
+
 def get_gpu_count() -> int:
     """Get number of available NVIDIA GPUs without using torch"""
     try:
@@ -1180,7 +1335,52 @@ class ParallelAgent:
             logger.info(f"Limiting workers to {self.num_workers} to match GPU count")
 
         self.timeout = self.cfg.exec.timeout
-        self.executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        self.start_time = time.time()
+        Path(self.cfg.log_dir).mkdir(parents=True, exist_ok=True)
+        if not os.environ.get(tracing.ENV_TRACE_FILE):
+            # the slot occupancy is computed from the execution spans
+            tracing.configure(Path(self.cfg.log_dir) / "trace_spans.jsonl")
+        self.trace_path = Path(os.environ[tracing.ENV_TRACE_FILE])
+        self.occupancy = SlotOccupancy(self.trace_path, since=self.start_time)
+        self.num_exec_slots = self.num_workers
+        slots = None
+        if self.cfg.agent.pipeline.enabled:
+            # workers only hold an execution slot (and its GPU) while running code,
+            # so more of them than slots keep the slots busy during LLM calls
+            slots = make_slot_queue(
+                [str(i) for i in range(self.num_exec_slots)]
+                if self.num_gpus > 0
+                else [f"cpu{i}" for i in range(self.num_exec_slots)]
+            )
+            self.gpu_manager = None
+            self.num_workers = (
+                self.cfg.agent.pipeline.llm_workers or 2 * self.num_exec_slots
+            )
+            logger.info(
+                f"Pipelined execution: {self.num_workers} workers sharing {self.num_exec_slots} execution slots"
+            )
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            initializer=init_worker,
+            initargs=(slots,),
+        )
+        admission = self.cfg.exec.admission
+        self.admission = MemoryAdmissionController(
+            admission.min_free_memory_mb,
+            poll_interval=admission.poll_interval,
+            max_wait=admission.max_wait,
+        )
+        self.exec_cache = _execution_cache(self.cfg)
+        # large node fields exchanged with the workers
+        self.blobs = BlobStore(Path(self.cfg.log_dir) / "blobs")
+        self.utilization = WorkerUtilization(self.num_workers)
+        self.selection_policy = make_policy(self.cfg.agent.search)
+        # steady-state scheduling: running futures -> (GPU process id, result deadline)
+        self._in_flight: Dict[Future, Tuple[str, float]] = {}
+        # in-flight futures past their deadline: their worker is still running, so
+        # they keep their slot and GPU until they finish
+        self._overdue: Set[Future] = set()
+        self._slot_counter = 0
         self._is_shutdown = False
         # Define the metric once at initialization
         self.evaluation_metrics = self._define_global_metrics()
@@ -1190,6 +1390,14 @@ class ParallelAgent:
         self._hyperparam_tuning_state = {  # store hyperparam tuning ideas
             "tried_hyperparams": set(),
         }
+        # ideas of the nodes already in the journal (e.g. of a resumed run) were tried
+        for node in self.journal.nodes:
+            if node.hyperparam_name is not None:
+                self._hyperparam_tuning_state["tried_hyperparams"].add(
+                    node.hyperparam_name
+                )
+            if node.ablation_name is not None:
+                self._ablation_state["completed_ablations"].add(node.ablation_name)
 
     def _define_global_metrics(self) -> str:
         """Define eval metric to be used across all experiments"""
@@ -1258,12 +1466,11 @@ class ParallelAgent:
             is_seed_agg_node=True,
         )
 
+    @traced("multi_seed_eval")
     def _run_multi_seed_evaluation(self, node: Node) -> List[Node]:
         """Run multiple seeds of the same node to get statistical metrics.
         Returns a list of nodes with different random seeds."""
 
-        # Convert node to dict for parallel processing
-        node_data = node.to_dict()
         node_code = node.code
 
         # Submit parallel jobs for different seeds
@@ -1282,9 +1489,11 @@ class ParallelAgent:
                     )
 
             # Add seed to node code
-            node_data["code"] = (
-                f"# Set random seed\nimport random\nimport numpy as np\nimport torch\n\nseed = {seed}\nrandom.seed(seed)\nnp.random.seed(seed)\ntorch.manual_seed(seed)\nif torch.cuda.is_available():\n    torch.cuda.manual_seed(seed)\n\n"
-                + node_code
+            node_data = make_work_order(
+                node,
+                self.blobs,
+                code=f"# Set random seed\nimport random\nimport numpy as np\nimport torch\n\nseed = {seed}\nrandom.seed(seed)\nnp.random.seed(seed)\ntorch.manual_seed(seed)\nif torch.cuda.is_available():\n    torch.cuda.manual_seed(seed)\n\n"
+                + node_code,
             )
 
             new_ablation_idea = None
@@ -1295,6 +1504,7 @@ class ParallelAgent:
             seed_eval = True
             memory_summary = ""
             print("[yellow]Starting multi-seed eval...[/yellow]")
+            self.admission.admit(futures)
             futures.append(
                 self.executor.submit(
                     self._process_node_wrapper,
@@ -1311,13 +1521,14 @@ class ParallelAgent:
                     best_stage2_plot_code,
                     best_stage3_plot_code,
                     seed_eval,
+                    tracing.current_span_id(),
                 )
             )
 
         for future in futures:
             try:
                 result_data = future.result(timeout=self.timeout)
-                result_node = Node.from_dict(result_data, self.journal)
+                result_node = merge_result_delta(result_data, self.blobs, self.journal)
                 print(f"Parent node id: {result_node.parent.id}")
                 print(f"Sanity check: actual parent node id: {node.id}")
                 # Add node to journal's list and assign its step number
@@ -1329,6 +1540,7 @@ class ParallelAgent:
 
         return seed_nodes
 
+    @traced("plot_aggregation")
     def _run_plot_aggregation(self, node: Node, seed_nodes: List[Node]) -> Node:
         """Generate an aggregation node for seed evaluation results"""
         if seed_nodes:
@@ -1352,6 +1564,10 @@ class ParallelAgent:
                     format_tb_ipython=self.cfg.exec.format_tb_ipython,
                     agent_file_name=self.cfg.exec.agent_file_name,
                     env_vars={"AI_SCIENTIST_ROOT": os.getenv("AI_SCIENTIST_ROOT")},
+                    preload_modules=list(self.cfg.exec.preload_modules),
+                    **_output_capture_kwargs(self.cfg),
+                    **_resource_limit_kwargs(self.cfg),
+                    cache=self.exec_cache,
                 )
 
                 try:
@@ -1421,21 +1637,28 @@ class ParallelAgent:
         best_stage2_plot_code=None,
         best_stage1_plot_code=None,
         seed_eval=False,
+        trace_parent=None,
     ):
         """Wrapper function that creates a fresh environment for each process"""
         from .interpreter import Interpreter
-        from .journal import Node, Journal
+        from .journal import Journal
         from copy import deepcopy
         import os
         import multiprocessing
 
         print("Starting _process_node_wrapper")
+        # LLM usage of this node is reported under its stage
+        set_stage(stage_name)
+        node_span = tracing.start_span(
+            "node", parent=trace_parent, stage=stage_name, seed_eval=seed_eval
+        )
 
         # Create process-specific workspace
         process_id = multiprocessing.current_process().name
         workspace = os.path.join(cfg.workspace_dir, f"process_{process_id}")
         os.makedirs(workspace, exist_ok=True)
         print(f"Process {process_id} using workspace: {workspace}")
+        blobs = BlobStore(Path(cfg.log_dir) / "blobs")
         # Create process-specific working directory
         working_dir = os.path.join(workspace, "working")
         os.makedirs(working_dir, exist_ok=True)
@@ -1463,13 +1686,17 @@ class ParallelAgent:
             timeout=cfg.exec.timeout,
             format_tb_ipython=cfg.exec.format_tb_ipython,
             agent_file_name=cfg.exec.agent_file_name,
+            preload_modules=list(cfg.exec.preload_modules),
+            **_output_capture_kwargs(cfg),
+            **_resource_limit_kwargs(cfg),
+            cache=_execution_cache(cfg),
         )
 
         try:
             print(f"stage_name: {stage_name}")
-            # Recreate node object from node_data, which becomes a parent node.
+            # Recreate node object from the work order, which becomes a parent node.
             if node_data:
-                parent_node = Node.from_dict(node_data, journal=None)
+                parent_node = read_work_order(node_data, blobs)
                 print(f"Recreated parent node: {parent_node.id}")
             else:
                 parent_node = None
@@ -1523,7 +1750,8 @@ class ParallelAgent:
 
             # Execute and parse results
             print("Running code")
-            exec_result = process_interpreter.run(child_node.code, True)
+            with execution_slot("exec"):
+                exec_result = process_interpreter.run(child_node.code, True)
             process_interpreter.cleanup_session()
 
             print("Parsing execution results")
@@ -1594,14 +1822,16 @@ class ParallelAgent:
                     child_node.parse_metrics_code = parse_metrics_code
                 try:
                     # Execute the parsing code
-                    metrics_exec_result = process_interpreter.run(
-                        parse_metrics_code, True
-                    )
+                    with execution_slot("parse_metrics"):
+                        metrics_exec_result = process_interpreter.run(
+                            parse_metrics_code, True
+                        )
                     process_interpreter.cleanup_session()
                     child_node.parse_term_out = metrics_exec_result.term_out
                     child_node.parse_exc_type = metrics_exec_result.exc_type
                     child_node.parse_exc_info = metrics_exec_result.exc_info
                     child_node.parse_exc_stack = metrics_exec_result.exc_stack
+                    child_node.parse_exec_resources = metrics_exec_result.resources
 
                     if metrics_exec_result.exc_type is None:
                         # Extract metrics from the execution output
@@ -1692,9 +1922,13 @@ class ParallelAgent:
                             plotting_code = worker_agent._generate_plotting_code(
                                 child_node, working_dir, plot_code_from_prev_stage
                             )
-                        plot_exec_result = process_interpreter.run(plotting_code, True)
+                        with execution_slot("plot"):
+                            plot_exec_result = process_interpreter.run(
+                                plotting_code, True
+                            )
                         process_interpreter.cleanup_session()
                         child_node.plot_exec_result = plot_exec_result
+                        child_node.plot_exec_resources = plot_exec_result.resources
                         if child_node.plot_exc_type and retry_count < 3:
                             print(
                                 f"[red]Plotting code failed with exception: {child_node.plot_exc_type}[/red]"
@@ -1780,15 +2014,16 @@ class ParallelAgent:
                             f"Error analyzing plots for node {child_node.id}: {str(e)}"
                         )
 
-            # Convert result node to dict
-            print("Converting result to dict")
-            result_data = child_node.to_dict()
-            print(f"Result data keys: {result_data.keys()}")
-            print(f"Result data size: {len(str(result_data))} chars")
+            # Send the result node back as a delta, large fields go through the blob store
+            print("Encoding result node")
+            result_data = make_result_delta(child_node, blobs)
+            print(f"Result data size: {len(result_data['node'])} bytes")
             print("Returning result")
+            node_span.end(node_id=child_node.id, is_buggy=child_node.is_buggy)
             return result_data
 
         except Exception as e:
+            node_span.end(error=type(e).__name__)
             print(f"Worker process error: {str(e)}")
             import traceback
 
@@ -1918,18 +2153,11 @@ class ParallelAgent:
         )
         return AblationIdea(name="add one more layer", description="add one more layer")
 
-    def _get_leaves(self, node: Node) -> List[Node]:
-        """Get all leaf nodes in the subtree rooted at node."""
-        if not node.children:
-            return [node]
-
-        leaves = []
-        for child in node.children:
-            leaves.extend(self._get_leaves(child))
-        return leaves
-
-    def _select_parallel_nodes(self) -> List[Optional[Node]]:
-        """Select N nodes to process in parallel,
+    @traced("select")
+    def _select_parallel_nodes(
+        self, num_nodes: Optional[int] = None
+    ) -> List[Optional[Node]]:
+        """Select N nodes (num_workers by default) to process in parallel,
         balancing between tree exploration and exploitation.
         Note:
         - This function runs in the main process.
@@ -1938,247 +2166,241 @@ class ParallelAgent:
         send them to worker processes.
         This is to make sure we don't run duplicate ideas in parallel.
         - For Stage 1 and 3, we generate nodes in worker processes.
+        - The choice itself is made by the configured selection policy
+        (see selection.py).
         """
-        nodes_to_process = []
-        processed_trees = set()
-        search_cfg = self.cfg.agent.search
         print(f"[cyan]self.num_workers: {self.num_workers}, [/cyan]")
-
-        while len(nodes_to_process) < self.num_workers:
-            # Initial drafting phase, creating root nodes
-            print(
-                f"Checking draft nodes... num of journal.draft_nodes: {len(self.journal.draft_nodes)}, search_cfg.num_drafts: {search_cfg.num_drafts}"
-            )
-            if len(self.journal.draft_nodes) < search_cfg.num_drafts:
-                nodes_to_process.append(None)
-                continue
-
-            # Get viable trees
-            viable_trees = [
-                root
-                for root in self.journal.draft_nodes
-                if not all(leaf.is_buggy for leaf in self._get_leaves(root))
-            ]
-
-            # Debugging phase (with some probability)
-            if random.random() < search_cfg.debug_prob:
-                print("Checking debuggable nodes")
-                # print(f"Buggy nodes: {self.journal.buggy_nodes}")
-                try:
-                    debuggable_nodes = None
-                    print("Checking buggy nodes...")
-                    buggy_nodes = self.journal.buggy_nodes
-                    print(f"Type of buggy_nodes: {type(buggy_nodes)}")
-                    print(f"Length of buggy_nodes: {len(buggy_nodes)}")
-
-                    for i, n in enumerate(buggy_nodes):
-                        if not isinstance(n, Node):
-                            print(f"Found non-Node object in journal.buggy_nodes: {n}")
-                            raise ValueError(
-                                "Found non-Node object in journal.buggy_nodes"
-                            )
-                    debuggable_nodes = [
-                        n
-                        for n in self.journal.buggy_nodes
-                        if (
-                            isinstance(n, Node)
-                            and n.is_leaf
-                            and n.debug_depth <= search_cfg.max_debug_depth
-                        )
-                    ]
-                except Exception as e:
-                    print(f"Error getting debuggable nodes: {e}")
-                if debuggable_nodes:
-                    print("Found debuggable nodes")
-                    node = random.choice(debuggable_nodes)
-                    tree_root = node
-                    while tree_root.parent:
-                        tree_root = tree_root.parent
-
-                    tree_id = id(tree_root)
-                    if tree_id not in processed_trees or len(processed_trees) >= len(
-                        viable_trees
-                    ):
-                        nodes_to_process.append(node)
-                        processed_trees.add(tree_id)
-                        continue
-
-            # Special handling for Stage 4 (Ablation Studies)
-            print(f"[red]self.stage_name: {self.stage_name}[/red]")
-            # print(f"[red]self.best_stage3_node: {self.best_stage3_node}[/red]")
-            if self.stage_name and self.stage_name.startswith("4_"):
-                nodes_to_process.append(self.best_stage3_node)
-                continue
-            # Special handling for Stage 2 (Hyperparam tuning for baseline)
-            elif self.stage_name and self.stage_name.startswith("2_"):
-                nodes_to_process.append(self.best_stage1_node)
-                continue
-            else:  # Stage 1, 3 (normal best-first search)
-                # Improvement phase
-                print("Checking good nodes..")
-                good_nodes = self.journal.good_nodes
-                if not good_nodes:
-                    nodes_to_process.append(None)  # Back to drafting
-                    continue
-
-                # Get best node from unprocessed tree if possible
-                best_node = self.journal.get_best_node()
-                tree_root = best_node
-                while tree_root.parent:
-                    tree_root = tree_root.parent
-
-                tree_id = id(tree_root)
-                if tree_id not in processed_trees or len(processed_trees) >= len(
-                    viable_trees
-                ):
-                    nodes_to_process.append(best_node)
-                    processed_trees.add(tree_id)
-                    continue
-
-                # If we can't use best node (tree already processed), try next best nodes
-                for node in sorted(good_nodes, key=lambda n: n.metric, reverse=True):
-                    tree_root = node
-                    while tree_root.parent:
-                        tree_root = tree_root.parent
-                    tree_id = id(tree_root)
-                    if tree_id not in processed_trees or len(processed_trees) >= len(
-                        viable_trees
-                    ):
-                        nodes_to_process.append(node)
-                        processed_trees.add(tree_id)
-                        break
-
-        return nodes_to_process
-
-    def step(self, exec_callback: ExecCallbackType):
-        print("Selecting nodes to process")
-        nodes_to_process = self._select_parallel_nodes()
-        print(f"Selected nodes: {[n.id if n else None for n in nodes_to_process]}")
-
-        # Convert nodes to dicts
+        if num_nodes is None:
+            num_nodes = self.num_workers
+        base_node = None
+        if self.stage_name and self.stage_name.startswith("4_"):
+            # Stage 4 (ablation studies) builds on the best node of stage 3
+            base_node = self.best_stage3_node
+        elif self.stage_name and self.stage_name.startswith("2_"):
+            # Stage 2 (hyperparam tuning) builds on the best node of stage 1
+            base_node = self.best_stage1_node
+        return self.selection_policy.select(self.journal, num_nodes, base_node)
+
+    def _prepare_node_data(self, nodes_to_process: List[Optional[Node]]) -> list:
+        """Make work orders for the selected nodes (None means new draft)"""
         node_data_list = []
         for node in nodes_to_process:
             if node:
                 try:
-                    node_data = node.to_dict()
-                    _safe_pickle_test(node_data, f"node {node.id} data")
-                    node_data_list.append(node_data)
+                    node_data_list.append(make_work_order(node, self.blobs))
                 except Exception as e:
                     logger.error(f"Error preparing node {node.id}: {str(e)}")
                     raise
             else:
                 node_data_list.append(None)  # None means new draft
+        return node_data_list
 
-        memory_summary = self.journal.generate_summary(include_code=False)
+    @traced("submit")
+    def _submit_node(
+        self,
+        node: Optional[Node],
+        node_data,
+        memory_summary: str,
+        process_id: str,
+        running: List[Future],
+    ) -> Future:
+        """Submit a node to the process pool, acquiring a GPU for it under `process_id`"""
+        gpu_id = None
+        if self.gpu_manager is not None:
+            try:
+                gpu_id = self.gpu_manager.acquire_gpu(process_id)
+                logger.info(f"Assigned GPU {gpu_id} to process {process_id}")
+            except RuntimeError as e:
+                logger.warning(f"Could not acquire GPU: {e}. Running on CPU")
 
-        print("Submitting tasks to process pool")
-        futures = []
-        for node_data in node_data_list:
-            gpu_id = None
-            if self.gpu_manager is not None:
-                try:
-                    # Get current process ID for GPU assignment
-                    process_id = f"worker_{len(futures)}"
-                    gpu_id = self.gpu_manager.acquire_gpu(process_id)
-                    logger.info(f"Assigned GPU {gpu_id} to process {process_id}")
-                except RuntimeError as e:
-                    logger.warning(f"Could not acquire GPU: {e}. Running on CPU")
+        if (
+            self.stage_name
+            and self.stage_name.startswith("2_")
+            and node is not None
+            and node.is_buggy is False
+        ):
+            new_hyperparam_idea = self._generate_hyperparam_tuning_idea()
+            self._hyperparam_tuning_state["tried_hyperparams"].add(
+                new_hyperparam_idea.name
+            )
+            new_ablation_idea = None
+        elif (
+            self.stage_name
+            and self.stage_name.startswith("4_")
+            and node is not None
+            and node.is_buggy is False
+        ):
+            new_ablation_idea = self._generate_ablation_idea()
+            self._ablation_state["completed_ablations"].add(new_ablation_idea.name)
+            new_hyperparam_idea = None
+        else:
+            new_ablation_idea = None
+            new_hyperparam_idea = None
+
+        best_stage1_plot_code = (
+            self.best_stage1_node.plot_code if self.best_stage1_node else None
+        )
+        best_stage2_plot_code = (
+            self.best_stage2_node.plot_code if self.best_stage2_node else None
+        )
+        best_stage3_plot_code = (
+            self.best_stage3_node.plot_code if self.best_stage3_node else None
+        )
+        seed_eval = False
+        self.admission.admit(running)
+        future = self.executor.submit(
+            self._process_node_wrapper,
+            node_data,
+            self.task_desc,
+            self.cfg,
+            gpu_id,
+            memory_summary,
+            self.evaluation_metrics,
+            self.stage_name,
+            new_ablation_idea,
+            new_hyperparam_idea,
+            best_stage1_plot_code,
+            best_stage2_plot_code,
+            best_stage3_plot_code,
+            seed_eval,
+            tracing.current_span_id(),
+        )
+        self.utilization.task_started(future)
+        return future
 
+    @traced("collect")
+    def _handle_result(self, future: Future, process_id: str, timeout=None):
+        """Add the result of a finished node to the journal and release its GPU"""
+        try:
+            print("About to get result from future")
+            result_data = future.result(timeout=timeout)
+
+            # Create node and restore relationships using journal.
+            # Journal acts as a database to look up a parent node,
+            # and add the result node as a child.
+            result_node = merge_result_delta(result_data, self.blobs, self.journal)
+            print("[red]Investigating if result node has metric[/red]", flush=True)
+            print(result_node.metric)
+            # Update hyperparam tuning state if in Stage 2
+            self._update_hyperparam_tuning_state(result_node)
+            # Update ablation state if in Stage 4
+            self._update_ablation_state(result_node)
+
+            # Add node to journal's list and assign its step number
+            self.journal.append(result_node)
+            print("Added result node to journal")
+
+        except TimeoutError:
+            print("Worker process timed out, couldn't get the result")
+            logger.error(f"Worker process timed out, couldn't get the result")
+        except Exception as e:
+            print(f"Error processing node: {str(e)}")
+            logger.error(f"Error processing node: {str(e)}")
+            import traceback
+
+            traceback.print_exc()
+            raise
+        finally:
+            # Release GPU for this process if it was using one
             if (
-                self.stage_name
-                and self.stage_name.startswith("2_")
-                and node_data["is_buggy"] is False
+                self.gpu_manager is not None
+                and process_id in self.gpu_manager.gpu_assignments
             ):
-                new_hyperparam_idea = self._generate_hyperparam_tuning_idea()
-                self._hyperparam_tuning_state["tried_hyperparams"].add(
-                    new_hyperparam_idea.name
-                )
-                new_ablation_idea = None
-            elif (
-                self.stage_name
-                and self.stage_name.startswith("4_")
-                and node_data["is_buggy"] is False
-            ):
-                new_ablation_idea = self._generate_ablation_idea()
-                self._ablation_state["completed_ablations"].add(new_ablation_idea.name)
-                new_hyperparam_idea = None
-            else:
-                new_ablation_idea = None
-                new_hyperparam_idea = None
+                self.gpu_manager.release_gpu(process_id)
+                logger.info(f"Released GPU for process {process_id}")
 
-            best_stage1_plot_code = (
-                self.best_stage1_node.plot_code if self.best_stage1_node else None
-            )
-            best_stage2_plot_code = (
-                self.best_stage2_node.plot_code if self.best_stage2_node else None
-            )
-            best_stage3_plot_code = (
-                self.best_stage3_node.plot_code if self.best_stage3_node else None
-            )
-            seed_eval = False
+    @traced("step")
+    def step(self, exec_callback: ExecCallbackType):
+        if self.cfg.agent.scheduling == "steady":
+            self._steady_step()
+        else:
+            self._batch_step()
+
+        logger.info(f"Worker utilization: {self.utilization.summary()}")
+        logger.info(f"Best node selection: {self.journal.best_node_stats}")
+        logger.info(f"Execution slot occupancy: {self.occupancy.summary()}")
+        if self.exec_cache is not None:
+            logger.info(f"Execution cache stats: {self.exec_cache.stats()}")
+
+    def _batch_step(self):
+        """Process num_workers nodes and wait for all of them (a barrier per step)"""
+        print("Selecting nodes to process")
+        nodes_to_process = self._select_parallel_nodes()
+        print(f"Selected nodes: {[n.id if n else None for n in nodes_to_process]}")
+
+        node_data_list = self._prepare_node_data(nodes_to_process)
+        memory_summary = self.journal.generate_summary(include_code=False)
+
+        print("Submitting tasks to process pool")
+        futures = []
+        for node, node_data in zip(nodes_to_process, node_data_list):
+            # Get current process ID for GPU assignment
+            process_id = f"worker_{len(futures)}"
             futures.append(
-                self.executor.submit(
-                    self._process_node_wrapper,
-                    node_data,
-                    self.task_desc,
-                    self.cfg,
-                    gpu_id,
-                    memory_summary,
-                    self.evaluation_metrics,
-                    self.stage_name,
-                    new_ablation_idea,
-                    new_hyperparam_idea,
-                    best_stage1_plot_code,
-                    best_stage2_plot_code,
-                    best_stage3_plot_code,
-                    seed_eval,
-                )
+                self._submit_node(node, node_data, memory_summary, process_id, futures)
             )
 
         # Add results to journal
         print("Waiting for results")
         for i, future in enumerate(futures):
-            try:
-                print("About to get result from future")
-                result_data = future.result(timeout=self.timeout)
-                if "metric" in result_data:
-                    print(f"metric type: {type(result_data['metric'])}")
-                    print(f"metric contents: {result_data['metric']}")
-
-                # Create node and restore relationships using journal.
-                # Journal acts as a database to look up a parent node,
-                # and add the result node as a child.
-                result_node = Node.from_dict(result_data, self.journal)
-                print("[red]Investigating if result node has metric[/red]", flush=True)
-                print(result_node.metric)
-                # Update hyperparam tuning state if in Stage 2
-                self._update_hyperparam_tuning_state(result_node)
-                # Update ablation state if in Stage 4
-                self._update_ablation_state(result_node)
+            self._handle_result(future, f"worker_{i}", timeout=self.timeout)
 
-                # Add node to journal's list and assign its step number
-                self.journal.append(result_node)
-                print("Added result node to journal")
+    def _steady_step(self):
+        """
+        Keep all workers busy: refill free slots, then return as soon as at least
+        one node has finished, so that the journal, the search state and the
+        stage completion checks are updated per result rather than per batch.
+        Nodes still running are carried over to the next step. A node past its
+        deadline keeps its slot and GPU, since its worker is still running it.
+        """
+        free_slots = self.num_workers - len(self._in_flight)
+        if free_slots > 0:
+            print(f"Selecting {free_slots} nodes to process")
+            nodes_to_process = self._select_parallel_nodes(free_slots)
+            print(f"Selected nodes: {[n.id if n else None for n in nodes_to_process]}")
+            node_data_list = self._prepare_node_data(nodes_to_process)
+            memory_summary = self.journal.generate_summary(include_code=False)
+            for node, node_data in zip(nodes_to_process, node_data_list):
+                self._slot_counter += 1
+                process_id = f"slot_{self._slot_counter}"
+                future = self._submit_node(
+                    node, node_data, memory_summary, process_id, list(self._in_flight)
+                )
+                self._in_flight[future] = (process_id, time.time() + self.timeout)
 
-            except TimeoutError:
-                print("Worker process timed out, couldn't get the result")
-                logger.error(f"Worker process timed out, couldn't get the result")
-            except Exception as e:
-                print(f"Error processing node: {str(e)}")
-                logger.error(f"Error processing node: {str(e)}")
-                import traceback
+        if not self._in_flight:
+            return
+        print("Waiting for the next result")
+        deadlines = [
+            deadline
+            for future, (_, deadline) in self._in_flight.items()
+            if future not in self._overdue
+        ]
+        done, _ = wait(
+            list(self._in_flight),
+            timeout=max(0, min(deadlines) - time.time()) if deadlines else None,
+            return_when=FIRST_COMPLETED,
+        )
+        for future, (process_id, deadline) in list(self._in_flight.items()):
+            if future in done:
+                del self._in_flight[future]
+                self._overdue.discard(future)
+                self._handle_result(future, process_id, timeout=0)
+            elif time.time() >= deadline and future not in self._overdue:
+                self._overdue.add(future)
+                logger.warning(
+                    f"Node of {process_id} is still running after {self.timeout}s, "
+                    "keeping its slot and GPU until it finishes"
+                )
 
-                traceback.print_exc()
-                raise
-            finally:
-                # Release GPU for this process if it was using one
-                process_id = f"worker_{i}"
-                if (
-                    self.gpu_manager is not None
-                    and process_id in self.gpu_manager.gpu_assignments
-                ):
-                    self.gpu_manager.release_gpu(process_id)
-                    logger.info(f"Released GPU for process {process_id}")
+    def collect_in_flight(self):
+        """Wait for the nodes still running in steady-state mode and add them to the journal"""
+        for future, (process_id, deadline) in list(self._in_flight.items()):
+            del self._in_flight[future]
+            self._overdue.discard(future)
+            self._handle_result(
+                future, process_id, timeout=max(0, deadline - time.time())
+            )
 
     def _update_hyperparam_tuning_state(self, result_node: Node):
         """Update hyperparam tuning tracking state based on execution results."""
@@ -2356,4 +2578,11 @@ class ParallelAgent:
                 self._is_shutdown = True
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # cleanup() cancels whatever is still running, so nodes in flight in
+        # steady-state mode are collected first, unless the run is interrupted
+        if exc_type is None or issubclass(exc_type, Exception):
+            try:
+                self.collect_in_flight()
+            except Exception as e:
+                logger.error(f"Failed to collect in-flight nodes: {e}")
         self.cleanup()
@@ -1,8 +1,10 @@
+import argparse
 import atexit
 import logging
 import shutil
 import json
 import pickle
+import time
 from . import backend
 from .journal import Journal, Node
 from .journal2report import journal2report
@@ -26,13 +28,19 @@ from .agent_manager import AgentManager
 from pathlib import Path
 from .agent_manager import Stage
 from .log_summarization import overall_summarize
+from . import tracing
+from ai_scientist.utils.token_tracker import (
+    configure_telemetry,
+    get_telemetry_dir,
+    token_tracker,
+)
 
 
 logger = logging.getLogger("ai-scientist")
 
 
 def journal_to_rich_tree(journal: Journal):
-    best_node = journal.get_best_node()
+    best_node = journal.get_best_node(use_val_metric_only=True)
 
     def append_rec(node: Node, tree):
         if node.is_buggy:
@@ -55,11 +63,30 @@ def journal_to_rich_tree(journal: Journal):
     return tree
 
 
-def perform_experiments_bfts(config_path: str):
+def perform_experiments_bfts(config_path: str, resume: str | Path | None = None):
+    """
+    Run the staged tree search. With `resume` (the log directory of an interrupted
+    run), the run continues in that run's directories from its journal log.
+    """
     # turn config path string into a path object
     config_path = Path(config_path)
     cfg = load_cfg(config_path)
-    logger.info(f'Starting run "{cfg.exp_name}"')
+    if resume is not None:
+        cfg.log_dir = Path(resume).resolve()
+        cfg.exp_name = cfg.log_dir.name
+        cfg.workspace_dir = Path(cfg.workspace_dir).parent / cfg.exp_name
+        logger.info(f'Resuming run "{cfg.exp_name}"')
+    else:
+        logger.info(f'Starting run "{cfg.exp_name}"')
+
+    # spans of this run, also from the worker processes
+    trace_file = Path(cfg.log_dir) / "trace_spans.jsonl"
+    tracing.configure(trace_file)
+    run_start = time.time()
+
+    if get_telemetry_dir() is None:
+        # LLM usage of the workers is collected next to the run's logs
+        configure_telemetry(Path(cfg.log_dir) / "llm_telemetry")
 
     task_desc = load_task_desc(cfg)
     print(task_desc)
@@ -67,8 +94,9 @@ def perform_experiments_bfts(config_path: str):
 
     global_step = 0
 
-    with Status("Preparing agent workspace (copying and extracting files) ..."):
-        prep_agent_workspace(cfg)
+    if resume is None or not (cfg.workspace_dir / "input").exists():
+        with Status("Preparing agent workspace (copying and extracting files) ..."):
+            prep_agent_workspace(cfg)
 
     def cleanup():
         if global_step == 0:
@@ -80,6 +108,7 @@ def perform_experiments_bfts(config_path: str):
         task_desc=task_desc,
         cfg=cfg,
         workspace_dir=Path(cfg.workspace_dir),
+        resume=resume is not None,
     )
 
     prog = Progress(
@@ -118,16 +147,13 @@ def perform_experiments_bfts(config_path: str):
                         json.dump(summary, f, indent=2)
 
             # Generate and save stage progress summary
+            best_node = journal.get_best_node(use_val_metric_only=True)
             stage_summary = {
                 "stage": stage.name,
                 "total_nodes": len(journal.nodes),
                 "buggy_nodes": len(journal.buggy_nodes),
                 "good_nodes": len(journal.good_nodes),
-                "best_metric": (
-                    str(journal.get_best_node().metric)
-                    if journal.get_best_node()
-                    else "None"
-                ),
+                "best_metric": str(best_node.metric) if best_node else "None",
                 "current_findings": journal.generate_summary(include_code=False),
             }
 
@@ -135,7 +161,8 @@ def perform_experiments_bfts(config_path: str):
                 json.dump(stage_summary, f, indent=2)
 
             # Save the run as before
-            save_run(cfg, journal, stage_name=f"stage_{stage.name}")
+            with tracing.span("save_run", stage=stage.name):
+                save_run(cfg, journal, stage_name=f"stage_{stage.name}")
 
         except Exception as e:
             print(f"Error in step callback: {e}")
@@ -196,6 +223,24 @@ def perform_experiments_bfts(config_path: str):
 
     manager.run(exec_callback=create_exec_callback(status), step_callback=step_callback)
 
+    trace_path = cfg.log_dir / "trace.json"
+    num_spans = tracing.export_chrome_trace(trace_file, trace_path)
+    logger.info(f"Wrote {num_spans} spans to {trace_path} (open in ui.perfetto.dev)")
+    phase_summary = tracing.phase_summary(trace_file, since=run_start)
+    with open(cfg.log_dir / "trace_summary.json", "w") as f:
+        json.dump(phase_summary, f, indent=2)
+    tracing.print_phase_summary(phase_summary)
+
+    llm_usage = token_tracker.get_aggregates()
+    with open(cfg.log_dir / "llm_usage.json", "w") as f:
+        json.dump(llm_usage, f, indent=2)
+    for stage_name, usage in llm_usage["by_stage"].items():
+        logger.info(
+            f"LLM usage in {stage_name}: {usage['calls']} calls ({usage['cache_hits']} cached), "
+            f"{usage['prompt']} prompt / {usage['completion']} completion tokens, "
+            f"{usage['latency']:.0f}s"
+        )
+
     manager_pickle_path = cfg.log_dir / "manager.pkl"
     try:
         with open(manager_pickle_path, "wb") as f:
@@ -243,6 +288,15 @@ def perform_experiments_bfts(config_path: str):
 
 
 if __name__ == "__main__":
-    cfg_path = "treesearch/utils/config.yaml"
-    cfg = load_cfg(cfg_path)
-    perform_experiments_bfts(cfg_path)
+    parser = argparse.ArgumentParser(description="Run the staged tree search")
+    parser.add_argument(
+        "config_path", nargs="?", default="treesearch/utils/config.yaml"
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="LOG_DIR",
+        default=None,
+        help="Log directory of an interrupted run to continue from its journal log",
+    )
+    args = parser.parse_args()
+    perform_experiments_bfts(args.config_path, resume=args.resume)
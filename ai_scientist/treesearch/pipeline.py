@@ -0,0 +1,150 @@
+"""
+Execution slots shared by the worker processes of a ParallelAgent.
+
+By default every pool worker owns its CPU/GPU for the whole node: it asks the LLM
+for code, runs it, asks for the metric-parsing code, runs it, and so on, leaving
+the device idle during every LLM round-trip. In pipelined mode the pool has more
+workers than there are execution slots, and a worker only holds a slot (taken
+from a shared queue) while it is actually executing code. LLM generation for one
+node then overlaps with the execution of another.
+
+Every execution slot is a span of the run's span trace (see tracing.py), which
+`SlotOccupancy` turns into per-slot busy fractions.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import tracing
+
+logger = logging.getLogger("ai-scientist")
+
+# set in each pool worker by `init_worker`
+_slots = None  # queue of slot tokens, None if not pipelined
+
+
+def make_slot_queue(tokens: list[str]):
+    """Queue holding one token per execution slot: a GPU id, or "cpu<i>" on CPU-only hosts."""
+    slots = multiprocessing.Queue()
+    for token in tokens:
+        slots.put(token)
+    return slots
+
+
+def init_worker(slots) -> None:
+    """ProcessPoolExecutor initializer."""
+    global _slots
+    _slots = slots
+
+
+@contextmanager
+def execution_slot(kind: str):
+    """
+    Hold an execution slot for the duration of the block. Makes the slot's GPU the
+    only visible one (children of the interpreter inherit the environment).
+    Without pipelining the worker owns its device and this only records the span.
+    The span is marked as an execution span by its `slot` argument.
+    """
+    requested = time.time()
+    span = tracing.start_span(kind)
+    token = None
+    previous_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if _slots is not None:
+        token = _slots.get()
+        os.environ["CUDA_VISIBLE_DEVICES"] = "" if token.startswith("cpu") else token
+    start = time.time()
+    try:
+        yield token
+    finally:
+        if _slots is not None:
+            if previous_devices is None:
+                os.environ.pop("CUDA_VISIBLE_DEVICES", None)
+            else:
+                os.environ["CUDA_VISIBLE_DEVICES"] = previous_devices
+            _slots.put(token)
+        span.end(slot=token, waited=start - requested)
+
+
+class SlotOccupancy:
+    """
+    Running summary of a span trace: the fraction of wall time each slot spent
+    executing code, how long workers waited for a slot, and the number of nodes.
+    Only spans that ended after `since` are counted. Every `summary` call only
+    reads the spans appended since the previous one.
+    """
+
+    def __init__(self, trace_path: Path | str, since: float | None = None):
+        self.trace_path = Path(trace_path)
+        self.since = since
+        self._offset = 0
+        self._wall_start: float | None = None
+        self._wall_end: float | None = None
+        self._busy: dict[str, float] = {}
+        self._wait_time = 0.0
+        self._nodes = 0
+
+    def _add(self, span: dict) -> None:
+        args = span.get("args", {})
+        # only node and execution spans, the orchestrator's spans also cover its setup
+        if span["name"] != "node" and "slot" not in args:
+            return
+        if self.since is not None and span["end"] < self.since:
+            return
+        if self._wall_start is None:
+            self._wall_start, self._wall_end = span["start"], span["end"]
+        self._wall_start = min(self._wall_start, span["start"])
+        self._wall_end = max(self._wall_end, span["end"])
+        if span["name"] == "node":
+            self._nodes += 1
+            return
+        # without pipelining each worker is its own slot
+        slot = args["slot"] or f"worker {span['pid']}"
+        # the span opens when the slot is requested
+        waited = args.get("waited", 0.0)
+        busy = span["end"] - span["start"] - waited
+        self._busy[slot] = self._busy.get(slot, 0.0) + busy
+        self._wait_time += waited
+
+    def update(self) -> None:
+        try:
+            with open(self.trace_path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    # a record that is still being written is read again next time
+                    if not line.endswith(b"\n"):
+                        break
+                    self._offset += len(line)
+                    try:
+                        span = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._add(span)
+        except FileNotFoundError:
+            pass
+
+    def summary(self) -> dict:
+        self.update()
+        if self._wall_start is None:
+            return {}
+        wall = self._wall_end - self._wall_start
+        return {
+            "wall_time": wall,
+            "slot_occupancy": (
+                {slot: t / wall for slot, t in sorted(self._busy.items())}
+                if wall
+                else {}
+            ),
+            "exec_time": sum(self._busy.values()),
+            "slot_wait_time": self._wait_time,
+            "nodes": self._nodes,
+        }
+
+
+def slot_occupancy(trace_path: Path | str, since: float | None = None) -> dict:
+    """Summarize a whole span trace at once, see `SlotOccupancy`."""
+    return SlotOccupancy(trace_path, since).summary()
@@ -0,0 +1,383 @@
+"""
+Node selection policies of the parallel tree search.
+
+Before each step, `ParallelAgent` asks its policy which nodes the workers expand
+next: a buggy node to debug, a good node to improve, or None for a new draft. In
+stages 2 and 4 the node to improve is the best node of the previous stage.
+
+- "default" is the original rule: draft until there are num_drafts drafts, then
+  debug a random buggy leaf with probability debug_prob, else improve the best
+  node, spreading the workers over the trees.
+- "bandit" treats every possible expansion as an arm and picks the one with the
+  highest expected gain of the best metric per expected compute-second. The
+  estimates come from the earlier expansions of the same kind in the same tree
+  (how often they were buggy, how long they ran, how much they improved), so a
+  cheap tree that keeps improving wins over an expensive or flaky one, where the
+  default rule spends equal steps on both.
+
+`agent.search.policy` names the policy in POLICIES; a new policy is a
+`SelectionPolicy` subclass added there. benchmarks/search_replay.py replays the
+policies on the history of earlier runs.
+"""
+
+import logging
+import math
+import random
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Optional
+
+from .journal import Journal, Node
+from .utils.config import SearchConfig
+
+logger = logging.getLogger("ai-scientist")
+
+# weight (in nodes) of the journal-wide estimate in the estimate for one tree
+PRIOR_WEIGHT = 2.0
+# lower bound of the expected cost of a node, for nodes without recorded times
+MIN_COST_S = 1.0
+# added to the expected gain, so that when no expansion is expected to beat the
+# best node the likeliest success per compute-second is picked
+TIE_BREAK_GAIN = 1e-6
+
+
+def tree_id(node: Node) -> str:
+    """Id of the draft node at the root of `node`'s tree."""
+    stats = node.subtree_stats
+    if stats is not None:
+        return stats.root_id
+    while node.parent:
+        node = node.parent
+    return node.id
+
+
+class SelectionPolicy(ABC):
+    """
+    Chooses the nodes the workers expand in the next step.
+
+    Args:
+        cfg (SearchConfig): search settings of the agent
+        use_val_metric_only (bool, optional): pick the best node by its metric instead of asking the LLM (see `Journal.get_best_node`). Defaults to False.
+        rng (random.Random | None, optional): source of the random choices. Defaults to the `random` module.
+    """
+
+    def __init__(
+        self,
+        cfg: SearchConfig,
+        use_val_metric_only: bool = False,
+        rng: Optional[random.Random] = None,
+    ):
+        self.cfg = cfg
+        self.use_val_metric_only = use_val_metric_only
+        self.rng = rng if rng is not None else random
+
+    @abstractmethod
+    def select(
+        self, journal: Journal, num_nodes: int, base_node: Optional[Node] = None
+    ) -> list[Optional[Node]]:
+        """
+        Nodes to expand, None meaning a new draft.
+
+        Args:
+            journal (Journal): journal of the current stage
+            num_nodes (int): number of nodes to return
+            base_node (Node | None, optional): node to improve in stages 2 and 4 (the best node of the previous stage)
+        """
+
+    def best_node(self, journal: Journal) -> Optional[Node]:
+        return journal.get_best_node(use_val_metric_only=self.use_val_metric_only)
+
+
+class DefaultPolicy(SelectionPolicy):
+    """Debug with probability debug_prob, else improve the best node, one node per tree if possible."""
+
+    # the selection retries its random choices until it has enough nodes, which
+    # never happens when e.g. debug_prob is 0 and the only unprocessed viable tree
+    # has no good node; the remaining slots then improve the best node
+    MAX_ATTEMPTS_PER_NODE = 100
+
+    def select(
+        self, journal: Journal, num_nodes: int, base_node: Optional[Node] = None
+    ) -> list[Optional[Node]]:
+        nodes_to_process: list[Optional[Node]] = []
+        processed_trees: set[str] = set()
+        # the journal doesn't change while selecting, so these are only computed once
+        viable_trees = None
+
+        for _ in range(self.MAX_ATTEMPTS_PER_NODE * num_nodes):
+            if len(nodes_to_process) >= num_nodes:
+                break
+            # Initial drafting phase, creating root nodes
+            if len(journal.draft_nodes) < self.cfg.num_drafts:
+                nodes_to_process.append(None)
+                continue
+
+            # Get viable trees (those with at least one non-buggy leaf)
+            if viable_trees is None:
+                viable_trees = [
+                    root
+                    for root in journal.draft_nodes
+                    if not root.subtree_stats.all_leaves_buggy
+                ]
+
+            # Debugging phase (with some probability)
+            if self.rng.random() < self.cfg.debug_prob:
+                debuggable_nodes = [
+                    n
+                    for n in journal.buggy_nodes
+                    if n.is_leaf and n.debug_depth <= self.cfg.max_debug_depth
+                ]
+                if debuggable_nodes:
+                    node = self.rng.choice(debuggable_nodes)
+                    node_tree = tree_id(node)
+                    if node_tree not in processed_trees or len(processed_trees) >= len(
+                        viable_trees
+                    ):
+                        nodes_to_process.append(node)
+                        processed_trees.add(node_tree)
+                        continue
+
+            # Stage 2 (hyperparameter tuning) and 4 (ablations) improve a fixed node
+            if base_node is not None:
+                nodes_to_process.append(base_node)
+                continue
+
+            # Stage 1, 3 (normal best-first search): improvement phase
+            if not journal.good_nodes:
+                nodes_to_process.append(None)  # Back to drafting
+                continue
+
+            # Get best node from unprocessed tree if possible
+            best_node = self.best_node(journal)
+            best_tree = tree_id(best_node)
+            if best_tree not in processed_trees or len(processed_trees) >= len(
+                viable_trees
+            ):
+                nodes_to_process.append(best_node)
+                processed_trees.add(best_tree)
+                continue
+
+            # If we can't use best node (tree already processed), try the best
+            # node of the best unprocessed tree
+            candidates = [
+                root.subtree_stats
+                for root in journal.draft_nodes
+                if root.id not in processed_trees
+                and root.subtree_stats.best_metric is not None
+            ]
+            if candidates:
+                stats = max(candidates, key=lambda s: s.best_metric)
+                nodes_to_process.append(journal.get_node_by_id(stats.best_node_id))
+                processed_trees.add(stats.root_id)
+
+        if len(nodes_to_process) < num_nodes:
+            logger.warning(
+                f"Selected only {len(nodes_to_process)} of {num_nodes} nodes, "
+                "improving the best node with the others"
+            )
+            best_node = base_node or self.best_node(journal)
+            nodes_to_process += [best_node] * (num_nodes - len(nodes_to_process))
+        return nodes_to_process
+
+
+def _is_good(node: Node) -> bool:
+    return node.is_buggy is False and node.is_buggy_plots is False
+
+
+def _nearest_good(node: Optional[Node]) -> Optional[Node]:
+    """The node itself if it is good, else its closest good ancestor."""
+    while node is not None and not _is_good(node):
+        node = node.parent
+    return node
+
+
+def _score(node: Optional[Node]) -> Optional[float]:
+    """The node's metric as a number where higher is better (None without one)."""
+    metric = node.metric if node is not None else None
+    if metric is None or metric.value is None:
+        return None
+    value = metric.get_mean_value()
+    if math.isnan(value):
+        return None
+    return value if metric._should_maximize() else -value
+
+
+class _History:
+    """Outcomes, execution times and metric changes of a journal's expansions."""
+
+    def __init__(self, journal: Journal):
+        # (tree id, kind) and (kind,) -> [good, executed]
+        self.outcomes: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+        # (tree id, kind), (kind,) and () -> [total execution time, nodes]
+        self.times: dict[tuple, list[float]] = defaultdict(lambda: [0.0, 0])
+        # relative metric changes of good nodes over their closest good ancestor
+        self.gains: list[float] = []
+        # metrics of good nodes without a good ancestor (drafts and fixed drafts)
+        self.fresh: list[float] = []
+        self.best: Optional[float] = None
+        self.executed = 0
+        for node in journal.nodes:
+            if node.is_buggy is None or node.is_seed_node or node.is_seed_agg_node:
+                continue
+            self.executed += 1
+            kind, root, good = node.stage_name, tree_id(node), _is_good(node)
+            for key in ((root, kind), (kind,)):
+                self.outcomes[key][0] += good
+                self.outcomes[key][1] += 1
+            if node.exec_time is not None:
+                for key in ((root, kind), (kind,), ()):
+                    self.times[key][0] += node.exec_time + (node.plot_exec_time or 0.0)
+                    self.times[key][1] += 1
+            score = _score(node) if good else None
+            if score is None:
+                continue
+            self.best = score if self.best is None else max(self.best, score)
+            base = _score(_nearest_good(node.parent))
+            if base is None:
+                self.fresh.append(score)
+            else:
+                self.gains.append((score - base) / (abs(base) or 1.0))
+
+    def success_posterior(self, root: Optional[str], kind: str) -> tuple[float, float]:
+        """Beta(a, b) posterior of an expansion being good, the kind's rate as prior."""
+        good, total = self.outcomes.get((kind,), (0, 0))
+        prior = (good + 1) / (total + 2)
+        good, total = self.outcomes.get((root, kind), (0, 0))
+        return (
+            good + PRIOR_WEIGHT * prior,
+            total - good + PRIOR_WEIGHT * (1 - prior),
+        )
+
+    def expected_cost(self, root: Optional[str], kind: str) -> float:
+        """Mean execution time of the tree's expansions of this kind, shrunk toward the kind's mean."""
+        total, count = self.times.get((kind,), None) or self.times.get((), (0.0, 0))
+        prior = total / count if count else 0.0
+        total, count = self.times.get((root, kind), (0.0, 0))
+        return (total + PRIOR_WEIGHT * prior) / (count + PRIOR_WEIGHT)
+
+
+class BanditPolicy(SelectionPolicy):
+    """
+    Picks the expansions with the highest expected gain of the best metric per
+    expected compute-second.
+
+    The arms are the buggy leaves that may still be debugged, the good nodes (or
+    the base node in stages 2 and 4) and a new draft. For each arm:
+    - P(good child): Beta posterior of the outcomes of the tree's earlier
+      expansions of the same kind (debug, improve or draft), with the kind's
+      journal-wide rate as prior
+    - gain: how much a good child is expected to improve the best metric, from
+      the relative metric changes of earlier improvements (plus prior_gain as
+      one pseudo-observation), or the metrics of earlier drafts for new drafts;
+      until there is a good node, every good child counts as gain 1
+    - cost: mean execution time of the tree's expansions of that kind, shrunk
+      toward the kind's mean, plus overhead_s
+    "thompson" samples P(good) and resamples the observed changes for every
+    slot; "ucb" adds exploration * sqrt(ln(N) / n) to the mean P(good), with n
+    the tree's expansions of that kind and N all expansions. debug_prob is not
+    used.
+    """
+
+    def __init__(
+        self,
+        cfg: SearchConfig,
+        use_val_metric_only: bool = False,
+        rng: Optional[random.Random] = None,
+    ):
+        super().__init__(cfg, use_val_metric_only, rng)
+        self.bandit = cfg.bandit
+        if self.bandit.method not in ("thompson", "ucb"):
+            raise ValueError(f"Unknown bandit method: {self.bandit.method}")
+
+    def select(
+        self, journal: Journal, num_nodes: int, base_node: Optional[Node] = None
+    ) -> list[Optional[Node]]:
+        history = _History(journal)
+        nodes_to_process: list[Optional[Node]] = []
+        drafts = len(journal.draft_nodes)
+        while drafts < self.cfg.num_drafts and len(nodes_to_process) < num_nodes:
+            nodes_to_process.append(None)
+            drafts += 1
+
+        # (node to expand or None for a draft, tree id, kind, base metric, repeatable)
+        arms: list[tuple] = []
+        if base_node is None:
+            arms.append((None, None, "draft", None, True))
+        for node in journal.buggy_nodes:
+            if node.is_leaf and node.debug_depth <= self.cfg.max_debug_depth:
+                base = _score(_nearest_good(node))
+                arms.append((node, tree_id(node), "debug", base, False))
+        if base_node is not None:
+            arms.append(
+                (base_node, tree_id(base_node), "improve", _score(base_node), True)
+            )
+        else:
+            for node in journal.good_nodes:
+                if not (node.is_seed_node or node.is_seed_agg_node):
+                    arms.append((node, tree_id(node), "improve", _score(node), False))
+
+        # expansions selected in this call, counted as tried by UCB
+        pending: dict[tuple, int] = defaultdict(int)
+        while len(nodes_to_process) < num_nodes and arms:
+            values = [self._value(history, arm, pending) for arm in arms]
+            best = max(range(len(arms)), key=values.__getitem__)
+            node, root, kind, _, repeatable = arms[best]
+            logger.debug(
+                f"Bandit selected {kind} of {node.id if node else 'new draft'} "
+                f"(value {values[best]:.3g}/s)"
+            )
+            nodes_to_process.append(node)
+            pending[(root, kind)] += 1
+            if not repeatable:
+                arms.pop(best)
+        while len(nodes_to_process) < num_nodes:
+            # more workers than arms: repeat the most valuable expansion
+            nodes_to_process.append(nodes_to_process[-1] if nodes_to_process else None)
+        return nodes_to_process
+
+    def _value(self, history: _History, arm: tuple, pending: dict) -> float:
+        """Expected gain of the best metric per compute-second of expanding the arm."""
+        _, root, kind, base, _ = arm
+        a, b = history.success_posterior(root, kind)
+        if self.bandit.method == "thompson":
+            p_good = self.rng.betavariate(a, b)
+        else:
+            tried = (
+                history.outcomes.get((root, kind), (0, 0))[1] + pending[(root, kind)]
+            )
+            bonus = math.sqrt(math.log(history.executed + 1) / (tried + 1))
+            p_good = a / (a + b) + self.bandit.exploration * bonus
+        gain = self._expected_gain(history, base)
+        cost = max(
+            history.expected_cost(root, kind) + self.bandit.overhead_s, MIN_COST_S
+        )
+        return p_good * (gain + TIE_BREAK_GAIN) / cost
+
+    def _expected_gain(self, history: _History, base: Optional[float]) -> float:
+        """Expected improvement of the best metric (relative to it) by a good child."""
+        if history.best is None:
+            return 1.0
+        if base is None:
+            children = history.fresh
+        else:
+            gains = history.gains + [self.bandit.prior_gain]
+            children = [base + r * (abs(base) or 1.0) for r in gains]
+        if not children:
+            return 0.0
+        if self.bandit.method == "thompson":
+            children = [self.rng.choice(children) for _ in children]
+        scale = abs(history.best) or 1.0
+        return sum(max(0.0, c - history.best) for c in children) / len(children) / scale
+
+
+POLICIES: dict[str, type[SelectionPolicy]] = {
+    "default": DefaultPolicy,
+    "bandit": BanditPolicy,
+}
+
+
+def make_policy(cfg: SearchConfig, **kwargs) -> SelectionPolicy:
+    """The policy named by `cfg.policy`, see `SelectionPolicy` for the keyword arguments."""
+    if cfg.policy not in POLICIES:
+        raise ValueError(f"Unknown selection policy: {cfg.policy}")
+    return POLICIES[cfg.policy](cfg, **kwargs)
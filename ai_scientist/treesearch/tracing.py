@@ -0,0 +1,276 @@
+"""
+Hierarchical timing spans of a tree search run, exported as a Chrome trace.
+
+Spans nest as stage → sub-stage → step → node → phase (code generation, LLM
+calls, code execution, metric parsing, plotting, VLM analysis, ...). Each
+process keeps its stack of open spans, and a finished span is appended to the
+run's span file (one O_APPEND write per span, so processes don't interleave). The
+file is passed on through the environment, and the orchestrator hands the id
+of the submitting span to the worker with each node, so the node spans of the
+worker processes hang under the step that submitted them.
+
+`export_chrome_trace` turns the span file into a trace for chrome://tracing or
+https://ui.perfetto.dev (one track per process, with flow arrows from a step
+to the nodes it submitted), and `phase_summary` totals the time per span name.
+Without a configured span file, spans cost one environment lookup.
+"""
+
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger("ai-scientist")
+
+ENV_TRACE_FILE = "AI_SCIENTIST_TRACE_FILE"
+
+_ids = itertools.count()
+_local = threading.local()
+
+
+def _reset_after_fork() -> None:
+    # spans opened by the parent are not this process' to end
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def configure(trace_file: Path | str | None) -> None:
+    """Record the spans of this process and of the processes it starts to `trace_file` (None to stop)."""
+    if trace_file is None:
+        os.environ.pop(ENV_TRACE_FILE, None)
+    else:
+        os.environ[ENV_TRACE_FILE] = str(trace_file)
+
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span_id() -> Optional[str]:
+    """Id of the innermost open span of this thread, to pass to another process as parent."""
+    stack = _stack()
+    return stack[-1].id if stack else None
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional[str], trace_file: str, args: dict):
+        self.name = name
+        self.id = f"{os.getpid()}.{next(_ids)}"
+        self.parent = parent
+        self.args = args
+        self.trace_file = trace_file
+        self.start = time.time()
+        self.ended = False
+
+    def end(self, **args) -> None:
+        """Finish the span (and any spans opened inside it and left open)."""
+        if self.ended:
+            return
+        stack = _stack()
+        if self in stack:
+            for inner in stack[stack.index(self) + 1 :][::-1]:
+                inner.end()
+            stack.remove(self)
+        self.ended = True
+        record = {
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "start": self.start,
+            "end": time.time(),
+            "args": self.args | args,
+        }
+        try:
+            with open(self.trace_file, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record span {self.name}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end(**({"error": exc_type.__name__} if exc_type else {}))
+
+
+class _NoSpan:
+    id = None
+
+    def end(self, **args) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start_span(name: str, parent: Optional[str] = None, **args) -> Span | _NoSpan:
+    """
+    Open a span, to be finished with `end()` (or used as a context manager).
+
+    Args:
+        name (str): span (phase) name, the spans are summarized by name
+        parent (str | None, optional): id of the parent span in another process. Defaults to the innermost open span of this thread.
+        **args: details shown with the span (node id, model, ...)
+    """
+    trace_file = os.environ.get(ENV_TRACE_FILE)
+    if not trace_file:
+        return _NO_SPAN
+    span = Span(name, parent or current_span_id(), trace_file, args)
+    _stack().append(span)
+    return span
+
+
+# `with span(name, ...):` around a block
+span = start_span
+
+
+def traced(name: str):
+    """Decorator: record each call of the function as a span named `name`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def read_spans(trace_file: Path | str) -> list[dict]:
+    spans = []
+    try:
+        with open(trace_file) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:  # a span being written
+                    continue
+    except FileNotFoundError:
+        pass
+    return spans
+
+
+def export_chrome_trace(
+    trace_file: Path | str, out_path: Path | str, orchestrator_pid: Optional[int] = None
+) -> int:
+    """
+    Write the spans as a Chrome trace event file. Returns the number of spans.
+
+    Args:
+        trace_file (Path | str): span file of the run
+        out_path (Path | str): trace file to write (open in chrome://tracing or ui.perfetto.dev)
+        orchestrator_pid (int | None, optional): process to label as orchestrator, the others are labeled as workers. Defaults to this process.
+    """
+    spans = read_spans(trace_file)
+    orchestrator_pid = orchestrator_pid or os.getpid()
+    t0 = min((s["start"] for s in spans), default=0.0)
+    by_id = {s["id"]: s for s in spans}
+
+    def us(t: float) -> float:
+        return round((t - t0) * 1e6, 1)
+
+    events: list[dict[str, Any]] = []
+    for pid in sorted({s["pid"] for s in spans}):
+        label = "orchestrator" if pid == orchestrator_pid else f"worker {pid}"
+        events.append(
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": label}}
+        )
+    for flow_id, s in enumerate(spans):
+        events.append(
+            {
+                "ph": "X",
+                "name": s["name"],
+                "pid": s["pid"],
+                "tid": s["tid"],
+                "ts": us(s["start"]),
+                "dur": us(s["end"]) - us(s["start"]),
+                "args": s["args"] | {"id": s["id"], "parent": s["parent"]},
+            }
+        )
+        parent = by_id.get(s["parent"])
+        if parent is not None and parent["pid"] != s["pid"]:
+            # arrow from the submitting span to the span in the other process
+            ts = min(max(s["start"], parent["start"]), parent["end"])
+            flow = {"name": "submit", "cat": "flow", "id": flow_id}
+            events.append(
+                flow | {"ph": "s", "pid": parent["pid"], "tid": parent["tid"], "ts": us(ts)}
+            )
+            events.append(
+                flow
+                | {"ph": "f", "bp": "e", "pid": s["pid"], "tid": s["tid"], "ts": us(s["start"])}
+            )
+    with open(out_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(spans)
+
+
+def phase_summary(trace_file: Path | str, since: Optional[float] = None) -> dict:
+    """
+    Count, total, mean and max duration per span name, and the share of the wall
+    time of the spans (spans nest, so the shares add up to more than 100%). Only
+    spans that ended after `since` are counted.
+    """
+    spans = [s for s in read_spans(trace_file) if since is None or s["end"] >= since]
+    if not spans:
+        return {"wall_time": 0.0, "phases": {}}
+    wall = max(s["end"] for s in spans) - min(s["start"] for s in spans)
+    phases: dict[str, dict] = {}
+    for s in spans:
+        duration = s["end"] - s["start"]
+        stats = phases.setdefault(
+            s["name"], {"count": 0, "total": 0.0, "max": 0.0, "processes": set()}
+        )
+        stats["count"] += 1
+        stats["total"] += duration
+        stats["max"] = max(stats["max"], duration)
+        stats["processes"].add(s["pid"])
+    for stats in phases.values():
+        stats["mean"] = stats["total"] / stats["count"]
+        stats["share"] = stats["total"] / wall if wall else 0.0
+        stats["processes"] = len(stats["processes"])
+    return {
+        "wall_time": wall,
+        "phases": dict(sorted(phases.items(), key=lambda kv: -kv[1]["total"])),
+    }
+
+
+def print_phase_summary(summary: dict) -> None:
+    from rich import print
+    from rich.table import Table
+
+    table = Table(
+        title=f"Time per phase (wall time {summary['wall_time']:.1f}s, nested phases overlap)"
+    )
+    for column in ("phase", "count", "total (s)", "mean (s)", "max (s)", "% of wall", "processes"):
+        table.add_column(column, justify="left" if column == "phase" else "right")
+    for name, stats in summary["phases"].items():
+        table.add_row(
+            name,
+            str(stats["count"]),
+            f"{stats['total']:.1f}",
+            f"{stats['mean']:.2f}",
+            f"{stats['max']:.2f}",
+            f"{100 * stats['share']:.1f}",
+            str(stats["processes"]),
+        )
+    print(table)
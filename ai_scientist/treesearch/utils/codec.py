@@ -0,0 +1,183 @@
+"""
+Compact binary encoding of the nodes sent between `ParallelAgent` and its
+workers (see work_order.py).
+
+Instead of building a dict with one key per field and pickling it, the codec
+writes a small struct header (magic, schema version, body format) followed by a
+tuple of the field values in a fixed, versioned order, serialized with
+`marshal`. Bodies containing values marshal can't handle (e.g. numpy arrays in
+`plot_data`) fall back to pickle. Journals and checkpoints are still persisted
+as JSON (serialize.py) and pickle.
+
+Decoding also accepts the dict/JSON form produced by `Node.to_dict`, and hands
+it to `Node.from_dict`.
+"""
+
+import json
+import marshal
+import pickle
+import struct
+from pathlib import Path
+from typing import Any, Optional
+
+from ..journal import Journal, Node
+from .metric import MetricValue, WorstMetricValue
+
+MAGIC = b"AISn"
+SCHEMA_VERSION = 1
+_HEADER = struct.Struct("<4sBB")
+_MARSHAL, _PICKLE = 0, 1
+_MARSHAL_VERSION = 4
+
+# record kind, the first element of every body
+_NODE = 0
+
+# field order per schema version. New Node fields need to be added here (with a
+# new SCHEMA_VERSION), otherwise they are not transferred.
+_NODE_FIELDS = {
+    1: (
+        "plan",
+        "overall_plan",
+        "code",
+        "plot_code",
+        "plot_plan",
+        "step",
+        "id",
+        "ctime",
+        "exp_results_dir",
+        "_term_out",
+        "exec_time",
+        "exc_type",
+        "exc_info",
+        "exc_stack",
+        "exec_resources",
+        "parse_metrics_plan",
+        "parse_metrics_code",
+        "parse_term_out",
+        "parse_exc_type",
+        "parse_exc_info",
+        "parse_exc_stack",
+        "parse_exec_resources",
+        "plot_term_out",
+        "plot_exec_time",
+        "plot_exc_type",
+        "plot_exc_info",
+        "plot_exc_stack",
+        "plot_exec_resources",
+        "analysis",
+        "metric",
+        "is_buggy",
+        "is_buggy_plots",
+        "plot_data",
+        "plots_generated",
+        "plots",
+        "plot_paths",
+        "plot_analyses",
+        "vlm_feedback_summary",
+        "datasets_successfully_tested",
+        "exec_time_feedback",
+        "ablation_name",
+        "hyperparam_name",
+        "is_seed_node",
+        "is_seed_agg_node",
+    )
+}
+
+
+def _pack(body: tuple) -> bytes:
+    try:
+        return _HEADER.pack(MAGIC, SCHEMA_VERSION, _MARSHAL) + marshal.dumps(
+            body, _MARSHAL_VERSION
+        )
+    except ValueError:
+        # unmarshallable value somewhere in the body
+        return _HEADER.pack(MAGIC, SCHEMA_VERSION, _PICKLE) + pickle.dumps(
+            body, pickle.HIGHEST_PROTOCOL
+        )
+
+
+def _unpack(data: bytes, kind: int) -> tuple[int, tuple]:
+    """Return (schema version, body) of encoded data of the given record kind."""
+    magic, version, body_format = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not codec-encoded data")
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"unsupported schema version {version}")
+    payload = memoryview(data)[_HEADER.size :]
+    body = marshal.loads(payload) if body_format == _MARSHAL else pickle.loads(payload)
+    if body[0] != kind:
+        raise ValueError(f"expected record kind {kind}, got {body[0]}")
+    return version, body
+
+
+def is_encoded(data: Any) -> bool:
+    return isinstance(data, (bytes, bytearray)) and data[:4] == MAGIC
+
+
+def _legacy_dict(data: Any) -> dict:
+    """dict of a `to_dict` payload given as a dict, JSON string or JSON bytes"""
+    if isinstance(data, dict):
+        return dict(data)
+    return json.loads(data)
+
+
+def _metric_body(metric: Optional[MetricValue]):
+    if metric is None:
+        return None
+    return (
+        isinstance(metric, WorstMetricValue),
+        metric.value,
+        metric.maximize,
+        getattr(metric, "name", None),
+        getattr(metric, "description", None),
+    )
+
+
+def _metric_from_body(body) -> Optional[MetricValue]:
+    if body is None:
+        return None
+    worst, value, maximize, name, description = body
+    cls = WorstMetricValue if worst else MetricValue
+    return cls(value=value, maximize=maximize, name=name, description=description)
+
+
+def _node_body(node: Node, overrides: dict) -> tuple:
+    values = []
+    for name in _NODE_FIELDS[SCHEMA_VERSION]:
+        value = overrides[name] if name in overrides else getattr(node, name, None)
+        if name == "metric":
+            value = _metric_body(value)
+        elif isinstance(value, Path):
+            value = str(value)
+        values.append(value)
+    parent_id = None if node.parent is None else node.parent.id
+    return (_NODE, parent_id, *values)
+
+
+def _node_from_body(version: int, body: tuple) -> tuple[Node, Optional[str]]:
+    kwargs = dict(zip(_NODE_FIELDS[version], body[2:]))
+    kwargs["metric"] = _metric_from_body(kwargs["metric"])
+    return Node(**kwargs), body[1]
+
+
+def encode_node(node: Node, **overrides) -> bytes:
+    """
+    Encode a node. The parent is stored as its id, children are not stored
+    (they point back to their parent). `overrides` replace field values of the
+    node, e.g. `code=...`, without modifying it.
+    """
+    return _pack(_node_body(node, overrides))
+
+
+def decode_node(data, journal: Optional[Journal] = None) -> Node:
+    """Decode a node, linking it to its parent in `journal` like `Node.from_dict`."""
+    if not is_encoded(data):
+        return Node.from_dict(_legacy_dict(data), journal)
+    version, body = _unpack(data, _NODE)
+    node, parent_id = _node_from_body(version, body)
+    if journal is not None and parent_id:
+        parent = journal.get_node_by_id(parent_id)
+        if parent:
+            node.parent = parent
+            parent.children.add(node)
+    return node
@@ -1,6 +1,6 @@
 """configuration and setup utils"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Hashable, cast, Literal, Optional
 
@@ -41,11 +41,26 @@ class StageConfig:
     max_tokens: Optional[int] = None
 
 
+@dataclass
+class BanditConfig:
+    # "thompson" (sample the estimates) or "ucb" (means plus an exploration bonus)
+    method: str = "thompson"
+    # weight of the UCB exploration bonus
+    exploration: float = 1.0
+    # relative metric change of an improvement, assumed until some were observed
+    prior_gain: float = 0.05
+    # per-node time besides code execution (LLM calls), added to the execution time
+    overhead_s: float = 0.0
+
+
 @dataclass
 class SearchConfig:
     max_debug_depth: int
     debug_prob: float
     num_drafts: int
+    # node selection policy, see treesearch/selection.py
+    policy: str = "default"
+    bandit: BanditConfig = field(default_factory=BanditConfig)
 
 
 @dataclass
@@ -53,6 +68,14 @@ class DebugConfig:
     stage4: bool
 
 
+@dataclass
+class PipelineConfig:
+    # share num_workers execution slots between more worker processes, so that
+    # LLM calls of one node overlap with code execution of another
+    enabled: bool = False
+    llm_workers: int | None = None  # worker processes, defaults to 2 * slots
+
+
 @dataclass
 class AgentConfig:
     steps: int
@@ -69,6 +92,48 @@ class AgentConfig:
     num_workers: int
     type: str
     multi_seed_eval: dict[str, int]
+    # "batch": select num_workers nodes per step and wait for all of them,
+    # "steady": refill a worker as soon as any node finishes
+    scheduling: str = "batch"
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+
+
+@dataclass
+class OutputCaptureConfig:
+    # "stream": one queue message per write, "bounded": chunked head/tail capture
+    mode: str = "stream"
+    chunk_chars: int = 64 * 1024
+    head_chars: int = 32 * 1024
+    tail_chars: int = 32 * 1024
+
+
+@dataclass
+class ResourceLimitsConfig:
+    # per-execution limits of experiment processes, None means unlimited
+    memory_mb: int | None = None  # address space (RLIMIT_AS)
+    rss_mb: int | None = None  # resident memory incl. subprocesses
+    cpu_seconds: int | None = None
+    open_files: int | None = None
+    threads: int | None = None  # OMP/MKL/OpenBLAS thread pools
+
+
+@dataclass
+class AdmissionConfig:
+    # don't submit new nodes while the host has less free memory than this
+    min_free_memory_mb: int = 0
+    poll_interval: float = 5.0
+    # submit anyway after waiting this long (None waits indefinitely)
+    max_wait: float | None = 600.0
+
+
+@dataclass
+class ExecCacheConfig:
+    # reuse results (and working/ artifacts) of byte-identical code runs
+    enabled: bool = False
+    dir: str | None = None  # defaults to <workspace_dir>/exec_cache
+    max_size_mb: float | None = 2048
+    max_age_hours: float | None = 72
+    max_entry_mb: float | None = 256
 
 
 @dataclass
@@ -76,6 +141,12 @@ class ExecConfig:
     timeout: int
     agent_file_name: str
     format_tb_ipython: bool
+    # modules imported once by a warm forkserver that experiment processes are forked from
+    preload_modules: list[str] = field(default_factory=list)
+    output_capture: OutputCaptureConfig = field(default_factory=OutputCaptureConfig)
+    limits: ResourceLimitsConfig = field(default_factory=ResourceLimitsConfig)
+    admission: AdmissionConfig = field(default_factory=AdmissionConfig)
+    cache: ExecCacheConfig = field(default_factory=ExecCacheConfig)
 
 
 @dataclass
@@ -83,6 +154,13 @@ class ExperimentConfig:
     num_syn_datasets: int
 
 
+@dataclass
+class JournalLogConfig:
+    # append new and changed nodes to <log_dir>/journal_log.jsonl after every step
+    enabled: bool = True
+    fsync: bool = True
+
+
 @dataclass
 class Config(Hashable):
     data_dir: Path
@@ -105,6 +183,7 @@ class Config(Hashable):
     agent: AgentConfig
     experiment: ExperimentConfig
     debug: DebugConfig
+    journal_log: JournalLogConfig = field(default_factory=JournalLogConfig)
 
 
 def _get_next_logindex(dir: Path) -> int:
@@ -1,4 +1,3 @@
-import copy
 import json
 from pathlib import Path
 from typing import Type, TypeVar
@@ -11,22 +10,22 @@ from ..journal import Journal, Node
 def dumps_json(obj: dataclasses_json.DataClassJsonMixin):
     """Serialize dataclasses (such as Journals) to JSON."""
     if isinstance(obj, Journal):
-        obj = copy.deepcopy(obj)
         node2parent = {}
+        nodes = []
         for n in obj.nodes:
             if n.parent is not None:
                 # Handle both Node objects and string IDs
                 parent_id = n.parent.id if isinstance(n.parent, Node) else n.parent
                 node2parent[n.id] = parent_id
-        for n in obj.nodes:
-            n.parent = None
-            n.children = set()
-
-    obj_dict = obj.to_dict()
-
-    if isinstance(obj, Journal):
-        obj_dict["node2parent"] = node2parent
-        obj_dict["__version"] = "2"
+            # relationships are stored in node2parent only
+            # (instead of deep-copying the journal to detach the nodes)
+            node_dict = n.to_dict()
+            node_dict["parent_id"] = None
+            node_dict["children"] = []
+            nodes.append(node_dict)
+        obj_dict = {"nodes": nodes, "node2parent": node2parent, "__version": "2"}
+    else:
+        obj_dict = obj.to_dict()
 
     return json.dumps(obj_dict, separators=(",", ":"))
 
@@ -41,15 +40,7 @@ G = TypeVar("G", bound=dataclasses_json.DataClassJsonMixin)
 
 def loads_json(s: str, cls: Type[G]) -> G:
     """Deserialize JSON to AIDE dataclasses."""
-    obj_dict = json.loads(s)
-    obj = cls.from_dict(obj_dict)
-
-    if isinstance(obj, Journal):
-        id2nodes = {n.id: n for n in obj.nodes}
-        for child_id, parent_id in obj_dict["node2parent"].items():
-            id2nodes[child_id].parent = id2nodes[parent_id]
-            id2nodes[child_id].__post_init__()
-    return obj
+    return cls.from_dict(json.loads(s))
 
 
 def load_json(path: Path, cls: Type[G]) -> G:
@@ -1,15 +1,49 @@
-"""Export journal to HTML visualization of tree + code."""
-
+"""Export journal to HTML visualization of tree + code.
+
+The export runs after every step, so it only redoes the work for what changed
+since the previous export of the same journal (see `Journal.changed_since`):
+- the tree layout is cached, and nodes added below existing nodes are placed
+  next to their siblings instead of laying out the whole tree again,
+- the code, outputs and analyses of each node are written to a detail file in
+  `NODE_DIR` (only for new or updated nodes), which the page loads when the node
+  is selected; `tree_data.json` and `tree_plot.html` only hold the tree and the
+  per-node metrics,
+- the unified page embeds the stage metadata and the tree of the current stage,
+  and loads the trees of the other stages from their directories.
+
+Files loaded by the page are scripts passing their data to `DATA_CALLBACK`
+rather than JSON files, since pages opened from disk (file://) can load scripts
+but can't fetch files.
+"""
+
+import bisect
 import json
 import textwrap
+import weakref
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
 from igraph import Graph
-from ..journal import Journal
+from ..journal import Journal, Node
 
 from rich import print
 
+# directory (next to tree_data.json) of the per-node detail files
+NODE_DIR = "tree_nodes"
+# function of the page that the scripts it loads (node details, tree_data.js) call
+DATA_CALLBACK = "registerVizData"
+# per-node fields kept in tree_data.json, everything else is in the detail files
+SUMMARY_FIELDS = (
+    "exc_type",
+    "exec_time",
+    "ablation_name",
+    "hyperparam_name",
+    "is_seed_node",
+    "is_seed_agg_node",
+)
+
 
 def get_edges(journal: Journal):
     for node in journal:
@@ -17,18 +51,23 @@ def get_edges(journal: Journal):
             yield (node.step, c.step)
 
 
-def generate_layout(n_nodes, edges, layout_type="rt"):
-    """Generate visual layout of graph"""
+def _raw_layout(n_nodes, edges, layout_type="rt"):
     layout = Graph(
         n_nodes,
         edges=edges,
         directed=True,
     ).layout(layout_type)
-    y_max = max(layout[k][1] for k in range(n_nodes))
-    layout_coords = []
-    for n in range(n_nodes):
-        layout_coords.append((layout[n][0], 2 * y_max - layout[n][1]))
-    return np.array(layout_coords)
+    return [(layout[n][0], layout[n][1]) for n in range(n_nodes)]
+
+
+def _flip_layout(coords):
+    y_max = max(y for _, y in coords)
+    return np.array([(x, 2 * y_max - y) for x, y in coords])
+
+
+def generate_layout(n_nodes, edges, layout_type="rt"):
+    """Generate visual layout of graph"""
+    return _flip_layout(_raw_layout(n_nodes, edges, layout_type))
 
 
 def normalize_layout(layout: np.ndarray):
@@ -40,24 +79,22 @@ def normalize_layout(layout: np.ndarray):
     return layout
 
 
-def get_completed_stages(log_dir):
+def _completed_stage_dirs(log_dir) -> dict:
     """
-    Determine completed stages by checking for the existence of stage directories
-    that contain evidence of completion (tree_data.json, tree_plot.html, or journal.json).
-
-    Returns:
-        list: A list of stage names (e.g., ["Stage_1", "Stage_2"])
+    Stage name (e.g. "Stage_1") -> directory of the stage, for the stages whose
+    directory contains evidence of completion (tree_data.json, tree_plot.html, or
+    journal.json).
     """
-    completed_stages = []
+    stage_dirs = {}
 
     # Check for each stage (1-4)
     for stage_num in range(1, 5):
         prefix = f"stage_{stage_num}"
 
         # Find all directories that match this stage number
-        matching_dirs = [
+        matching_dirs = sorted(
             d for d in log_dir.iterdir() if d.is_dir() and d.name.startswith(prefix)
-        ]
+        )
 
         # Check if any of these directories have completion evidence
         for stage_dir in matching_dirs:
@@ -67,334 +104,272 @@ def get_completed_stages(log_dir):
 
             if has_tree_data or has_tree_plot or has_journal:
                 # Found evidence this stage was completed
-                completed_stages.append(f"Stage_{stage_num}")
+                stage_dirs[f"Stage_{stage_num}"] = stage_dir.name
                 break  # No need to check other directories for this stage
 
-    return completed_stages
-
+    return stage_dirs
 
-def cfg_to_tree_struct(cfg, jou: Journal, out_path: Path = None):
-    edges = list(get_edges(jou))
-    print(f"[red]Edges: {edges}[/red]")
-    try:
-        gen_layout = generate_layout(len(jou), edges)
-    except Exception as e:
-        print(f"Error in generate_layout: {e}")
-        raise
-    try:
-        layout = normalize_layout(gen_layout)
-    except Exception as e:
-        print(f"Error in normalize_layout: {e}")
-        raise
 
-    best_node = jou.get_best_node()
-    metrics = []
-    is_best_node = []
+def get_completed_stages(log_dir):
+    """
+    Determine completed stages by checking for the existence of stage directories
+    that contain evidence of completion (tree_data.json, tree_plot.html, or journal.json).
 
-    for n in jou:
-        # print(f"Node {n.id} exc_stack: {type(n.exc_stack)} = {n.exc_stack}")
-        if n.metric:
-            # Pass the entire metric structure for the new format
-            if isinstance(n.metric.value, dict) and "metric_names" in n.metric.value:
-                metrics.append(n.metric.value)
-            else:
-                # Handle legacy format by wrapping it in the new structure
-                metrics.append(
+    Returns:
+        list: A list of stage names (e.g., ["Stage_1", "Stage_2"])
+    """
+    return list(_completed_stage_dirs(log_dir))
+
+
+def _wrap(value) -> str:
+    return textwrap.fill(str(value) if value is not None else "", width=80)
+
+
+def node_metrics(n: Node):
+    """Metric of a node in the structure shown by the visualization (or None)."""
+    if not n.metric:
+        return None
+    # Pass the entire metric structure for the new format
+    if isinstance(n.metric.value, dict) and "metric_names" in n.metric.value:
+        return n.metric.value
+    # Handle legacy format by wrapping it in the new structure
+    return {
+        "metric_names": [
+            {
+                "metric_name": n.metric.name or "value",
+                "lower_is_better": not n.metric.maximize,
+                "description": n.metric.description or "",
+                "data": [
                     {
-                        "metric_names": [
-                            {
-                                "metric_name": n.metric.name or "value",
-                                "lower_is_better": not n.metric.maximize,
-                                "description": n.metric.description or "",
-                                "data": [
-                                    {
-                                        "dataset_name": "default",
-                                        "final_value": n.metric.value,
-                                        "best_value": n.metric.value,
-                                    }
-                                ],
-                            }
-                        ]
+                        "dataset_name": "default",
+                        "final_value": n.metric.value,
+                        "best_value": n.metric.value,
                     }
-                )
-        else:
-            metrics.append(None)
-
-        # Track whether this is the best node
-        is_best_node.append(n is best_node)
-
-    tmp = {}
-
-    # Add each item individually with error handling
-    try:
-        tmp["edges"] = edges
-    except Exception as e:
-        print(f"Error setting edges: {e}")
-        raise
-
-    try:
-        tmp["layout"] = layout.tolist()
-    except Exception as e:
-        print(f"Error setting layout: {e}")
-        raise
-
-    try:
-        tmp["plan"] = [
-            textwrap.fill(str(n.plan) if n.plan is not None else "", width=80)
-            for n in jou.nodes
-        ]
-    except Exception as e:
-        print(f"Error setting plan: {e}")
-        raise
-
-    try:
-        tmp["code"] = [n.code for n in jou]
-    except Exception as e:
-        print(f"Error setting code: {e}")
-        raise
-
-    try:
-        tmp["term_out"] = [
-            textwrap.fill(str(n._term_out) if n._term_out is not None else "", width=80)
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting term_out: {e}")
-        print(f"n.term_out: {n._term_out}")
-        raise
-
-    try:
-        tmp["analysis"] = [
-            textwrap.fill(str(n.analysis) if n.analysis is not None else "", width=80)
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting analysis: {e}")
-        raise
-
-    try:
-        tmp["exc_type"] = [n.exc_type for n in jou]
-    except Exception as e:
-        print(f"Error setting exc_type: {e}")
-        raise
-
-    try:
-        tmp["exc_info"] = [n.exc_info for n in jou]
-    except Exception as e:
-        print(f"Error setting exc_info: {e}")
-        raise
-
-    try:
-        tmp["exc_stack"] = [n.exc_stack for n in jou]
-    except Exception as e:
-        print(f"Error setting exc_stack: {e}")
-        raise
-
-    try:
-        tmp["exp_name"] = cfg.exp_name
-    except Exception as e:
-        print(f"Error setting exp_name: {e}")
-        raise
-
-    try:
-        tmp["metrics"] = metrics
-    except Exception as e:
-        print(f"Error setting metrics: {e}")
-        raise
-
-    try:
-        tmp["is_best_node"] = is_best_node
-    except Exception as e:
-        print(f"Error setting is_best_node: {e}")
-        raise
-
-    try:
-        tmp["plots"] = [n.plots for n in jou]
-    except Exception as e:
-        print(f"Error setting plots: {e}")
-        raise
-
-    try:
-        tmp["plot_paths"] = [n.plot_paths for n in jou]
-    except Exception as e:
-        print(f"Error setting plot_paths: {e}")
-        raise
-
-    try:
-        tmp["plot_analyses"] = [n.plot_analyses for n in jou]
-    except Exception as e:
-        print(f"Error setting plot_analyses: {e}")
-        raise
-
-    try:
-        tmp["vlm_feedback_summary"] = [
-            textwrap.fill(
-                (
-                    str(n.vlm_feedback_summary)
-                    if n.vlm_feedback_summary is not None
-                    else ""
-                ),
-                width=80,
-            )
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting vlm_feedback_summary: {e}")
-        raise
-
-    try:
-        tmp["exec_time"] = [n.exec_time for n in jou]
-    except Exception as e:
-        print(f"Error setting exec_time: {e}")
-        raise
-
-    try:
-        tmp["exec_time_feedback"] = [
-            textwrap.fill(
-                str(n.exec_time_feedback) if n.exec_time_feedback is not None else "",
-                width=80,
-            )
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting exec_time_feedback: {e}")
-        raise
-
-    try:
-        tmp["datasets_successfully_tested"] = [
-            n.datasets_successfully_tested for n in jou
+                ],
+            }
         ]
-    except Exception as e:
-        print(f"Error setting datasets_successfully_tested: {e}")
-        raise
+    }
+
+
+def node_summary(n: Node) -> dict:
+    """Per-node values kept in tree_data.json."""
+    summary = {name: getattr(n, name) for name in SUMMARY_FIELDS}
+    summary["metrics"] = node_metrics(n)
+    return summary
+
+
+def _encoded_summary(n: Node) -> dict:
+    return {name: json.dumps(value) for name, value in node_summary(n).items()}
+
+
+def node_details(n: Node) -> dict:
+    """Per-node values written to the detail file of the node."""
+    return {
+        "plan": _wrap(n.plan),
+        "code": n.code,
+        "term_out": _wrap(n._term_out),
+        "analysis": _wrap(n.analysis),
+        "exc_info": n.exc_info,
+        "exc_stack": n.exc_stack,
+        "plots": n.plots,
+        "plot_paths": n.plot_paths,
+        "plot_analyses": n.plot_analyses,
+        "vlm_feedback_summary": _wrap(n.vlm_feedback_summary),
+        "exec_time_feedback": _wrap(n.exec_time_feedback),
+        "datasets_successfully_tested": n.datasets_successfully_tested,
+        "plot_code": n.plot_code,
+        "plot_plan": n.plot_plan,
+        "parse_metrics_plan": _wrap(n.parse_metrics_plan),
+        "parse_metrics_code": n.parse_metrics_code,
+        "parse_term_out": _wrap(n.parse_term_out),
+        "parse_exc_type": n.parse_exc_type,
+        "parse_exc_info": n.parse_exc_info,
+        "parse_exc_stack": n.parse_exc_stack,
+    }
 
-    try:
-        tmp["plot_code"] = [n.plot_code for n in jou]
-    except Exception as e:
-        print(f"Error setting plot_code: {e}")
-        raise
 
-    try:
-        tmp["plot_plan"] = [n.plot_plan for n in jou]
-    except Exception as e:
-        print(f"Error setting plot_plan: {e}")
-        raise
+def cfg_to_tree_struct(cfg, jou: Journal, out_path: Path = None):
+    """Tree data of a journal with the details of all nodes inlined (as exported before
+    the details moved to per-node files)."""
+    edges = list(get_edges(jou))
+    layout = normalize_layout(generate_layout(len(jou), edges))
+    # metric-only, so that exporting the tree doesn't cost an LLM query
+    best_node = jou.get_best_node(use_val_metric_only=True)
 
-    try:
-        tmp["ablation_name"] = [n.ablation_name for n in jou]
-    except Exception as e:
-        print(f"Error setting ablation_name: {e}")
-        raise
+    tmp = {"edges": edges, "layout": layout.tolist(), "exp_name": cfg.exp_name}
+    for n in jou:
+        values = {**node_summary(n), **node_details(n)}
+        values["is_best_node"] = n is best_node
+        for name, value in values.items():
+            tmp.setdefault(name, []).append(value)
 
-    try:
-        tmp["hyperparam_name"] = [n.hyperparam_name for n in jou]
-    except Exception as e:
-        print(f"Error setting hyperparam_name: {e}")
-        raise
+    # Add the list of completed stages by checking directories
+    if out_path:
+        log_dir = out_path.parent.parent
+        tmp["completed_stages"] = get_completed_stages(log_dir)
 
-    try:
-        tmp["is_seed_node"] = [n.is_seed_node for n in jou]
-    except Exception as e:
-        print(f"Error setting is_seed_node: {e}")
-        raise
+    return tmp
 
-    try:
-        tmp["is_seed_agg_node"] = [n.is_seed_agg_node for n in jou]
-    except Exception as e:
-        print(f"Error setting is_seed_agg_node: {e}")
-        raise
 
-    try:
-        tmp["parse_metrics_plan"] = [
-            textwrap.fill(
-                str(n.parse_metrics_plan) if n.parse_metrics_plan is not None else "",
-                width=80,
-            )
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting parse_metrics_plan: {e}")
-        raise
+@dataclass
+class _ExportState:
+    """What the previous export of a journal to a given path produced."""
+
+    journal: weakref.ref
+    revision: int = 0
+    # per node (by step): parent step, raw layout coordinates and JSON-encoded summary
+    parents: list = field(default_factory=list)
+    coords: list = field(default_factory=list)
+    summaries: list = field(default_factory=list)
+    # y -> sorted x of the laid out nodes, step -> steps of the children
+    rows: dict = field(default_factory=dict)
+    children: dict = field(default_factory=dict)
+    layout_valid: bool = False
+    layouts_reused: int = 0
+    layouts_computed: int = 0
+
+    def relayout(self):
+        edges = [(p, c) for c, p in enumerate(self.parents) if p is not None]
+        self.coords = _raw_layout(len(self.parents), edges)
+        self.rows, self.children = {}, {}
+        for step, ((x, y), parent) in enumerate(zip(self.coords, self.parents)):
+            bisect.insort(self.rows.setdefault(y, []), x)
+            if parent is not None:
+                self.children.setdefault(parent, []).append(step)
+        self.layout_valid = True
+        self.layouts_computed += 1
+
+    def place(self, step: int) -> bool:
+        """
+        Lay out a new node without moving the others: below its parent, right of
+        its siblings (new roots go right of everything). Returns False if that spot
+        is taken, then the tree needs a new layout.
+        """
+        parent = self.parents[step]
+        if parent is None:
+            y = min(self.rows) if self.rows else 0.0
+            x = max((row[-1] for row in self.rows.values()), default=-1.0) + 1
+        else:
+            parent_x, parent_y = self.coords[parent]
+            siblings = self.children.get(parent, [])
+            y = parent_y + 1
+            x = max(self.coords[s][0] for s in siblings) + 1 if siblings else parent_x
+        row = self.rows.setdefault(y, [])
+        i = bisect.bisect_left(row, x)
+        # siblings are 1 apart in the Reingold-Tilford layout
+        if (i < len(row) and row[i] - x < 1) or (i > 0 and x - row[i - 1] < 1):
+            return False
+        row.insert(i, x)
+        self.coords.append((x, y))
+        if parent is not None:
+            self.children.setdefault(parent, []).append(step)
+        return True
 
-    try:
-        tmp["parse_metrics_code"] = [n.parse_metrics_code for n in jou]
-    except Exception as e:
-        print(f"Error setting parse_metrics_code: {e}")
-        raise
 
-    try:
-        tmp["parse_term_out"] = [
-            textwrap.fill(
-                str(n.parse_term_out) if n.parse_term_out is not None else "", width=80
-            )
-            for n in jou
-        ]
-    except Exception as e:
-        print(f"Error setting parse_term_out: {e}")
-        raise
+# export path -> state of the last export to it
+_export_states: dict[Path, _ExportState] = {}
 
-    try:
-        tmp["parse_exc_type"] = [n.parse_exc_type for n in jou]
-    except Exception as e:
-        print(f"Error setting parse_exc_type: {e}")
-        raise
 
-    try:
-        tmp["parse_exc_info"] = [n.parse_exc_info for n in jou]
-    except Exception as e:
-        print(f"Error setting parse_exc_info: {e}")
-        raise
+def _write_data_script(path: Path, data_json: str) -> None:
+    """Write a script that hands `data_json` to the page loading it."""
+    with open(path, "w") as f:
+        f.write(f"{DATA_CALLBACK}({data_json});\n")
 
-    try:
-        tmp["parse_exc_stack"] = [n.parse_exc_stack for n in jou]
-    except Exception as e:
-        print(f"Error setting parse_exc_stack: {e}")
-        raise
 
-    # Add the list of completed stages by checking directories
-    if out_path:
-        log_dir = out_path.parent.parent
-        tmp["completed_stages"] = get_completed_stages(log_dir)
-
-    return tmp
+def export_tree_data(cfg, jou: Journal, out_path: Path) -> str:
+    """
+    Write the detail files of the nodes changed since the last export to `out_path`
+    and return the JSON of the tree data (tree, per-node summaries and export
+    statistics). The summaries of unchanged nodes are not encoded again.
+    """
+    state = _export_states.get(out_path)
+    if (
+        state is None
+        or state.journal() is not jou
+        or len(jou) < len(state.parents)
+        or jou.revision < state.revision
+    ):
+        state = _ExportState(journal=weakref.ref(jou))
+        _export_states[out_path] = state
+        changed = jou.nodes
+    else:
+        changed = jou.changed_since(state.revision)
+    state.revision = jou.revision
+
+    node_dir = out_path.parent / NODE_DIR
+    node_dir.mkdir(exist_ok=True)
+    new_steps = []
+    for n in changed:
+        parent = n.parent.step if n.parent is not None else None
+        if n.step < len(state.parents):
+            if state.parents[n.step] != parent:
+                state.layout_valid = False
+                state.parents[n.step] = parent
+            state.summaries[n.step] = _encoded_summary(n)
+        else:
+            state.parents.append(parent)
+            state.summaries.append(_encoded_summary(n))
+            new_steps.append(n.step)
+        _write_data_script(node_dir / f"{n.step}.js", json.dumps(node_details(n)))
+
+    if state.layout_valid and all(state.place(step) for step in new_steps):
+        if new_steps:
+            state.layouts_reused += 1
+    else:
+        state.relayout()
+
+    edges = [(p, c) for c, p in enumerate(state.parents) if p is not None]
+    layout = normalize_layout(_flip_layout(state.coords)) if state.coords else np.zeros((0, 2))
+    # metric-only, so that exporting the tree doesn't cost an LLM query
+    best_node = jou.get_best_node(use_val_metric_only=True)
+    best_step = best_node.step if best_node is not None else None
+
+    tree_data = {
+        "edges": edges,
+        "layout": layout.tolist(),
+        "exp_name": cfg.exp_name,
+        "node_dir": NODE_DIR,
+        "is_best_node": [step == best_step for step in range(len(state.summaries))],
+        "export_stats": {
+            "nodes_written": len(changed),
+            "layouts_reused": state.layouts_reused,
+            "layouts_computed": state.layouts_computed,
+        },
+        "completed_stages": get_completed_stages(out_path.parent.parent),
+    }
+    columns = [
+        f'"{name}": [{", ".join(s[name] for s in state.summaries)}]'
+        for name in ("metrics",) + SUMMARY_FIELDS
+    ]
+    return "{" + ", ".join([json.dumps(tree_data)[1:-1]] + columns) + "}"
+
+
+@lru_cache(maxsize=None)
+def _read_template(name: str) -> str:
+    with open(Path(__file__).parent / "viz_templates" / name) as f:
+        return f.read()
 
 
 def generate_html(tree_graph_str: str):
-    template_dir = Path(__file__).parent / "viz_templates"
-
-    with open(template_dir / "template.js") as f:
-        js = f.read()
-        js = js.replace('"PLACEHOLDER_TREE_DATA"', tree_graph_str)
-
-    with open(template_dir / "template.html") as f:
-        html = f.read()
-        html = html.replace("<!-- placeholder -->", js)
-
-        return html
+    js = _read_template("template.js").replace('"PLACEHOLDER_TREE_DATA"', tree_graph_str)
+    return _read_template("template.html").replace("<!-- placeholder -->", js)
 
 
 def generate(cfg, jou: Journal, out_path: Path):
-    print("[red]Checking Journal[/red]")
     try:
-        tree_struct = cfg_to_tree_struct(cfg, jou, out_path)
+        tree_graph_str = export_tree_data(cfg, jou, out_path)
     except Exception as e:
-        print(f"Error in cfg_to_tree_struct: {e}")
+        print(f"Error in export_tree_data: {e}")
         raise
 
-    # Save tree data as JSON for loading by the tabbed visualization
+    # Save tree data as JSON, and as a script for loading by the tabbed visualization
     try:
-        # Save the tree data as a JSON file in the same directory
-        data_path = out_path.parent / "tree_data.json"
-        with open(data_path, "w") as f:
-            json.dump(tree_struct, f)
+        with open(out_path.parent / "tree_data.json", "w") as f:
+            f.write(tree_graph_str)
+        _write_data_script(out_path.parent / "tree_data.js", tree_graph_str)
     except Exception as e:
         print(f"Error saving tree data JSON: {e}")
 
-    try:
-        tree_graph_str = json.dumps(tree_struct)
-    except Exception as e:
-        print(f"Error in json.dumps: {e}")
-        raise
     try:
         html = generate_html(tree_graph_str)
     except Exception as e:
@@ -405,16 +380,17 @@ def generate(cfg, jou: Journal, out_path: Path):
 
     # Create a unified tree visualization that shows all stages
     try:
-        create_unified_viz(cfg, out_path)
+        create_unified_viz(cfg, out_path, tree_graph_str)
     except Exception as e:
         print(f"Error creating unified visualization: {e}")
         # Continue even if unified viz creation fails
 
 
-def create_unified_viz(cfg, current_stage_viz_path):
+def create_unified_viz(cfg, current_stage_viz_path, tree_graph_str: str):
     """
     Create a unified visualization that shows all completed stages in a tabbed interface.
-    This will be placed in the main log directory.
+    This will be placed in the main log directory. It contains the stage metadata and
+    the tree data of the current stage, the page loads the other stages' tree data.
     """
     # The main log directory is two levels up from the stage-specific visualization
     log_dir = current_stage_viz_path.parent.parent
@@ -431,54 +407,19 @@ def create_unified_viz(cfg, current_stage_viz_path):
     # Create a combined visualization at the top level
     unified_viz_path = log_dir / "unified_tree_viz.html"
 
-    # Copy the template files
-    template_dir = Path(__file__).parent / "viz_templates"
-
-    with open(template_dir / "template.html") as f:
-        html = f.read()
-
-    with open(template_dir / "template.js") as f:
-        js = f.read()
-
     # Get completed stages by checking directories
-    completed_stages = get_completed_stages(log_dir)
-
-    # Try to load the current stage's tree data to use as a basis
-    try:
-        current_stage_data_path = current_stage_viz_path.parent / "tree_data.json"
-        if current_stage_data_path.exists():
-            with open(current_stage_data_path, "r") as f:
-                base_data = json.load(f)
-                # Add the necessary metadata
-                base_data["current_stage"] = current_stage
-                base_data["completed_stages"] = completed_stages
-        else:
-            # If we can't load the tree data, create a minimal structure
-            base_data = {
-                "current_stage": current_stage,
-                "completed_stages": completed_stages,
-                # Add empty layout and edges to prevent errors
-                "layout": [],
-                "edges": [],
-            }
-    except Exception as e:
-        print(f"Error loading stage data: {e}")
-        # Create a minimal data structure that won't cause JS errors
-        base_data = {
-            "current_stage": current_stage,
-            "completed_stages": completed_stages,
-            "layout": [],
-            "edges": [],
-        }
-
-    # Replace the placeholder in the JS with our data
-    js = js.replace('"PLACEHOLDER_TREE_DATA"', json.dumps(base_data))
-
-    # Replace the placeholder in the HTML with our JS
-    html = html.replace("<!-- placeholder -->", js)
+    stage_dirs = _completed_stage_dirs(log_dir)
+    metadata = {
+        "current_stage": current_stage,
+        "completed_stages": list(stage_dirs),
+        "stage_dirs": stage_dirs,
+    }
 
     # Write the unified visualization
     with open(unified_viz_path, "w") as f:
-        f.write(html)
-
-    print(f"[green]Created unified visualization at {unified_viz_path}[/green]")
+        f.write(
+            generate_html(
+                json.dumps(metadata)[:-1]
+                + f', "current_stage_data": {tree_graph_str}}}'
+            )
+        )
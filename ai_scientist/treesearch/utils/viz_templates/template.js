@@ -325,29 +325,93 @@ function createTreeSketch(stageId) {
       }
     };
 
+    let selectedIndex = null;
+
     function updateNodeInfo(nodeIndex) {
       if (treeData) {
-        setNodeInfo(
-          treeData.code[nodeIndex],
-          treeData.plan[nodeIndex],
-          treeData.plot_code?.[nodeIndex],
-          treeData.plot_plan?.[nodeIndex],
-          treeData.metrics?.[nodeIndex],
-          treeData.exc_type?.[nodeIndex] || '',
-          treeData.exc_info?.[nodeIndex]?.args?.[0] || '',
-          treeData.exc_stack?.[nodeIndex] || [],
-          treeData.plots?.[nodeIndex] || [],
-          treeData.plot_analyses?.[nodeIndex] || [],
-          treeData.vlm_feedback_summary?.[nodeIndex] || '',
-          treeData.datasets_successfully_tested?.[nodeIndex] || [],
-          treeData.exec_time_feedback?.[nodeIndex] || '',
-          treeData.exec_time?.[nodeIndex] || ''
-        );
+        selectedIndex = nodeIndex;
+        loadNodeDetails(treeData, nodeIndex).then(details => {
+          // Ignore details arriving after another node was selected
+          if (selectedIndex !== nodeIndex) return;
+          setNodeInfo(
+            details.code,
+            details.plan,
+            details.plot_code,
+            details.plot_plan,
+            treeData.metrics?.[nodeIndex],
+            treeData.exc_type?.[nodeIndex] || '',
+            details.exc_info?.args?.[0] || '',
+            details.exc_stack || [],
+            details.plots || [],
+            details.plot_analyses || [],
+            details.vlm_feedback_summary || '',
+            details.datasets_successfully_tested || [],
+            details.exec_time_feedback || '',
+            treeData.exec_time?.[nodeIndex] || ''
+          );
+        }).catch(error => {
+          console.error(`Error loading details of node ${nodeIndex}:`, error);
+          if (selectedIndex !== nodeIndex) return;
+          setNodeInfo(null, `Could not load the node details (${error.message}). ` +
+            'They are loaded from the tree_nodes directory next to the stage\'s tree_data.json.');
+        });
       }
     }
   };
 }
 
+// Per-node fields that are not part of the tree data itself
+const nodeDetailFields = ['code', 'plan', 'plot_code', 'plot_plan', 'exc_info', 'exc_stack', 'plots',
+  'plot_analyses', 'vlm_feedback_summary', 'datasets_successfully_tested', 'exec_time_feedback'];
+
+// Data files are scripts that pass their data to registerVizData: unlike fetch,
+// script tags also work when the page is opened from disk (file://)
+const pendingDataScripts = {};
+
+function registerVizData(data) {
+  const src = document.currentScript.src;
+  const pending = pendingDataScripts[src];
+  if (pending) {
+    delete pendingDataScripts[src];
+    pending.resolve(data);
+  }
+}
+
+function loadDataScript(src) {
+  return new Promise((resolve, reject) => {
+    const script = document.createElement('script');
+    script.src = src;
+    // script.src is the resolved URL, as is document.currentScript.src
+    pendingDataScripts[script.src] = { resolve, reject };
+    const settle = (message) => {
+      script.remove();
+      const pending = pendingDataScripts[script.src];
+      if (pending) {
+        delete pendingDataScripts[script.src];
+        pending.reject(new Error(message));
+      }
+    };
+    script.onload = () => settle(`${src} did not contain any data`);
+    script.onerror = () => settle(`could not load ${src}`);
+    document.head.appendChild(script);
+  });
+}
+
+// Load the details of a node, which are in one file per node in the data's node_dir
+// (older tree data has them inline as per-field lists)
+async function loadNodeDetails(data, nodeIndex) {
+  if (!data.node_dir) {
+    return Object.fromEntries(nodeDetailFields.map(field => [field, data[field]?.[nodeIndex]]));
+  }
+  data.nodeDetails = data.nodeDetails || {};
+  if (!data.nodeDetails[nodeIndex]) {
+    data.nodeDetails[nodeIndex] = await loadDataScript(
+      `${data.base_path}/${data.node_dir}/${nodeIndex}.js`
+    );
+  }
+  return data.nodeDetails[nodeIndex];
+}
+
 // Start a new p5 sketch for the given stage
 function startSketch(stageId) {
   if (currentSketch) {
@@ -396,8 +460,22 @@ async function loadAllStageData(baseTreeData) {
   // The base tree data is for the current stage
   const currentStageId = baseTreeData.current_stage || 'Stage_1';
 
-  // Ensure base tree data is valid and has required properties
-  if (baseTreeData && baseTreeData.layout && baseTreeData.edges) {
+  // Use relative path to load other stage trees
+  const logDirPath = baseTreeData.log_dir_path || '.';
+  console.log("Log directory path:", logDirPath);
+
+  // The unified page has the stage metadata and the current stage's tree data,
+  // and loads the tree data of the other stages
+  if (baseTreeData.stage_dirs) {
+    const currentData = baseTreeData.current_stage_data;
+    if (currentData && currentData.layout && currentData.edges) {
+      currentData.base_path = `${logDirPath}/${baseTreeData.stage_dirs[currentStageId]}`;
+      stageData[currentStageId] = currentData;
+      availableStages.push(currentStageId);
+    }
+  } else if (baseTreeData && baseTreeData.layout && baseTreeData.edges) {
+    // Ensure base tree data is valid and has required properties
+    baseTreeData.base_path = logDirPath;
     stageData[currentStageId] = baseTreeData;
     availableStages.push(currentStageId);
     console.log(`Added current stage ${currentStageId} to available stages`);
@@ -405,39 +483,35 @@ async function loadAllStageData(baseTreeData) {
     console.warn(`Current stage ${currentStageId} data is invalid:`, baseTreeData);
   }
 
-  // Use relative path to load other stage trees
-  const logDirPath = baseTreeData.log_dir_path || '.';
-  console.log("Log directory path:", logDirPath);
-
   // Load data for each stage if available
   const stageNames = ['Stage_1', 'Stage_2', 'Stage_3', 'Stage_4'];
   const stageNames2actualNames = {
     'Stage_1': 'stage_1_initial_implementation_1_preliminary',
     'Stage_2': 'stage_2_baseline_tuning_1_first_attempt',
     'Stage_3': 'stage_3_creative_research_1_first_attempt',
-    'Stage_4': 'stage_4_ablation_studies_1_first_attempt'
+    'Stage_4': 'stage_4_ablation_studies_1_first_attempt',
+    ...baseTreeData.stage_dirs
     }
 
   for (const stage of stageNames) {
 
+    if (stageData[stage]) {
+      continue; // Already loaded
+    }
     if (baseTreeData.completed_stages && baseTreeData.completed_stages.includes(stage)) {
       try {
-        console.log(`Attempting to load data for ${stage} from ${logDirPath}/${stageNames2actualNames[stage]}/tree_data.json`);
-        const response = await fetch(`${logDirPath}/${stageNames2actualNames[stage]}/tree_data.json`);
-
-        if (response.ok) {
-          const data = await response.json();
-
-          // Validate the loaded data
-          if (data && data.layout && data.edges) {
-            stageData[stage] = data;
-            availableStages.push(stage);
-            console.log(`Successfully loaded and validated data for ${stage}`);
-          } else {
-            console.warn(`Loaded data for ${stage} is invalid:`, data);
-          }
+        const stagePath = `${logDirPath}/${stageNames2actualNames[stage]}`;
+        console.log(`Attempting to load data for ${stage} from ${stagePath}/tree_data.js`);
+        const data = await loadDataScript(`${stagePath}/tree_data.js`);
+
+        // Validate the loaded data
+        if (data && data.layout && data.edges) {
+          data.base_path = stagePath;
+          stageData[stage] = data;
+          availableStages.push(stage);
+          console.log(`Successfully loaded and validated data for ${stage}`);
         } else {
-          console.warn(`Failed to load data for ${stage} - HTTP status ${response.status}`);
+          console.warn(`Loaded data for ${stage} is invalid:`, data);
         }
       } catch (error) {
         console.error(`Error loading data for ${stage}:`, error);
@@ -673,9 +747,10 @@ const treeStructData = "PLACEHOLDER_TREE_DATA";
 
 // Add log directory path and stage info to the tree data
 treeStructData.log_dir_path = window.location.pathname.split('/').slice(0, -1).join('/');
-treeStructData.current_stage = window.location.pathname.includes('stage_')
+// (the unified page's metadata already names it)
+treeStructData.current_stage = treeStructData.current_stage || (window.location.pathname.includes('stage_')
   ? window.location.pathname.split('stage_')[1].split('/')[0]
-  : 'Stage_1';
+  : 'Stage_1');
 
 // Initialize background color
 window.bgColCurrent = bgCol;
@@ -0,0 +1,92 @@
+"""
+Messages exchanged between `ParallelAgent` and its worker processes.
+
+A work order carries only the parent fields a worker reads (see `MinimalAgent`
+and `ParallelAgent._process_node_wrapper`), with large values replaced by keys
+into a `BlobStore` shared by the processes. The worker answers with a result
+delta: the encoded child node with its large fields moved to the blob store,
+which the main process merges into the journal. The main process already holds
+everything else about the parent, so it is never sent.
+"""
+
+from typing import Optional
+
+from .blob_store import MIN_BLOB_BYTES, BlobRef, BlobStore, approx_size
+from .journal import LAZY_FIELDS, Journal, Node
+from .utils.codec import decode_node, encode_node
+
+# parent fields used by the workers
+PARENT_FIELDS = (
+    "id",
+    "is_buggy",
+    "code",
+    "plot_code",
+    "parse_metrics_code",
+    "parse_metrics_plan",
+    "vlm_feedback_summary",
+    "exec_time_feedback",
+)
+# fields that go through the blob store when larger than `MIN_BLOB_BYTES`
+BLOB_FIELDS = LAZY_FIELDS
+
+
+def _split_blobs(
+    node: Node, names, blobs: BlobStore, overrides: dict
+) -> tuple[dict, dict]:
+    """
+    Values of the fields `names` of `node`, with large values moved to the blob
+    store. Returns (inline values, field -> key). Fields the node already
+    offloaded to `blobs` keep their key without being loaded.
+    """
+    inline, keys = {}, {}
+    for name in names:
+        if name not in overrides:
+            ref = node.blob_ref(name)
+            if ref is not None and ref.store.root == blobs.root:
+                keys[name] = ref.key
+                continue
+        value = overrides[name] if name in overrides else getattr(node, name)
+        if name in BLOB_FIELDS and approx_size(value) >= MIN_BLOB_BYTES:
+            keys[name] = blobs.put(value)
+        else:
+            inline[name] = value
+    return inline, keys
+
+
+def make_work_order(node: Node, blobs: BlobStore, **overrides) -> dict:
+    """
+    Work order for processing `node` (as the parent of the new node) in a worker.
+    `overrides` replace field values, e.g. the seeded `code` of multi-seed runs.
+    The terminal output is only sent along for buggy nodes, which get debugged.
+    """
+    names = PARENT_FIELDS + ("_term_out",) if node.is_buggy else PARENT_FIELDS
+    inline, keys = _split_blobs(node, names, blobs, overrides)
+    return {"fields": inline, "blobs": keys}
+
+
+def read_work_order(order: dict, blobs: BlobStore) -> Node:
+    """The parent node described by a work order (only `PARENT_FIELDS` are set)."""
+    values = dict(order["fields"])
+    for name, key in order["blobs"].items():
+        values[name] = blobs.get(key)
+    return Node(**values)
+
+
+def make_result_delta(node: Node, blobs: BlobStore) -> dict:
+    """Result message for a node produced by a worker."""
+    _, keys = _split_blobs(node, BLOB_FIELDS, blobs, {})
+    stripped = {name: None for name in keys}
+    return {"node": encode_node(node, **stripped), "blobs": keys}
+
+
+def merge_result_delta(
+    delta: dict, blobs: BlobStore, journal: Optional[Journal] = None
+) -> Node:
+    """
+    Rebuild the node of a result message, linked to its parent in `journal`.
+    Its large fields stay in the blob store and are loaded on access.
+    """
+    node = decode_node(delta["node"], journal)
+    for name, key in delta["blobs"].items():
+        setattr(node, name, BlobRef(blobs, key))
+    return node
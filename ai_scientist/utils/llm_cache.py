@@ -0,0 +1,384 @@
+"""
+Content-addressed on-disk cache of LLM/VLM responses, with offline replay.
+
+`treesearch.backend.query`, `llm.get_response_from_llm` and
+`vlm.get_response_from_vlm` go through `cached_call`, which keys each request by
+the hash of the call site, model, messages, temperature, function spec and
+sampling arguments. Images embedded as data URLs are hashed instead of being
+part of the key verbatim.
+
+Sampled requests (temperature other than 0) are also keyed by their occurrence
+in the run: the nth identical request of a run is served the nth recorded
+response, so that e.g. the drafts of a step, which share one prompt, or a retry
+of a failed query still get different responses, as they would without the
+cache. The occurrences are claimed by creating marker files in a directory of the
+run (named by `AI_SCIENTIST_LLM_CACHE_RUN`, which `get_cache` sets for the
+processes started later), so they are counted across all processes of the run.
+Requests with temperature 0 are not indexed and share one response.
+
+The cache has three modes:
+
+- `off` (default): every call goes to the provider.
+- `record`: cached responses are returned, other calls go to the provider and
+  their responses are stored.
+- `replay`: responses are only served from the cache and a request that isn't
+  cached raises `LLMCacheMiss`, so a recorded run can be repeated offline.
+
+The mode and location are read from the environment (see `configure`), so worker
+processes started by the tree search use the same cache as the parent. Like the
+execution cache, entries are written to a temporary file and renamed into place
+and hit/miss events are appended to a log, so the processes need no locking.
+Responses recorded longer ago than the TTL are recorded again (replay ignores the
+TTL). Entries not used within the TTL, and the least recently used entries above
+the size limit, are evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+from ai_scientist.utils.token_tracker import token_tracker
+
+logger = logging.getLogger("ai-scientist")
+
+MODES = ("off", "record", "replay")
+ENV_MODE = "AI_SCIENTIST_LLM_CACHE"
+ENV_DIR = "AI_SCIENTIST_LLM_CACHE_DIR"
+ENV_TTL_HOURS = "AI_SCIENTIST_LLM_CACHE_TTL_HOURS"
+ENV_MAX_SIZE_MB = "AI_SCIENTIST_LLM_CACHE_MAX_MB"
+ENV_RUN = "AI_SCIENTIST_LLM_CACHE_RUN"
+DEFAULT_DIR = Path.home() / ".cache" / "ai_scientist" / "llm_cache"
+DEFAULT_MAX_SIZE_MB = 1024
+# stores between two eviction passes of a process
+EVICT_EVERY = 50
+# occurrence markers of other runs are removed after this long
+RUN_MAX_AGE_HOURS = 24 * 7
+
+_MISSING = object()
+
+
+class LLMCacheMiss(KeyError):
+    """Raised in replay mode for a request that was not recorded."""
+
+
+def _hash_images(value: Any) -> Any:
+    """`value` with data URLs (base64-encoded images) replaced by their hash."""
+    if isinstance(value, str) and value.startswith("data:") and len(value) > 256:
+        return "sha256:" + hashlib.sha256(value.encode()).hexdigest()
+    if isinstance(value, (list, tuple)):
+        return [_hash_images(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _hash_images(v) for k, v in value.items()}
+    return value
+
+
+class LLMCache:
+    def __init__(
+        self,
+        cache_dir: Path | str,
+        mode: str = "record",
+        ttl_hours: float | None = None,
+        max_size_mb: float | None = DEFAULT_MAX_SIZE_MB,
+        run_id: str | None = None,
+    ):
+        """
+        Args:
+            cache_dir (Path | str): directory holding the cache entries, may be shared by several processes
+            mode (str, optional): "record" or "replay" (see the module docstring). Defaults to "record".
+            ttl_hours (float | None, optional): responses recorded longer ago than this are recorded again. Defaults to None (no expiry).
+            max_size_mb (float | None, optional): total size above which the least recently used entries are evicted. Defaults to 1024.
+            run_id (str | None, optional): run whose processes share the occurrence count of sampled requests. Defaults to a new run.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid LLM cache mode {mode!r}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.ttl_hours = ttl_hours
+        self.max_size_mb = max_size_mb
+        self.run_id = run_id or uuid.uuid4().hex
+        self._stores = 0
+        # base key -> first occurrence that may still be unclaimed
+        self._next_occurrence: dict[str, int] = {}
+
+    @property
+    def entries_dir(self) -> Path:
+        return self.cache_dir / "entries"
+
+    @property
+    def events_path(self) -> Path:
+        return self.cache_dir / "events.jsonl"
+
+    @property
+    def runs_dir(self) -> Path:
+        return self.cache_dir / "runs"
+
+    @staticmethod
+    def make_key(site: str, request: dict, occurrence: int = 0) -> str:
+        payload = {"site": site, "request": _hash_images(request)}
+        # the first occurrence keeps the key of the request alone
+        if occurrence:
+            payload["occurrence"] = occurrence
+        payload = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def claim_occurrence(self, base_key: str) -> int:
+        """
+        Index of this request among the identical requests of the run, claimed
+        atomically so that concurrent processes get different indices.
+        """
+        run_dir = self.runs_dir / self.run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        occurrence = self._next_occurrence.get(base_key, 0)
+        while True:
+            try:
+                fd = os.open(
+                    run_dir / f"{base_key}.{occurrence}", os.O_CREAT | os.O_EXCL
+                )
+            except FileExistsError:
+                occurrence += 1
+                continue
+            os.close(fd)
+            self._next_occurrence[base_key] = occurrence + 1
+            return occurrence
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / key[:2] / f"{key}.json"
+
+    def _log_event(self, event: str, key: str, **extra) -> None:
+        record = {"event": event, "key": key, "time": time.time(), **extra}
+        # a single small O_APPEND write, so concurrent writers don't interleave
+        with open(self.events_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def get(self, key: str) -> Any:
+        """The cached response for `key`, or `_MISSING`."""
+        path = self._entry_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Discarding unreadable LLM cache entry {key}: {e}")
+                path.unlink(missing_ok=True)
+            self._log_event("miss", key)
+            return _MISSING
+        if (
+            self.mode == "record"
+            and self.ttl_hours is not None
+            and time.time() - entry["created"] > self.ttl_hours * 3600
+        ):
+            self._log_event("expired", key)
+            return _MISSING
+        # mark as recently used for LRU eviction
+        os.utime(path)
+        self._log_event("hit", key, saved_time=entry.get("latency"))
+        return entry["response"]
+
+    def put(self, key: str, response: Any, site: str, model: str, latency: float) -> None:
+        entry = {
+            "key": key,
+            "site": site,
+            "model": model,
+            "created": time.time(),
+            "latency": latency,
+            "response": response,
+        }
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.parent / f".tmp-{uuid.uuid4().hex}"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._log_event("store", key, size=path.stat().st_size)
+        self._stores += 1
+        if self._stores % EVICT_EVERY == 0:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """(last use, size, path) of all entries."""
+        entries = []
+        if not self.entries_dir.exists():
+            return entries
+        for prefix in self.entries_dir.iterdir():
+            if not prefix.is_dir():
+                continue
+            for path in prefix.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Evict entries not used for `ttl_hours`, then the least recently used ones
+        until the cache is below `max_size_mb`. Returns the number of evicted entries."""
+        entries = sorted(self._entries())
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for last_use, size, path in entries:
+            too_old = self.ttl_hours is not None and now - last_use > self.ttl_hours * 3600
+            too_big = (
+                self.max_size_mb is not None and total > self.max_size_mb * 1024 * 1024
+            )
+            if not (too_old or too_big):
+                continue
+            path.unlink(missing_ok=True)
+            self._log_event("evict", path.stem, size=size)
+            total -= size
+            evicted += 1
+        self._evict_runs()
+        return evicted
+
+    def _evict_runs(self) -> None:
+        """Remove the occurrence markers of other runs not active for `RUN_MAX_AGE_HOURS`."""
+        if not self.runs_dir.exists():
+            return
+        now = time.time()
+        for run_dir in self.runs_dir.iterdir():
+            if run_dir.name == self.run_id:
+                continue
+            try:
+                last_use = run_dir.stat().st_mtime
+            except OSError:
+                continue
+            if now - last_use > RUN_MAX_AGE_HOURS * 3600:
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        """Hit/miss statistics aggregated over all processes using this cache."""
+        counts = {"hit": 0, "miss": 0, "expired": 0, "store": 0, "evict": 0}
+        saved_time = 0.0
+        try:
+            with open(self.events_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    counts[record["event"]] = counts.get(record["event"], 0) + 1
+                    saved_time += record.get("saved_time") or 0.0
+        except FileNotFoundError:
+            pass
+        lookups = counts["hit"] + counts["miss"] + counts["expired"]
+        entries = self._entries()
+        return {
+            "mode": self.mode,
+            "hits": counts["hit"],
+            "misses": counts["miss"] + counts["expired"],
+            "hit_rate": counts["hit"] / lookups if lookups else 0.0,
+            "stores": counts["store"],
+            "evictions": counts["evict"],
+            "saved_latency": saved_time,
+            "entries": len(entries),
+            "size_mb": sum(size for _, size, _ in entries) / 1024**2,
+        }
+
+
+# cache of this process and the environment settings it was created from
+_cache: LLMCache | None = None
+_cache_settings: tuple | None = None
+
+
+def configure(
+    mode: str = "off",
+    cache_dir: Path | str | None = None,
+    ttl_hours: float | None = None,
+    max_size_mb: float | None = None,
+) -> None:
+    """
+    Set the cache settings of this process and of the processes it starts.
+
+    Args:
+        mode (str, optional): "off", "record" or "replay". Defaults to "off".
+        cache_dir (Path | str | None, optional): cache directory. Defaults to ~/.cache/ai_scientist/llm_cache.
+        ttl_hours (float | None, optional): responses recorded longer ago than this are recorded again. Defaults to None (no expiry).
+        max_size_mb (float | None, optional): size limit of the cache. Defaults to 1024.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Invalid LLM cache mode {mode!r}, expected one of {MODES}")
+    os.environ[ENV_MODE] = mode
+    for name, value in (
+        (ENV_DIR, cache_dir),
+        (ENV_TTL_HOURS, ttl_hours),
+        (ENV_MAX_SIZE_MB, max_size_mb),
+    ):
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = str(value)
+
+
+def get_cache() -> LLMCache | None:
+    """
+    The cache configured in the environment, or None if caching is off. Also sets
+    the run id in the environment if it isn't set yet, so call this before
+    starting worker processes.
+    """
+    global _cache, _cache_settings
+    if os.environ.get(ENV_MODE, "off").lower() != "off" and not os.environ.get(
+        ENV_RUN
+    ):
+        os.environ[ENV_RUN] = uuid.uuid4().hex
+    settings = tuple(
+        os.environ.get(name)
+        for name in (ENV_MODE, ENV_DIR, ENV_TTL_HOURS, ENV_MAX_SIZE_MB, ENV_RUN)
+    )
+    if settings != _cache_settings:
+        mode, cache_dir, ttl_hours, max_size_mb, run_id = settings
+        mode = (mode or "off").lower()
+        if mode not in MODES:
+            raise ValueError(f"Invalid {ENV_MODE}={mode!r}, expected one of {MODES}")
+        _cache = None
+        if mode != "off":
+            _cache = LLMCache(
+                cache_dir or DEFAULT_DIR,
+                mode=mode,
+                ttl_hours=float(ttl_hours) if ttl_hours else None,
+                max_size_mb=float(max_size_mb) if max_size_mb else DEFAULT_MAX_SIZE_MB,
+                run_id=run_id,
+            )
+            logger.info(f"LLM cache in {mode} mode at {_cache.cache_dir}")
+        _cache_settings = settings
+    return _cache
+
+
+def cached_call(site: str, request: dict, call: Callable[[], Any]) -> Any:
+    """
+    Response to an LLM request: from the cache if it holds one, otherwise from
+    `call()` (which sends the request), recorded in the cache.
+
+    Args:
+        site (str): name of the calling function, part of the key since different functions return different values for the same request
+        request (dict): everything that determines the response (model, messages, temperature, ...), JSON-serializable
+        call (Callable[[], Any]): sends the request and returns a JSON-serializable response
+    """
+    cache = get_cache()
+    if cache is None:
+        return call()
+    key = cache.make_key(site, request)
+    # the nth identical sampled request of the run gets the nth recorded response
+    if request.get("temperature") != 0:
+        occurrence = cache.claim_occurrence(key)
+        if occurrence:
+            key = cache.make_key(site, request, occurrence)
+    response = cache.get(key)
+    if response is not _MISSING:
+        token_tracker.record_call(request.get("model"), cache_hit=True)
+        return response
+    if cache.mode == "replay":
+        raise LLMCacheMiss(
+            f"No recorded response for {site} request to {request.get('model')} (key {key[:12]})"
+        )
+    t0 = time.time()
+    response = call()
+    cache.put(key, response, site, request.get("model"), time.time() - t0)
+    return response
@@ -0,0 +1,202 @@
+"""
+Process-wide registry of LLM SDK clients, one HTTP connection pool per endpoint.
+
+Creating an `openai.OpenAI` or `anthropic.Anthropic` client per call (per
+writeup, review, citation round, summarization, ...) throws away its connection
+pool, so every call pays for a new TCP/TLS handshake. `get_client` returns the
+same client for the same (provider, base_url, credentials), with keep-alive
+connections shared by `llm.py`, `vlm.py` and the tree search backend. Callers
+that need other options (e.g. `max_retries=0` in the backend, which retries on
+its own) get a `with_options` copy, which uses the same connection pool.
+
+The credentials are part of the key (hashed) including those read from the
+environment, so changing e.g. `OPENAI_BASE_URL` or `OPENAI_API_KEY` gives a new
+client. Each pool counts its requests, new and reused connections and the time
+to the response headers; see `stats`. Forked processes start with an empty
+registry, so they never share connections with their parent.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+import anthropic
+import openai
+
+logger = logging.getLogger("ai-scientist")
+
+# provider -> (client class, SDK module, environment variables the client reads its credentials and endpoint from)
+_PROVIDERS = {
+    "openai": (
+        openai.OpenAI,
+        openai,
+        ("OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_ORG_ID", "OPENAI_PROJECT_ID"),
+    ),
+    "anthropic": (
+        anthropic.Anthropic,
+        anthropic,
+        ("ANTHROPIC_API_KEY", "ANTHROPIC_AUTH_TOKEN", "ANTHROPIC_BASE_URL"),
+    ),
+    "bedrock": (
+        anthropic.AnthropicBedrock,
+        anthropic,
+        (
+            "AWS_ACCESS_KEY_ID",
+            "AWS_SECRET_ACCESS_KEY",
+            "AWS_SESSION_TOKEN",
+            "AWS_REGION",
+            "AWS_PROFILE",
+            "ANTHROPIC_BEDROCK_BASE_URL",
+        ),
+    ),
+    "vertex": (
+        anthropic.AnthropicVertex,
+        anthropic,
+        (
+            "CLOUD_ML_REGION",
+            "ANTHROPIC_VERTEX_PROJECT_ID",
+            "GOOGLE_APPLICATION_CREDENTIALS",
+            "ANTHROPIC_VERTEX_BASE_URL",
+        ),
+    ),
+}
+
+
+class _PoolStats:
+    """Requests, connections and latency of one connection pool, fed by httpx event hooks."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._streams = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def on_request(self, request) -> None:
+        request.extensions["ai_scientist_sent"] = time.perf_counter()
+
+    def on_response(self, response) -> None:
+        sent = response.request.extensions.get("ai_scientist_sent")
+        latency = time.perf_counter() - sent if sent is not None else 0.0
+        # the network stream is per connection: a stream seen before is a reused connection
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if stream is None:
+                return
+            try:
+                reused = stream in self._streams
+                self._streams.add(stream)
+            except TypeError:  # not weak-referenceable
+                return
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+
+    def as_dict(self) -> dict:
+        connections = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_rate": self.reused_connections / connections if connections else 0.0,
+            "mean_latency": self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+
+# (provider, base_url, credentials hash) -> (client, stats); (key, options) -> client copy
+_clients: dict[tuple, tuple[Any, _PoolStats]] = {}
+_variants: dict[tuple, Any] = {}
+_lock = threading.Lock()
+
+
+def _client_key(provider: str, base_url: Optional[str], credentials: dict) -> tuple:
+    env_vars = _PROVIDERS[provider][2]
+    secret = repr(
+        (sorted(credentials.items()), [os.environ.get(name) for name in env_vars])
+    )
+    return provider, base_url, hashlib.sha256(secret.encode()).hexdigest()
+
+
+def get_client(
+    provider: str,
+    base_url: Optional[str] = None,
+    api_key: Optional[str] = None,
+    **options,
+) -> Any:
+    """
+    Shared SDK client of an endpoint, created on first use.
+
+    Args:
+        provider (str): "openai" (also for OpenAI-compatible APIs), "anthropic", "bedrock" or "vertex"
+        base_url (str | None, optional): API endpoint. Defaults to the SDK's default (or the provider's base URL environment variable).
+        api_key (str | None, optional): API key. Defaults to the SDK's default (the provider's API key environment variable).
+        **options: client options that don't affect the connection (max_retries, timeout, default_headers, ...), applied with `with_options` on the shared client
+    """
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unknown LLM provider {provider!r}")
+    credentials = {"api_key": api_key} if api_key is not None else {}
+    key = _client_key(provider, base_url, credentials)
+    with _lock:
+        if key not in _clients:
+            client_cls, sdk, _ = _PROVIDERS[provider]
+            stats = _PoolStats(f"{provider}@{base_url or 'default'}")
+            http_client = sdk.DefaultHttpxClient(
+                event_hooks={"request": [stats.on_request], "response": [stats.on_response]}
+            )
+            kwargs = {"base_url": base_url} if base_url is not None else {}
+            client = client_cls(http_client=http_client, **kwargs, **credentials)
+            _clients[key] = (client, stats)
+            logger.debug(f"Created LLM client {stats.name}")
+        client = _clients[key][0]
+        if not options:
+            return client
+        variant_key = (key, tuple(sorted((k, repr(v)) for k, v in options.items())))
+        if variant_key not in _variants:
+            _variants[variant_key] = client.with_options(**options)
+        return _variants[variant_key]
+
+
+def stats() -> dict[str, dict]:
+    """Connection reuse and latency of the connection pools of this process."""
+    with _lock:
+        pools = [s for _, s in _clients.values()]
+    result = {}
+    for pool in pools:
+        # endpoints used with several credentials are reported separately
+        name = pool.name
+        while name in result:
+            name += "'"
+        result[name] = pool.as_dict()
+    return result
+
+
+def _reset_after_fork() -> None:
+    # a forked child must not share the parent's connections: drop (not close) them
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+    _variants.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close_all() -> None:
+    """Close the connection pools of this process."""
+    with _lock:
+        for client, _ in _clients.values():
+            client.close()
+        _clients.clear()
+        _variants.clear()
@@ -0,0 +1,346 @@
+"""
+Host-wide rate limiting of LLM requests, shared by all processes of a run.
+
+Each worker process of the tree search has its own API client and retries on
+its own, so without coordination the workers together exceed the provider's
+limits and all back off at once. Here every request first takes a slot from
+per-model token buckets (requests/min and tokens/min) whose state lives in a
+small file per model, updated under an exclusive `flock`, so all processes on
+the host share the buckets without a server process.
+
+A request reserves its slot and its estimated tokens (prompt estimate plus
+`max_tokens`) immediately, letting the bucket go negative, and then sleeps
+until the bucket would have refilled; later requests queue behind it in
+arrival order. The estimate is corrected with the actual usage once the
+response arrives. A 429 from the provider empties the buckets and blocks the
+model for the Retry-After time, for all processes.
+
+Limits are read from the environment (see `configure`), as
+`AI_SCIENTIST_RATE_LIMITS="gpt-4o*=500:300000,claude-*=50:40000"`: model name
+patterns mapped to requests/min and tokens/min (either may be empty for no
+limit), optionally followed by the burst size in seconds of quota.
+"""
+
+import fcntl
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+logger = logging.getLogger("ai-scientist")
+
+T = TypeVar("T")
+
+ENV_LIMITS = "AI_SCIENTIST_RATE_LIMITS"
+ENV_DIR = "AI_SCIENTIST_RATE_LIMIT_DIR"
+DEFAULT_DIR = Path(tempfile.gettempdir()) / f"ai_scientist_rate_limits_{os.getuid()}"
+DEFAULT_BURST_SECONDS = 10.0
+# how long a model is blocked after a 429 without Retry-After header
+DEFAULT_COOLDOWN = 5.0
+# rough size of an image input at "low" detail
+IMAGE_TOKENS = 85
+
+
+@dataclass
+class RateLimit:
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    # bucket capacity, in seconds of quota
+    burst_seconds: float = DEFAULT_BURST_SECONDS
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parse "requests/min:tokens/min[:burst seconds]", with empty fields for no limit."""
+        fields = spec.split(":")
+        if not 1 <= len(fields) <= 3:
+            raise ValueError(f"Invalid rate limit {spec!r}")
+        values = [float(f) if f.strip() else None for f in fields] + [None] * 2
+        return cls(values[0], values[1], values[2] or DEFAULT_BURST_SECONDS)
+
+
+def parse_limits(spec: str) -> dict[str, RateLimit]:
+    """Parse "pattern=limit,..." (see the module docstring)."""
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        pattern, _, limit = item.partition("=")
+        limits[pattern.strip()] = RateLimit.parse(limit)
+    return limits
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count of the text in a (nested) prompt, ~4 characters per token."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return IMAGE_TOKENS if value.startswith("data:") else len(value) // 4 + 1
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_tokens(v) for v in value.values())
+    return estimate_tokens(str(value))
+
+
+def _response_tokens(response: Any) -> Optional[int]:
+    """Total tokens of an OpenAI or Anthropic SDK response, if it reports usage."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    if getattr(usage, "total_tokens", None) is not None:
+        return usage.total_tokens
+    tokens = [
+        getattr(usage, name, None)
+        for name in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens")
+    ]
+    return sum(t for t in tokens if isinstance(t, int)) or None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# request level, token level, last update, blocked until; then the statistics:
+# requests, queued requests, total wait, max wait, 429s, tokens
+_STATE = struct.Struct("<10d")
+
+
+@dataclass
+class _BucketState:
+    request_level: float
+    token_level: float
+    updated: float
+    blocked_until: float = 0.0
+    requests: float = 0
+    queued: float = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    rate_limited: float = 0
+    tokens: float = 0
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, RateLimit], state_dir: Path | str = DEFAULT_DIR):
+        """
+        Args:
+            limits (dict[str, RateLimit]): model name pattern (fnmatch) -> limit, the first matching pattern applies
+            state_dir (Path | str, optional): directory of the shared bucket state, the same for all processes to coordinate. Defaults to a directory in the system temp dir.
+        """
+        self.limits = limits
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+
+    def limit_for(self, model: Optional[str]) -> Optional[RateLimit]:
+        for pattern, limit in self.limits.items():
+            if model is not None and fnmatch.fnmatchcase(model, pattern):
+                return limit
+        return None
+
+    def _state_path(self, model: str) -> Path:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", model)[:64]
+        digest = hashlib.sha1(model.encode()).hexdigest()[:8]
+        return self.state_dir / f"{name}-{digest}.bucket"
+
+    @contextmanager
+    def _locked_state(self, model: str, limit: RateLimit):
+        """Bucket state of `model`, refilled up to now, written back on exit."""
+        fd = os.open(self._state_path(model), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            data = os.pread(fd, _STATE.size, 0)
+            if len(data) == _STATE.size:
+                state = _BucketState(*_STATE.unpack(data))
+            else:
+                state = _BucketState(float("inf"), float("inf"), now)
+            elapsed = max(0.0, now - state.updated)
+            for level, per_minute in (
+                ("request_level", limit.requests_per_minute),
+                ("token_level", limit.tokens_per_minute),
+            ):
+                if per_minute is None:
+                    continue
+                rate = per_minute / 60
+                capacity = max(1.0, rate * limit.burst_seconds)
+                value = getattr(state, level) + elapsed * rate
+                setattr(state, level, min(capacity, value))
+            state.updated = now
+            yield state, now
+            os.pwrite(fd, _STATE.pack(*vars(state).values()), 0)
+        finally:
+            os.close(fd)
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """
+        Wait until a request of `model` using about `tokens` tokens is within the
+        limits. Returns the time waited in seconds.
+        """
+        limit = self.limit_for(model)
+        if limit is None:
+            return 0.0
+        with self._locked_state(model, limit) as (state, now):
+            waits = [state.blocked_until - now]
+            if limit.requests_per_minute is not None:
+                state.request_level -= 1
+                waits.append(-state.request_level / (limit.requests_per_minute / 60))
+            if limit.tokens_per_minute is not None:
+                state.token_level -= tokens
+                waits.append(-state.token_level / (limit.tokens_per_minute / 60))
+            wait = max(0.0, *waits)
+            state.requests += 1
+            state.tokens += tokens
+            if wait > 0:
+                state.queued += 1
+                state.total_wait += wait
+                state.max_wait = max(state.max_wait, wait)
+        if wait > 1:
+            logger.info(f"Rate limiter: request to {model} queued for {wait:.1f}s")
+        time.sleep(wait)
+        return wait
+
+    def record_usage(self, model: str, reserved_tokens: int, used_tokens: int) -> None:
+        """Correct the token bucket once the actual usage of a request is known."""
+        limit = self.limit_for(model)
+        if limit is None or limit.tokens_per_minute is None:
+            return
+        with self._locked_state(model, limit) as (state, _):
+            state.token_level += reserved_tokens - used_tokens
+            state.tokens += used_tokens - reserved_tokens
+
+    def report_rate_limited(self, model: str, retry_after: Optional[float] = None) -> None:
+        """The provider rejected a request: stop sending requests of `model` for a while."""
+        limit = self.limit_for(model)
+        if limit is None:
+            return
+        with self._locked_state(model, limit) as (state, now):
+            state.blocked_until = max(
+                state.blocked_until, now + (retry_after or DEFAULT_COOLDOWN)
+            )
+            state.request_level = min(state.request_level, 0.0)
+            state.token_level = min(state.token_level, 0.0)
+            state.rate_limited += 1
+        logger.info(f"Rate limiter: {model} rate limited by the provider")
+
+    def reset_stats(self) -> None:
+        """Zero the statistics of all models, leaving the buckets as they are."""
+        for path in self.state_dir.glob("*.bucket"):
+            fd = os.open(path, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                data = os.pread(fd, _STATE.size, 0)
+                if len(data) != _STATE.size:
+                    continue
+                state = _BucketState(*_STATE.unpack(data))
+                state.requests = state.queued = state.rate_limited = state.tokens = 0
+                state.total_wait = state.max_wait = 0.0
+                os.pwrite(fd, _STATE.pack(*vars(state).values()), 0)
+            finally:
+                os.close(fd)
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Per-model request counts and queueing delay since the last `reset_stats`
+        (see `configure`), over all processes using `state_dir`.
+        """
+        stats = {}
+        for path in sorted(self.state_dir.glob("*.bucket")):
+            data = path.read_bytes()
+            if len(data) != _STATE.size:
+                continue
+            state = _BucketState(*_STATE.unpack(data))
+            # file name: sanitized model name and hash
+            stats[path.stem.rsplit("-", 1)[0]] = {
+                "requests": int(state.requests),
+                "queued": int(state.queued),
+                "total_wait": state.total_wait,
+                "mean_wait": state.total_wait / state.requests if state.requests else 0.0,
+                "max_wait": state.max_wait,
+                "rate_limited": int(state.rate_limited),
+                "tokens": int(state.tokens),
+            }
+        return stats
+
+
+# limiter of this process and the environment settings it was created from
+_limiter: Optional[RateLimiter] = None
+_limiter_settings: Optional[tuple] = None
+
+
+def configure(limits: Optional[str] = None, state_dir: Path | str | None = None) -> None:
+    """
+    Set the rate limits of this process and of the processes it starts, and
+    reset the statistics of the shared buckets, so that `RateLimiter.stats`
+    covers the run that called this (and any other run using the same
+    `state_dir` at the same time), not every earlier run on the host.
+
+    Args:
+        limits (str | None, optional): limits as "pattern=requests/min:tokens/min[:burst],...", None for no limits. Defaults to None.
+        state_dir (Path | str | None, optional): directory of the shared bucket state. Defaults to a directory in the system temp dir.
+    """
+    if limits is not None:
+        parse_limits(limits)  # validate
+    for name, value in ((ENV_LIMITS, limits), (ENV_DIR, state_dir)):
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = str(value)
+    limiter = get_limiter()
+    if limiter is not None:
+        limiter.reset_stats()
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    """The rate limiter configured in the environment, or None without limits."""
+    global _limiter, _limiter_settings
+    settings = (os.environ.get(ENV_LIMITS), os.environ.get(ENV_DIR))
+    if settings != _limiter_settings:
+        limits, state_dir = settings
+        _limiter = (
+            RateLimiter(parse_limits(limits), state_dir or DEFAULT_DIR) if limits else None
+        )
+        _limiter_settings = settings
+    return _limiter
+
+
+def limited_call(
+    model: Optional[str],
+    call: Callable[[], T],
+    prompt: Any = None,
+    max_tokens: Optional[int] = None,
+    count_tokens: Optional[Callable[[T], Optional[int]]] = None,
+) -> T:
+    """
+    Send an LLM request once it is within the rate limits of `model`.
+
+    Args:
+        model (str | None): model the request is sent to
+        call (Callable[[], T]): sends the request
+        prompt (Any, optional): the prompt (messages, system message, ...), to estimate the input tokens. Defaults to None.
+        max_tokens (int | None, optional): maximum number of output tokens, reserved until the usage is known. Defaults to None.
+        count_tokens (Callable[[T], int | None] | None, optional): total tokens used by a response. Defaults to reading the usage of OpenAI/Anthropic responses.
+    """
+    limiter = get_limiter()
+    if limiter is None or limiter.limit_for(model) is None:
+        return call()
+    reserved = estimate_tokens(prompt) + (max_tokens or 0)
+    limiter.acquire(model, reserved)
+    try:
+        response = call()
+    except Exception as e:
+        if getattr(e, "status_code", None) == 429:
+            limiter.report_rate_limited(model, _retry_after(e))
+        raise
+    used = (count_tokens or _response_tokens)(response)
+    limiter.record_usage(model, reserved, reserved if used is None else used)
+    return response
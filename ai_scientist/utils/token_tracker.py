@@ -1,10 +1,90 @@
+"""
+Token usage and latency of LLM calls.
+
+`token_tracker` counts the tokens of the calls made by its process. When a
+telemetry directory is configured (see `configure_telemetry`), every call is
+also appended as a usage record (model, call site, stage, tokens, latency,
+cache hit) to a JSONL file in that directory, with one O_APPEND write per
+record like the pipeline trace, and the prompt and response text to a per-process
+file next to it instead of an in-memory list. The directory is passed on
+through the environment, so the records of the tree search worker processes
+end up in the same file, and `get_summary`/`get_aggregates` in the parent
+report the usage of the whole run.
+"""
+
 from functools import wraps
-from typing import Dict, Optional, List
+from pathlib import Path
+from typing import Any, Dict, Optional, List
 import tiktoken
 from collections import defaultdict
 import asyncio
 from datetime import datetime
+import json
 import logging
+import os
+import sys
+import time
+
+ENV_TELEMETRY_DIR = "AI_SCIENTIST_TELEMETRY_DIR"
+USAGE_FILE = "usage.jsonl"
+_TOKEN_KEYS = ("prompt", "completion", "reasoning", "cached")
+# modules between the code that asks for a completion and the SDK call
+_PLUMBING_MODULES = (
+    "ai_scientist.utils.",
+    "ai_scientist.llm",
+    "ai_scientist.vlm",
+    "ai_scientist.treesearch.backend",
+    "backoff",
+    "funcy",
+)
+
+# stage of the pipeline or tree search the calls of this process belong to
+_stage: Optional[str] = None
+
+
+def configure_telemetry(telemetry_dir: Path | str | None) -> None:
+    """Record the LLM usage of this process and of the processes it starts in `telemetry_dir` (None to stop)."""
+    if telemetry_dir is None:
+        os.environ.pop(ENV_TELEMETRY_DIR, None)
+        return
+    Path(telemetry_dir).mkdir(parents=True, exist_ok=True)
+    os.environ[ENV_TELEMETRY_DIR] = str(telemetry_dir)
+
+
+def get_telemetry_dir() -> Optional[Path]:
+    telemetry_dir = os.environ.get(ENV_TELEMETRY_DIR)
+    return Path(telemetry_dir) if telemetry_dir else None
+
+
+def set_stage(stage: Optional[str]) -> None:
+    """Attribute the following LLM calls of this process to `stage`."""
+    global _stage
+    _stage = stage
+
+
+def _call_site() -> str:
+    """Qualified name of the function that asked for the completion."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_PLUMBING_MODULES):
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            return f"{module.removeprefix('ai_scientist.')}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _read_jsonl(path: Path):
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:  # a record being written
+                    continue
+    except FileNotFoundError:
+        return
 
 
 class TokenTracker:
@@ -21,6 +101,8 @@ class TokenTracker:
             lambda: {"prompt": 0, "completion": 0, "reasoning": 0, "cached": 0}
         )
         self.interactions = defaultdict(list)
+        # usage records of this process, when no telemetry directory is configured
+        self.records = []
 
         self.MODEL_PRICES = {
             "gpt-4o-2024-11-20": {
@@ -90,11 +172,96 @@ class TokenTracker:
             }
         )
 
+    def record_call(
+        self,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        reasoning_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: float = 0.0,
+        cache_hit: bool = False,
+        site: Optional[str] = None,
+        system_message: Any = None,
+        prompt: Any = None,
+        response: Any = None,
+    ):
+        """
+        Record an LLM call: count its tokens and, with a telemetry directory, append
+        its usage record and spill its text to disk.
+
+        Args:
+            model (str): model the call was sent to
+            prompt_tokens (int, optional): input tokens, including cached ones. Defaults to 0.
+            completion_tokens (int, optional): output tokens, including reasoning ones. Defaults to 0.
+            reasoning_tokens (int, optional): reasoning tokens. Defaults to 0.
+            cached_tokens (int, optional): cached input tokens. Defaults to 0.
+            latency (float, optional): request time in seconds. Defaults to 0.0.
+            cache_hit (bool, optional): the response came from the LLM response cache, no tokens were used. Defaults to False.
+            site (str | None, optional): calling function. Defaults to the first caller outside the LLM modules.
+            system_message (Any, optional): system message, kept with the response. Defaults to None.
+            prompt (Any, optional): prompt or messages, kept with the response. Defaults to None.
+            response (Any, optional): response text (or function call). Defaults to None.
+        """
+        if not cache_hit:
+            self.add_tokens(
+                model, prompt_tokens, completion_tokens, reasoning_tokens, cached_tokens
+            )
+        timestamp = time.time()
+        record = {
+            "time": timestamp,
+            "pid": os.getpid(),
+            "model": model,
+            "site": site or _call_site(),
+            "stage": _stage,
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "reasoning": reasoning_tokens,
+            "cached": cached_tokens,
+            "latency": latency,
+            "cache_hit": cache_hit,
+        }
+        telemetry_dir = get_telemetry_dir()
+        if telemetry_dir is None:
+            self.records.append(record)
+            if response is not None:
+                self.add_interaction(model, system_message, prompt, response, timestamp)
+            return
+        if response is not None:
+            text = {
+                "model": model,
+                "system_message": system_message,
+                "prompt": prompt,
+                "response": response,
+                "timestamp": timestamp,
+            }
+            # one text file per process, so large writes of the workers can't interleave
+            text_path = telemetry_dir / f"texts-{os.getpid()}.jsonl"
+            with open(text_path, "a") as f:
+                record["text"] = [text_path.name, f.tell()]
+                f.write(json.dumps(text, default=str) + "\n")
+        with open(telemetry_dir / USAGE_FILE, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _usage_records(self):
+        telemetry_dir = get_telemetry_dir()
+        if telemetry_dir is None:
+            return iter(self.records)
+        return _read_jsonl(telemetry_dir / USAGE_FILE)
+
     def get_interactions(self, model: Optional[str] = None) -> Dict[str, List[Dict]]:
         """Get all interactions, optionally filtered by model."""
+        telemetry_dir = get_telemetry_dir()
+        if telemetry_dir is not None:
+            interactions = defaultdict(list)
+            for path in sorted(telemetry_dir.glob("texts-*.jsonl")):
+                for text in _read_jsonl(path):
+                    interactions[text.pop("model")].append(text)
+        else:
+            interactions = self.interactions
         if model:
-            return {model: self.interactions[model]}
-        return dict(self.interactions)
+            return {model: interactions[model]}
+        return dict(interactions)
 
     def reset(self):
         """Reset all token counts and interactions."""
@@ -102,16 +269,18 @@ class TokenTracker:
             lambda: {"prompt": 0, "completion": 0, "reasoning": 0, "cached": 0}
         )
         self.interactions = defaultdict(list)
+        self.records = []
         # self._encoders = {}
 
-    def calculate_cost(self, model: str) -> float:
+    def calculate_cost(self, model: str, tokens: Optional[Dict[str, int]] = None) -> float:
         """Calculate the cost for a specific model based on token usage."""
         if model not in self.MODEL_PRICES:
             logging.warning(f"Price information not available for model {model}")
             return 0.0
 
         prices = self.MODEL_PRICES[model]
-        tokens = self.token_counts[model]
+        if tokens is None:
+            tokens = self.token_counts[model]
 
         # Calculate cost for prompt and completion tokens
         if "cached" in prices:
@@ -127,19 +296,71 @@ class TokenTracker:
     def get_summary(self) -> Dict[str, Dict[str, int]]:
         # return dict(self.token_counts)
         """Get summary of token usage and costs for all models."""
+        token_counts = self.token_counts
+        if get_telemetry_dir() is not None:
+            # all processes of the run
+            token_counts = {
+                model: {k: v for k, v in stats.items() if k in _TOKEN_KEYS}
+                for model, stats in self.get_aggregates()["by_model"].items()
+            }
         summary = {}
-        for model, tokens in self.token_counts.items():
+        for model, tokens in token_counts.items():
             summary[model] = {
-                "tokens": tokens.copy(),
-                "cost (USD)": self.calculate_cost(model),
+                "tokens": dict(tokens),
+                "cost (USD)": self.calculate_cost(model, tokens),
             }
         return summary
 
+    def get_aggregates(self) -> Dict[str, Dict[str, Dict]]:
+        """Calls, cache hits, tokens, latency and cost by model, by stage and by call site."""
+        groups = {"by_model": {}, "by_stage": {}, "by_site": {}}
+        for record in self._usage_records():
+            for group, key in (
+                ("by_model", record["model"]),
+                ("by_stage", record["stage"] or "none"),
+                ("by_site", record["site"]),
+            ):
+                stats = groups[group].setdefault(
+                    key,
+                    {"calls": 0, "cache_hits": 0, "latency": 0.0, "cost (USD)": 0.0}
+                    | dict.fromkeys(_TOKEN_KEYS, 0),
+                )
+                stats["calls"] += 1
+                stats["cache_hits"] += record["cache_hit"]
+                stats["latency"] += record["latency"]
+                for k in _TOKEN_KEYS:
+                    stats[k] += record[k]
+                if record["model"] in self.MODEL_PRICES:
+                    stats["cost (USD)"] += self.calculate_cost(record["model"], record)
+        for stats in (s for group in groups.values() for s in group.values()):
+            requests = stats["calls"] - stats["cache_hits"]
+            stats["mean_latency"] = stats["latency"] / requests if requests else 0.0
+        return groups
+
 
 # Global token tracker instance
 token_tracker = TokenTracker()
 
 
+def _record_response(result, system_message, prompt, latency: float) -> None:
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return
+    completion_details = getattr(usage, "completion_tokens_details", None)
+    prompt_details = getattr(usage, "prompt_tokens_details", None)
+    token_tracker.record_call(
+        result.model,
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        reasoning_tokens=getattr(completion_details, "reasoning_tokens", None) or 0,
+        cached_tokens=getattr(prompt_details, "cached_tokens", None) or 0,
+        latency=latency,
+        system_message=system_message,
+        prompt=prompt,
+        response=result.choices[0].message.content,  # Assumes response is in content field
+    )
+
+
 def track_token_usage(func):
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
@@ -150,35 +371,9 @@ def track_token_usage(func):
                 "Either 'prompt' or 'system_message' must be provided for token tracking"
             )
 
-        logging.info("args: ", args)
-        logging.info("kwargs: ", kwargs)
-
+        t0 = time.time()
         result = await func(*args, **kwargs)
-        model = result.model
-        timestamp = result.created
-
-        if hasattr(result, "usage"):
-            token_tracker.add_tokens(
-                model,
-                result.usage.prompt_tokens,
-                result.usage.completion_tokens,
-                result.usage.completion_tokens_details.reasoning_tokens,
-                (
-                    result.usage.prompt_tokens_details.cached_tokens
-                    if hasattr(result.usage, "prompt_tokens_details")
-                    else 0
-                ),
-            )
-            # Add interaction details
-            token_tracker.add_interaction(
-                model,
-                system_message,
-                prompt,
-                result.choices[
-                    0
-                ].message.content,  # Assumes response is in content field
-                timestamp,
-            )
+        _record_response(result, system_message, prompt, time.time() - t0)
         return result
 
     @wraps(func)
@@ -189,34 +384,9 @@ def track_token_usage(func):
             raise ValueError(
                 "Either 'prompt' or 'system_message' must be provided for token tracking"
             )
+        t0 = time.time()
         result = func(*args, **kwargs)
-        model = result.model
-        timestamp = result.created
-        logging.info("args: ", args)
-        logging.info("kwargs: ", kwargs)
-
-        if hasattr(result, "usage"):
-            token_tracker.add_tokens(
-                model,
-                result.usage.prompt_tokens,
-                result.usage.completion_tokens,
-                result.usage.completion_tokens_details.reasoning_tokens,
-                (
-                    result.usage.prompt_tokens_details.cached_tokens
-                    if hasattr(result.usage, "prompt_tokens_details")
-                    else 0
-                ),
-            )
-            # Add interaction details
-            token_tracker.add_interaction(
-                model,
-                system_message,
-                prompt,
-                result.choices[
-                    0
-                ].message.content,  # Assumes response is in content field
-                timestamp,
-            )
+        _record_response(result, system_message, prompt, time.time() - t0)
         return result
 
     return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
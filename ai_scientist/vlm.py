@@ -5,6 +5,7 @@ import json
 import backoff
 import openai
 from PIL import Image
+from ai_scientist.utils import llm_cache, llm_clients, rate_limiter
 from ai_scientist.utils.token_tracker import track_token_usage
 
 MAX_NUM_TOKENS = 4096
@@ -130,15 +131,32 @@ def get_response_from_vlm(
         # Construct message with all images
         new_msg_history = msg_history + [{"role": "user", "content": content}]
 
-        response = make_vlm_call(
-            client,
-            model,
-            temperature,
-            system_message=system_message,
-            prompt=new_msg_history,
+        # served from the response cache when it is enabled (see utils/llm_cache.py),
+        # images are keyed by their hash
+        content = llm_cache.cached_call(
+            "vlm.get_response_from_vlm",
+            {
+                "model": model,
+                "system_message": system_message,
+                "messages": new_msg_history,
+                "temperature": temperature,
+                "max_tokens": MAX_NUM_TOKENS,
+            },
+            lambda: rate_limiter.limited_call(
+                model,
+                lambda: make_vlm_call(
+                    client,
+                    model,
+                    temperature,
+                    system_message=system_message,
+                    prompt=new_msg_history,
+                ),
+                prompt=(system_message, new_msg_history),
+                max_tokens=MAX_NUM_TOKENS,
+            )
+            .choices[0]
+            .message.content,
         )
-
-        content = response.choices[0].message.content
         new_msg_history = new_msg_history + [{"role": "assistant", "content": content}]
     else:
         raise ValueError(f"Model {model} not supported.")
@@ -165,7 +183,7 @@ def create_client(model: str) -> tuple[Any, str]:
         "o3-mini",
     ]:
         print(f"Using OpenAI API with model {model}.")
-        return openai.OpenAI(), model
+        return llm_clients.get_client("openai"), model
     else:
         raise ValueError(f"Model {model} not supported.")
 
@@ -0,0 +1,267 @@
+"""
+Offline end-to-end throughput of the staged tree search against a scripted LLM.
+
+Runs `perform_experiments_bfts` on a synthetic idea with every LLM call served by
+the stub of llm_stub.py (started as a separate process, so its CPU time is not
+counted as orchestrator time). The experiments are synthetic CPU-only tasks whose
+runtime, failure rate and progress are set by the stub options, so scheduler,
+pipeline and journal changes can be compared without paying for models or GPUs.
+The code model defaults to an OpenAI-style name; pass `--code-model claude-...`
+to send code generation through the Anthropic backend instead.
+
+Reports:
+- nodes/hour (nodes executed by the workers) and steps/hour (agent steps)
+- worker utilization: time the workers spent on nodes, and the execution slots
+  spent running code, relative to num_workers x wall time
+- orchestrator (this process) CPU time and peak RSS
+- per-phase latency (count, mean, p50, p95, max) from the run's trace spans
+- the stub's requests per kind and injected errors
+
+Usage:
+    python benchmarks/bfts_e2e.py --workers 4 --task-runtime 2 --latency 0.5
+    python benchmarks/bfts_e2e.py --scheduling steady --pipeline --stage-iters 6 3 3 3
+"""
+
+import argparse
+import atexit
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from omegaconf import OmegaConf  # noqa: E402
+
+import llm_stub  # noqa: E402
+from ai_scientist.treesearch import tracing  # noqa: E402
+
+FEEDBACK_MODEL = "gpt-stub"
+
+IDEA = {
+    "Name": "synthetic_benchmark",
+    "Title": "A Synthetic Task for Benchmarking the Tree Search",
+    "Short Hypothesis": "Scripted experiments exercise the orchestration like real ones.",
+    "Abstract": "Experiments burn a scripted amount of CPU time and report a scripted loss.",
+    "Experiments": ["Train on the synthetic task and report the validation loss."],
+    "Risk Factors and Limitations": ["None, the task is synthetic."],
+}
+
+
+@contextmanager
+def _stub_server(args):
+    """Start llm_stub.py with the stub options of `args`; yields its base URL."""
+    command = [sys.executable, str(Path(llm_stub.__file__)), "--port", "0"]
+    for option in (
+        "latency",
+        "tokens_per_s",
+        "error_rate",
+        "task_runtime",
+        "runtime_spread",
+        "bug_rate",
+        "improvement",
+        "seed",
+    ):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        port = json.loads(process.stdout.readline())["port"]
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextmanager
+def _redirect_output(log_path: Path):
+    """Send the run's console output (and that of its worker processes) to a file."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    with open(log_path, "w") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def _write_config(args, root: Path) -> Path:
+    (root / "data").mkdir()
+    idea_path = root / "idea.json"
+    idea_path.write_text(json.dumps(IDEA, indent=4))
+    cfg = OmegaConf.load(REPO_ROOT / "bfts_config.yaml")
+    cfg.data_dir = str(root / "data")
+    cfg.desc_file = str(idea_path)
+    # the layout of launch_scientist_bfts.py: the checkpoints go to <workspace_dir>/logs
+    cfg.workspace_dir = str(root)
+    cfg.log_dir = str(root / "logs")
+    cfg.exp_name = "bfts_e2e"
+    cfg.generate_report = False
+    cfg.exec.timeout = max(60, int(args.task_runtime * 20))
+    cfg.exec.preload_modules = ["numpy", "matplotlib", "matplotlib.pyplot"]
+    cfg.agent.num_workers = args.workers
+    cfg.agent.scheduling = args.scheduling
+    cfg.agent.pipeline.enabled = args.pipeline
+    for i, iters in enumerate(args.stage_iters, start=1):
+        cfg.agent.stages[f"stage{i}_max_iters"] = iters
+    cfg.agent.search.num_drafts = args.num_drafts
+    cfg.agent.search.debug_prob = args.debug_prob
+    cfg.agent.search.max_debug_depth = args.max_debug_depth
+    cfg.agent.search.policy = args.policy
+    cfg.agent.code.model = args.code_model
+    cfg.agent.feedback.model = FEEDBACK_MODEL
+    cfg.agent.vlm_feedback.model = FEEDBACK_MODEL
+    cfg.report.model = FEEDBACK_MODEL
+    config_path = root / "bfts_config.yaml"
+    OmegaConf.save(cfg, config_path)
+    return config_path
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _phase_latencies(spans: list[dict]) -> dict:
+    durations: dict[str, list[float]] = {}
+    for s in spans:
+        durations.setdefault(s["name"], []).append(s["end"] - s["start"])
+    return {
+        name: {
+            "count": len(d),
+            "mean_s": statistics.mean(d),
+            "p50_s": _percentile(d, 0.5),
+            "p95_s": _percentile(d, 0.95),
+            "max_s": max(d),
+            "total_s": sum(d),
+        }
+        for name, d in sorted(durations.items(), key=lambda kv: -sum(kv[1]))
+    }
+
+
+def _journal_counts(log_dir: Path) -> dict:
+    counts = {}
+    for journal_path in sorted(log_dir.glob("stage_*/journal.json")):
+        nodes = json.loads(journal_path.read_text())["nodes"]
+        counts[journal_path.parent.name] = {
+            "nodes": len(nodes),
+            "buggy": sum(1 for n in nodes if n.get("is_buggy")),
+        }
+    return counts
+
+
+def run(args) -> dict:
+    root = Path(tempfile.mkdtemp(prefix="bfts_e2e_"))
+    # removed after the run's own exit handlers (which clean up its workspace)
+    atexit.register(shutil.rmtree, root, ignore_errors=True)
+    with _stub_server(args) as base_url:
+        config_path = _write_config(args, root)
+        os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+        os.environ["ANTHROPIC_BASE_URL"] = base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ["ANTHROPIC_API_KEY"] = "stub"
+        os.environ["AI_SCIENTIST_ROOT"] = str(REPO_ROOT)
+        # creates an LLM client on import, so only after the environment points to the stub
+        from ai_scientist.treesearch.perform_experiments_bfts_with_agentmanager import (
+            perform_experiments_bfts,
+        )
+
+        # experiment result paths are stored relative to the working directory
+        cwd = os.getcwd()
+        os.chdir(root)
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.time()
+        try:
+            with _redirect_output(root / "run.log"):
+                perform_experiments_bfts(config_path)
+        finally:
+            os.chdir(cwd)
+        wall = time.time() - start
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+        log_dir = next((root / "logs").iterdir())
+        spans = [s for s in tracing.read_spans(log_dir / "trace_spans.jsonl") if s["end"] >= start]
+        with urllib.request.urlopen(f"{base_url}/stats") as response:
+            stub_stats = json.load(response)
+        if args.keep_logs:
+            shutil.copytree(log_dir, args.keep_logs, dirs_exist_ok=True)
+
+    phases = _phase_latencies(spans)
+    node_time = phases.get("node", {}).get("total_s", 0.0)
+    exec_time = phases.get("exec", {}).get("total_s", 0.0)
+    nodes = phases.get("node", {}).get("count", 0)
+    steps = phases.get("step", {}).get("count", 0)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (
+        usage_after.ru_stime - usage_before.ru_stime
+    )
+    return {
+        "wall_s": wall,
+        "nodes": nodes,
+        "steps": steps,
+        "nodes_per_hour": nodes / wall * 3600,
+        "steps_per_hour": steps / wall * 3600,
+        "worker_utilization": node_time / (args.workers * wall),
+        "exec_slot_utilization": exec_time / (args.workers * wall),
+        "orchestrator_cpu_s": cpu,
+        "orchestrator_cpu_share": cpu / wall,
+        # ru_maxrss is in KiB on Linux
+        "orchestrator_peak_rss_mb": usage_after.ru_maxrss / 1024,
+        "journals": _journal_counts(log_dir),
+        "phases": phases,
+        "stub": stub_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scheduling", choices=("batch", "steady"), default="batch")
+    parser.add_argument("--pipeline", action="store_true", help="pipelined LLM workers")
+    parser.add_argument(
+        "--stage-iters",
+        type=int,
+        nargs=4,
+        default=[4, 2, 2, 2],
+        metavar=("S1", "S2", "S3", "S4"),
+        help="max iterations of the four stages",
+    )
+    parser.add_argument("--num-drafts", type=int, default=3)
+    parser.add_argument("--debug-prob", type=float, default=0.5)
+    parser.add_argument("--max-debug-depth", type=int, default=3)
+    parser.add_argument(
+        "--policy",
+        choices=("default", "bandit"),
+        default="default",
+        help="node selection",
+    )
+    parser.add_argument(
+        "--code-model",
+        default="gpt-stub",
+        help="code generation model, a claude-* name goes through the Anthropic backend",
+    )
+    parser.add_argument("--keep-logs", help="copy the run's log directory here")
+    llm_stub.add_arguments(parser)
+    args = parser.parse_args()
+    results = {"config": vars(args), "results": run(args)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
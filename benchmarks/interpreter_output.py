@@ -0,0 +1,92 @@
+"""
+Output throughput and peak memory of `Interpreter.run` for chatty code.
+
+Runs a snippet that issues many small writes (like a training loop printing every
+batch) once per capture mode, each in a fresh process so that peak RSS is not
+shared between modes.
+
+Usage:
+    python benchmarks/interpreter_output.py --writes 200000 --line-len 80
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.treesearch.interpreter import Interpreter  # noqa: E402
+
+MODES = ["stream", "bounded"]
+
+
+def run_single(mode: str, writes: int, line_len: int) -> dict:
+    code = (
+        f"line = 'x' * {line_len}\n"
+        f"for i in range({writes}):\n"
+        f"    print(i, line)\n"
+    )
+    with tempfile.TemporaryDirectory() as working_dir:
+        interpreter = Interpreter(working_dir, timeout=3600, output_mode=mode)
+        t0 = time.perf_counter()
+        result = interpreter.run(code, reset_session=True)
+        elapsed = time.perf_counter() - t0
+        interpreter.cleanup_session()
+        interpreter.close()
+
+    produced = sum(len(str(i)) + line_len + 2 for i in range(writes))
+    return {
+        "mode": mode,
+        "writes": writes,
+        "output_chars": produced,
+        "returned_chars": sum(len(s) for s in result.term_out),
+        "returned_messages": len(result.term_out),
+        "wall_s": elapsed,
+        "throughput_mb_s": produced / elapsed / 1e6,
+        # ru_maxrss is in KiB on Linux
+        "orchestrator_peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / 1024,
+        "child_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=200_000)
+    parser.add_argument("--line-len", type=int, default=80)
+    parser.add_argument("--single", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.writes, args.line_len)))
+        return
+
+    results = []
+    for mode in MODES:
+        proc = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                mode,
+                "--writes",
+                str(args.writes),
+                "--line-len",
+                str(args.line_len),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Spawn-to-first-statement latency of `Interpreter.run`.
+
+Compares the default path (a cold child process per run that re-imports the heavy
+modules) with the warm forkserver pool (children forked from a server that has
+already imported them). Also reports the supervisor overhead recorded on every
+`ExecutionResult` (run wall time not spent executing the code).
+
+Usage:
+    python benchmarks/interpreter_spawn.py --runs 10 --modules numpy matplotlib torch
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.treesearch.interpreter import Interpreter  # noqa: E402
+
+
+def measure(
+    interpreter: Interpreter, modules: list[str], runs: int
+) -> tuple[list[float], list[float]]:
+    imports = "".join(f"import {m}\n" for m in modules)
+    code = f"{imports}import time\nprint(repr(time.time()))\n"
+    latencies, overheads = [], []
+    for _ in range(runs):
+        t0 = time.time()
+        result = interpreter.run(code, reset_session=True)
+        first_stmt = float(result.term_out[0])
+        latencies.append(first_stmt - t0)
+        overheads.append(result.supervisor_time)
+        # mirrors the worker path, which cleans up after every execution
+        interpreter.cleanup_session()
+    return latencies, overheads
+
+
+def summarize(measurements: tuple[list[float], list[float]]) -> dict:
+    latencies, overheads = measurements
+    ms = sorted(1000 * x for x in latencies)
+    return {
+        "runs": len(ms),
+        "first_ms": 1000 * latencies[0],
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.mean(ms),
+        "max_ms": ms[-1],
+        "supervisor_median_ms": statistics.median(1000 * x for x in overheads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--modules", nargs="*", default=["numpy", "matplotlib", "matplotlib.pyplot"]
+    )
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as working_dir:
+        cold = Interpreter(working_dir, timeout=600)
+        results["cold"] = summarize(measure(cold, args.modules, args.runs))
+        cold.close()
+
+        warm = Interpreter(
+            working_dir, timeout=600, preload_modules=["shutup", *args.modules]
+        )
+        results["warm_pool"] = summarize(measure(warm, args.modules, args.runs))
+        warm.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
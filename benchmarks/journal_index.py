@@ -0,0 +1,128 @@
+"""
+Journal lookups and node partitions on large journals.
+
+Builds a synthetic search tree (drafts, debug chains and improvements with a mix
+of buggy and good nodes) and times, per operation, the indexed `Journal` against
+the linear scans it replaced: `get_node_by_id` (called by `Node.from_dict` for
+every result), `draft_nodes`, `buggy_nodes` and `good_nodes` (polled repeatedly
+by `_select_parallel_nodes`), and the viable-tree check of the selection (which
+used to collect every leaf of every draft tree, and now reads the subtree
+statistics kept up to date on append). Also checks that both give the same
+answers.
+
+Usage:
+    python benchmarks/journal_index.py --nodes 10000 50000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.treesearch.journal import Journal, Node  # noqa: E402
+from ai_scientist.treesearch.utils.metric import MetricValue  # noqa: E402
+
+
+def build_journal(num_nodes: int, seed: int = 0) -> tuple[Journal, float]:
+    rng = random.Random(seed)
+    journal = Journal()
+    start = time.perf_counter()
+    for i in range(num_nodes):
+        parent = rng.choice(journal.nodes) if i >= 20 else None
+        buggy = rng.random() < 0.4
+        node = Node(
+            code=f"# node {i}",
+            parent=parent,
+            is_buggy=buggy,
+            is_buggy_plots=None if buggy else rng.random() < 0.1,
+            metric=MetricValue(rng.random(), maximize=True),
+        )
+        journal.append(node)
+    return journal, time.perf_counter() - start
+
+
+def _get_leaves(node: Node) -> list[Node]:
+    if not node.children:
+        return [node]
+    return [leaf for child in node.children for leaf in _get_leaves(child)]
+
+
+def linear_scans(journal: Journal) -> dict:
+    """The journal queries as they were implemented before indexing."""
+    nodes = journal.nodes
+    return {
+        "get_node_by_id": lambda node_id: next(
+            (n for n in nodes if n.id == node_id), None
+        ),
+        "draft_nodes": lambda: [n for n in nodes if n.parent is None],
+        "buggy_nodes": lambda: [n for n in nodes if n.is_buggy],
+        "good_nodes": lambda: [
+            n for n in nodes if n.is_buggy is False and n.is_buggy_plots is False
+        ],
+        "viable_trees": lambda: [
+            root
+            for root in nodes
+            if root.parent is None
+            and not all(leaf.is_buggy for leaf in _get_leaves(root))
+        ],
+    }
+
+
+def time_calls(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def bench(num_nodes: int, lookups: int) -> dict:
+    journal, build_time = build_journal(num_nodes)
+    rng = random.Random(1)
+    ids = [(rng.choice(journal.nodes).id,) for _ in range(lookups)]
+    linear = linear_scans(journal)
+    indexed = {
+        "get_node_by_id": journal.get_node_by_id,
+        "draft_nodes": lambda: journal.draft_nodes,
+        "buggy_nodes": lambda: journal.buggy_nodes,
+        "good_nodes": lambda: journal.good_nodes,
+        "viable_trees": lambda: [
+            root
+            for root in journal.draft_nodes
+            if not root.subtree_stats.all_leaves_buggy
+        ],
+    }
+
+    for name in ("draft_nodes", "buggy_nodes", "good_nodes", "viable_trees"):
+        assert indexed[name]() == linear[name](), name
+    assert all(indexed["get_node_by_id"](i) is linear["get_node_by_id"](i) for i, in ids[:100])
+
+    results = {"nodes": num_nodes, "build_s": build_time}
+    for name in indexed:
+        args_list = ids if name == "get_node_by_id" else [()] * 20
+        results[name] = {
+            "linear_us": time_calls(linear[name], args_list),
+            "indexed_us": time_calls(indexed[name], args_list),
+        }
+
+    # a status update after append re-partitions the node
+    node = journal.good_nodes[0]
+    node.is_buggy = True
+    assert node not in journal.good_nodes and node in journal.buggy_nodes
+    assert indexed["viable_trees"]() == linear["viable_trees"]()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+    print(json.dumps([bench(n, args.lookups) for n in args.nodes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
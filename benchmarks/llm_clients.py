@@ -0,0 +1,79 @@
+"""
+Latency of sequential LLM calls with a new client per call vs the shared client registry.
+
+Sends requests through `llm.get_response_from_llm` to a local fake
+OpenAI-compatible endpoint (see llm_rate_limit.py) that delays every new
+connection by `--connect-delay`, standing in for the TCP/TLS handshake with a
+remote API. The "fresh" run creates an `openai.OpenAI` client per call, as
+`create_client` used to; the "registry" run gets its client from
+`llm_create_client`, which reuses `ai_scientist.utils.llm_clients`' pooled client.
+Reports per-call latency, client creation time and the connections opened.
+
+Usage:
+    python benchmarks/llm_clients.py --calls 50 --connect-delay 0.05
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import openai  # noqa: E402
+
+from ai_scientist import llm  # noqa: E402
+from ai_scientist.utils import llm_clients  # noqa: E402
+from llm_rate_limit import FakeEndpoint  # noqa: E402
+
+MODEL = "gpt-4o-fake"
+
+
+def run(args, create_client) -> dict:
+    server = FakeEndpoint(1e9, 1.0, args.latency, args.connect_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    create_times, latencies = [], []
+    for i in range(args.calls):
+        t0 = time.perf_counter()
+        client = create_client()
+        t1 = time.perf_counter()
+        llm.get_response_from_llm(f"Request {i}", client, MODEL, "You are a benchmark.")
+        latencies.append(time.perf_counter() - t1)
+        create_times.append(t1 - t0)
+    server.shutdown()
+    return {
+        "mean_create_ms": statistics.mean(create_times) * 1000,
+        "mean_call_ms": statistics.mean(latencies) * 1000,
+        "median_call_ms": statistics.median(latencies) * 1000,
+        "total_s": sum(create_times) + sum(latencies),
+        "connections": server.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="endpoint latency (s)")
+    parser.add_argument(
+        "--connect-delay", type=float, default=0.05, help="delay of a new connection (s)"
+    )
+    args = parser.parse_args()
+    results = {
+        "calls": args.calls,
+        "connect_delay_s": args.connect_delay,
+        "fresh": run(args, openai.OpenAI),
+        "registry": run(args, lambda: llm.create_client(MODEL)[0]),
+    }
+    results["registry"]["pools"] = llm_clients.stats()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+LLM request throughput of concurrent workers against a rate-limited endpoint.
+
+Starts a local fake OpenAI-compatible endpoint that enforces a requests/min
+token bucket (answering 429 with Retry-After when it is exceeded) and sends
+requests from several worker processes through `backend.query`, as the tree
+search workers do. Runs once without and once with the shared rate limiter
+(`ai_scientist.utils.rate_limiter`) and reports the wall time, the 429s seen by
+the endpoint and the limiter's queueing delay.
+
+Usage:
+    python benchmarks/llm_rate_limit.py --workers 8 --calls 15 --rpm 600
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.utils import rate_limiter  # noqa: E402
+
+MODEL = "gpt-4o-fake"
+
+
+class FakeEndpoint(ThreadingHTTPServer):
+    """Chat completions endpoint with a requests/min limit and fixed latencies."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, rpm: float, burst_seconds: float, latency: float, connect_delay: float = 0.0
+    ):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rate = rpm / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.latency = latency
+        # stands in for the TCP/TLS handshake with a remote API
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def admit(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.level < 1:
+                self.rejected += 1
+                return False
+            self.level -= 1
+            self.accepted += 1
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, like the real APIs
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict = {}):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.server.admit():
+            self._reply(
+                429,
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                {"retry-after": "1"},
+            )
+            return
+        time.sleep(self.server.latency)
+        prompt_tokens = len(json.dumps(request["messages"])) // 4
+        self._reply(
+            200,
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "ok"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": 1,
+                    "total_tokens": prompt_tokens + 1,
+                    "prompt_tokens_details": {"cached_tokens": 0},
+                    "completion_tokens_details": {"reasoning_tokens": 0},
+                },
+            },
+        )
+
+
+def worker(calls: int) -> float:
+    from ai_scientist.treesearch import backend
+
+    start = time.perf_counter()
+    for i in range(calls):
+        backend.query("You are a benchmark.", f"Request {i}", model=MODEL, max_tokens=16)
+    return time.perf_counter() - start
+
+
+def run(args, limited: bool) -> dict:
+    server = FakeEndpoint(args.rpm, args.burst, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    with tempfile.TemporaryDirectory() as state_dir:
+        rate_limiter.configure(
+            f"{MODEL}={args.rpm * args.margin}::{args.burst}" if limited else None,
+            state_dir,
+        )
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            durations = pool.map(worker, [args.calls] * args.workers)
+        wall = time.perf_counter() - start
+        limiter = rate_limiter.get_limiter()
+        stats = limiter.stats() if limiter else {}
+    server.shutdown()
+    requests = args.workers * args.calls
+    return {
+        "wall_s": wall,
+        "requests_per_s": requests / wall,
+        "ideal_wall_s": max(0.0, requests - server.capacity) / server.rate,
+        "mean_worker_s": sum(durations) / len(durations),
+        "endpoint_429s": server.rejected,
+        "limiter": next(iter(stats.values()), None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=15, help="requests per worker")
+    parser.add_argument("--rpm", type=float, default=600, help="endpoint requests/min")
+    parser.add_argument("--burst", type=float, default=1.0, help="burst, in seconds of quota")
+    parser.add_argument("--latency", type=float, default=0.05, help="endpoint latency (s)")
+    parser.add_argument(
+        "--margin", type=float, default=0.95, help="limiter rate relative to the endpoint's"
+    )
+    args = parser.parse_args()
+    results = {
+        "workers": args.workers,
+        "requests": args.workers * args.calls,
+        "rpm": args.rpm,
+        "unlimited": run(args, limited=False),
+        "shared_limiter": run(args, limited=True),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
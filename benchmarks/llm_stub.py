@@ -0,0 +1,441 @@
+"""
+Scripted OpenAI/Anthropic-compatible LLM server for offline tree search runs.
+
+Answers `POST /v1/chat/completions` (OpenAI, including function calls) and
+`POST /v1/messages` (Anthropic) with responses that keep the tree search going
+without a real model: experiment code is a synthetic CPU-only task that burns
+`--task-runtime` seconds of CPU (lognormally spread), saves experiment_data.npy
+and prints a validation loss, and fails with probability `--bug-rate`. Improved,
+tuned and debugged versions of a node's code start from the loss in the parent's
+code, so the search makes progress. Metric parsing, plotting, reviews, VLM
+feedback and stage decisions are answered from the prompt (metrics from the
+execution output, node ids from the candidates, ...). Stages never end early,
+so a run does `stageN_max_iters` steps per stage.
+
+Every answer is delayed by `--latency` plus `--tokens-per-s` generation time,
+and `--error-rate` of the requests fail with a 500 or 429 to exercise the
+retries. `GET /stats` returns the requests per kind and the injected errors.
+
+Usage:
+    python benchmarks/llm_stub.py --port 8000 --latency 1.0 --task-runtime 5
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:8000 ...
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXPERIMENT_CODE = '''import os
+import time
+
+import numpy as np
+
+# synthetic CPU-only task of the benchmark stub
+SYNTHETIC_RUNTIME = {runtime:.3f}
+SYNTHETIC_LOSS = {loss:.6f}
+
+working_dir = os.path.join(os.getcwd(), "working")
+os.makedirs(working_dir, exist_ok=True)
+
+deadline = time.process_time() + SYNTHETIC_RUNTIME
+steps = 0
+while time.process_time() < deadline:
+    steps += 1
+{failure}
+losses = np.linspace(2 * SYNTHETIC_LOSS, SYNTHETIC_LOSS, 10)
+experiment_data = {{
+    "synthetic": {{
+        "metrics": {{"train": list(losses * 0.9), "val": list(losses)}},
+        "losses": {{"train": list(losses * 0.9), "val": list(losses)}},
+    }}
+}}
+np.save(os.path.join(working_dir, "experiment_data.npy"), experiment_data)
+print(f"validation loss: {{SYNTHETIC_LOSS:.6f}}")
+'''
+
+# split, so that only the execution output (not the code) contains the marker
+FAILURE_CODE = 'raise RuntimeError("synthetic " + "failure")\n'
+FAILURE_MARKER = "synthetic failure"
+
+PARSE_METRICS_CODE = '''import os
+
+import numpy as np
+
+working_dir = os.path.join(os.getcwd(), "working")
+experiment_data = np.load(os.path.join(working_dir, "experiment_data.npy"), allow_pickle=True).item()
+for dataset_name, data in experiment_data.items():
+    print(f"Dataset: {dataset_name}")
+    print(f"validation loss: {data['metrics']['val'][-1]:.6f}")
+'''
+
+PLOTTING_CODE = '''import matplotlib.pyplot as plt
+import numpy as np
+import os
+
+working_dir = os.path.join(os.getcwd(), "working")
+try:
+    experiment_data = np.load(os.path.join(working_dir, "experiment_data.npy"), allow_pickle=True).item()
+except Exception as e:
+    print(f"Error loading experiment data: {e}")
+    experiment_data = {}
+
+for dataset_name, data in experiment_data.items():
+    try:
+        plt.figure(figsize=(3, 2), dpi=50)
+        plt.plot(data["losses"]["val"])
+        plt.title(f"{dataset_name} validation loss")
+        plt.savefig(os.path.join(working_dir, f"{dataset_name}_val_loss.png"))
+        plt.close()
+    except Exception as e:
+        print(f"Error creating plot: {e}")
+        plt.close()
+'''
+
+METRIC_DEFINITION = (
+    "- name: validation loss\n- maximize: false\n"
+    "- description: loss of the synthetic task on its validation split"
+)
+
+
+def _code_response(plan: str, code: str) -> str:
+    return f"{plan}\n\n```python\n{code}```\n"
+
+
+class StubLLM(ThreadingHTTPServer):
+    """Scripted chat endpoint; `respond` maps a request to (kind, text or function arguments)."""
+
+    daemon_threads = True
+
+    def __init__(self, args, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.errors = Counter()
+
+    def _random(self, draw):
+        with self.lock:
+            return draw(self.rng)
+
+    def _experiment_code(self, prompt: str) -> str:
+        args = self.args
+        # improve/debug/tuning/ablation prompts contain the parent's code
+        parent = re.search(r"SYNTHETIC_LOSS = ([0-9.]+)", prompt)
+        if parent:
+            factor = self._random(
+                lambda r: r.uniform(1 - args.improvement, 1 + args.improvement / 2)
+            )
+            loss = float(parent.group(1)) * factor
+        else:
+            loss = self._random(lambda r: r.uniform(0.5, 1.0))
+        runtime = 0.0
+        if args.task_runtime > 0:
+            # lognormal with mean task_runtime
+            sigma = args.runtime_spread
+            mu = math.log(args.task_runtime) - sigma**2 / 2
+            runtime = self._random(lambda r: r.lognormvariate(mu, sigma))
+        buggy = self._random(lambda r: r.random()) < args.bug_rate
+        code = EXPERIMENT_CODE.format(
+            runtime=runtime, loss=loss, failure=FAILURE_CODE if buggy else ""
+        )
+        return _code_response(
+            "Train a small model on the synthetic task and report its validation loss. "
+            "The runtime and the result of the task are scripted by the benchmark stub.",
+            code,
+        )
+
+    def respond_text(self, prompt: str) -> tuple[str, str]:
+        if "ABLATION NAME:" in prompt:
+            n = self._random(lambda r: r.randrange(10**6))
+            return "ablation_idea", (
+                f"ABLATION NAME: synthetic ablation {n}\n"
+                "ABLATION DESCRIPTION: Remove one component of the synthetic task."
+            )
+        if "HYPERPARAM NAME:" in prompt:
+            n = self._random(lambda r: r.randrange(10**6))
+            return "hyperparam_idea", (
+                f"HYPERPARAM NAME: synthetic hyperparameter {n}\n"
+                "DESCRIPTION: Tune one hyperparameter of the synthetic task."
+            )
+        if "SUCCESSFULLY_TESTED_DATASETS:" in prompt:
+            return "tested_datasets", (
+                "REASONING: The plots show the validation loss of the synthetic task.\n"
+                "SUCCESSFULLY_TESTED_DATASETS: synthetic"
+            )
+        if "stored in numpy files" in prompt:
+            return "parse_metrics_code", _code_response(
+                "Load experiment_data.npy and print the final validation loss per dataset.",
+                PARSE_METRICS_CODE,
+            )
+        if "Plotting code guideline" in prompt:
+            return "plotting_code", _code_response(
+                "Plot the validation loss curve of each dataset.", PLOTTING_CODE
+            )
+        if "Propose a single evaluation metric" in prompt:
+            return "metric_definition", METRIC_DEFINITION
+        if "```python" in prompt:
+            return "experiment_code", self._experiment_code(prompt)
+        return "text", "The synthetic experiment runs as scripted by the benchmark stub."
+
+    def respond_function(self, name: str, prompt: str, num_images: int) -> dict:
+        if name == "submit_review":
+            buggy = FAILURE_MARKER in prompt
+            return {
+                "is_bug": buggy,
+                "summary": "The synthetic task failed." if buggy else "",
+            }
+        if name == "parse_metrics":
+            losses = re.findall(r"validation loss: ([0-9.]+)", prompt)
+            datasets = re.findall(r"Dataset: (\w+)", prompt) or ["synthetic"]
+            return {
+                "valid_metrics_received": bool(losses),
+                "metric_names": [
+                    {
+                        "metric_name": "validation loss",
+                        "lower_is_better": True,
+                        "description": "Validation loss of the synthetic task",
+                        "data": [
+                            {
+                                "dataset_name": dataset,
+                                "final_value": float(loss),
+                                "best_value": float(loss),
+                            }
+                            for dataset, loss in zip(datasets, losses)
+                        ],
+                    }
+                ]
+                if losses
+                else [],
+            }
+        if name == "analyze_experiment_plots":
+            return {
+                "plot_analyses": [
+                    {"analysis": "The validation loss decreases steadily."}
+                ]
+                * num_images,
+                "valid_plots_received": num_images > 0,
+                "vlm_feedback_summary": "The plots look as expected.",
+            }
+        if name == "select_plots":
+            return {"selected_plots": re.findall(r"[\w/.-]+\.png", prompt)[:10]}
+        if name == "select_best_implementation":
+            ids = re.findall(r"ID: (\w+)", prompt)
+            return {
+                "selected_id": ids[0] if ids else "",
+                "reasoning": "It has the best validation loss.",
+            }
+        if name in ("evaluate_stage_completion", "evaluate_stage_progression"):
+            # stages run until their max iterations, so runs do a fixed amount of work
+            return {
+                "is_complete": False,
+                "ready_for_next_stage": False,
+                "reasoning": "Keep exploring.",
+                "missing_criteria": ["more iterations"],
+                "recommendations": ["more iterations"],
+                "suggested_focus": "the synthetic task",
+            }
+        if name == "generate_stage_config":
+            return {
+                "name": "synthetic_stage",
+                "description": "Next stage of the synthetic task",
+                "goals": ["improve the validation loss"],
+                "max_iterations": 1,
+            }
+        if name == "generate_substage_goals":
+            return {"goals": "Improve the validation loss.", "sub_stage_name": "synthetic"}
+        if name == "summarize_experiment":
+            return {
+                "findings": "The synthetic task ran.",
+                "significance": "None, it is synthetic.",
+                "next_steps": "Run it again.",
+            }
+        return {}
+
+    def delay(self, text: str) -> None:
+        tokens = len(text) // 4
+        seconds = self._random(lambda r: r.uniform(0.5, 1.5)) * self.args.latency
+        if self.args.tokens_per_s > 0:
+            seconds += tokens / self.args.tokens_per_s
+        time.sleep(seconds)
+
+    def inject_error(self) -> int | None:
+        if self._random(lambda r: r.random()) >= self.args.error_rate:
+            return None
+        status = self._random(lambda r: r.choice((429, 500)))
+        with self.lock:
+            self.errors[status] += 1
+        return status
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "total_requests": sum(self.requests.values()),
+                "injected_errors": {str(k): v for k, v in self.errors.items()},
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, like the real APIs
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("retry-after", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._reply(200, self.server.stats())
+        else:
+            self._reply(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server: StubLLM = self.server
+        status = server.inject_error()
+        if status is not None:
+            self._reply(
+                status,
+                {"error": {"message": "Injected failure", "type": "stub_error"}},
+            )
+            return
+        if self.path.endswith("/chat/completions"):
+            body = self._openai(server, request)
+        elif self.path.endswith("/messages"):
+            body = self._anthropic(server, request)
+        else:
+            self._reply(404, {"error": {"message": f"unknown endpoint {self.path}"}})
+            return
+        self._reply(200, body)
+
+    def _openai(self, server: StubLLM, request: dict) -> dict:
+        messages = request.get("messages", [])
+        prompt = json.dumps(messages)
+        num_images = sum(
+            1
+            for m in messages
+            if isinstance(m.get("content"), list)
+            for part in m["content"]
+            if part.get("type") == "image_url"
+        )
+        message = {"role": "assistant", "content": None}
+        tools = request.get("tools")
+        if tools:
+            name = tools[0]["function"]["name"]
+            kind = name
+            arguments = json.dumps(server.respond_function(name, prompt, num_images))
+            message["tool_calls"] = [
+                {
+                    "id": "call_stub",
+                    "type": "function",
+                    "function": {"name": name, "arguments": arguments},
+                }
+            ]
+            text = arguments
+        else:
+            kind, text = server.respond_text(prompt)
+            message["content"] = text
+        with server.lock:
+            server.requests[kind] += 1
+        server.delay(text)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(text) // 4
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tools else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+                "completion_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+    def _anthropic(self, server: StubLLM, request: dict) -> dict:
+        prompt = json.dumps([request.get("system"), request.get("messages", [])])
+        kind, text = server.respond_text(prompt)
+        with server.lock:
+            server.requests[kind] += 1
+        server.delay(text)
+        return {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": request["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options of the stub, shared with the end-to-end benchmark."""
+    parser.add_argument("--latency", type=float, default=0.5, help="mean LLM latency (s)")
+    parser.add_argument(
+        "--tokens-per-s", type=float, default=0.0, help="generation speed (0 = instant)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of requests failing with 500/429"
+    )
+    parser.add_argument(
+        "--task-runtime", type=float, default=2.0, help="mean CPU time of an experiment (s)"
+    )
+    parser.add_argument(
+        "--runtime-spread", type=float, default=0.5, help="lognormal sigma of the runtimes"
+    )
+    parser.add_argument(
+        "--bug-rate", type=float, default=0.3, help="share of generated experiments that fail"
+    )
+    parser.add_argument(
+        "--improvement", type=float, default=0.2, help="max relative loss change per child"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=0, help="0 = any free port")
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = StubLLM(args, args.port)
+    # the first line tells the launching process where to connect
+    print(json.dumps({"port": server.server_port}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Micro-benchmarks of the interpreter, journal and serialization hot paths.
+
+Each benchmark times one operation with `timeit` (garbage collection off, the
+loop count calibrated to at least --min-time seconds, repeated --repeat times)
+on synthetic inputs built from fixed seeds, so that runs on different commits
+measure the same work. The per-operation minimum is the number to compare; the
+median and spread show how noisy the host was. The output records the commit,
+the Python version and the input sizes next to the timings.
+
+Save a run with `--out`, and compare a later run against it with `--compare`:
+benchmarks that got slower by more than --threshold are listed and make the
+exit status 1.
+
+Usage:
+    python benchmarks/micro.py --out before.json
+    python benchmarks/micro.py --compare before.json --threshold 1.2
+    python benchmarks/micro.py --only "journal.*" "metric.*"
+"""
+
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import ExitStack
+from pathlib import Path
+from types import SimpleNamespace
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ai_scientist.treesearch.interpreter import Interpreter  # noqa: E402
+from ai_scientist.treesearch.journal import Journal, Node  # noqa: E402
+from ai_scientist.treesearch.utils import serialize, tree_export  # noqa: E402
+from ai_scientist.treesearch.utils.metric import (  # noqa: E402
+    MetricValue,
+    WorstMetricValue,
+)
+from ai_scientist.treesearch.utils.response import trim_long_string  # noqa: E402
+import journal_index  # noqa: E402
+import node_codec  # noqa: E402
+
+# name -> setup(args) returning (operation, operations per call, details)
+BENCHMARKS = {}
+# interpreters and working directories of the benchmarks, closed at exit
+_resources = ExitStack()
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def _metric(rng: random.Random) -> MetricValue:
+    return MetricValue(
+        value={
+            "metric_names": [
+                {
+                    "metric_name": "validation loss",
+                    "lower_is_better": True,
+                    "description": "cross entropy",
+                    "data": [
+                        {
+                            "dataset_name": f"ds{d}",
+                            "final_value": rng.random(),
+                            "best_value": rng.random(),
+                        }
+                        for d in range(3)
+                    ],
+                }
+            ]
+        },
+        maximize=False,
+        name="validation loss",
+    )
+
+
+def _metrics(count: int) -> list[MetricValue]:
+    rng = random.Random(0)
+    # like a journal: every fifth node failed and has the worst metric
+    return [WorstMetricValue() if i % 5 == 0 else _metric(rng) for i in range(count)]
+
+
+def _interpreter(**kwargs) -> Interpreter:
+    working_dir = _resources.enter_context(tempfile.TemporaryDirectory())
+    interpreter = Interpreter(working_dir, timeout=600, **kwargs)
+    _resources.callback(interpreter.close)
+    return interpreter
+
+
+@benchmark("interpreter.spawn")
+def _interpreter_spawn(args):
+    interpreter = _interpreter()
+
+    def run():
+        interpreter.run("pass\n", reset_session=True)
+        # the workers clean up after every execution
+        interpreter.cleanup_session()
+
+    return run, 1, {"preload_modules": None}
+
+
+@benchmark("interpreter.spawn_warm")
+def _interpreter_spawn_warm(args):
+    interpreter = _interpreter(preload_modules=["numpy"])
+
+    def run():
+        interpreter.run("import numpy\n", reset_session=True)
+        interpreter.cleanup_session()
+
+    return run, 1, {"preload_modules": ["numpy"]}
+
+
+@benchmark("interpreter.output")
+def _interpreter_output(args):
+    interpreter = _interpreter()
+    code = f"line = 'x' * 80\nfor i in range({args.output_writes}):\n    print(i, line)\n"
+
+    def run():
+        interpreter.run(code, reset_session=True)
+        interpreter.cleanup_session()
+
+    # per write
+    return run, args.output_writes, {"writes": args.output_writes, "line_len": 80}
+
+
+def _journal_setup(args) -> tuple[Journal, list[str]]:
+    journal, _ = journal_index.build_journal(args.journal_nodes)
+    rng = random.Random(1)
+    ids = [rng.choice(journal.nodes).id for _ in range(1000)]
+    return journal, ids
+
+
+@benchmark("journal.good_nodes")
+def _journal_good_nodes(args):
+    journal, _ = _journal_setup(args)
+    return lambda: journal.good_nodes, 1, {"nodes": args.journal_nodes}
+
+
+@benchmark("journal.get_node_by_id")
+def _journal_get_node_by_id(args):
+    journal, ids = _journal_setup(args)
+
+    def run():
+        for node_id in ids:
+            journal.get_node_by_id(node_id)
+
+    return run, len(ids), {"nodes": args.journal_nodes}
+
+
+@benchmark("journal.get_best_node")
+def _journal_get_best_node(args):
+    journal, _ = _journal_setup(args)
+    return (
+        lambda: journal.get_best_node(use_val_metric_only=True),
+        1,
+        {"nodes": args.journal_nodes, "use_val_metric_only": True},
+    )
+
+
+@benchmark("journal.get_best_node_after_append")
+def _journal_get_best_node_after_append(args):
+    # a new good node invalidates whatever the journal remembers about the best node
+    journal, _ = _journal_setup(args)
+    rng = random.Random(2)
+
+    def run():
+        journal.append(
+            Node(
+                code="# new node",
+                parent=rng.choice(journal.nodes),
+                is_buggy=False,
+                is_buggy_plots=False,
+                metric=MetricValue(rng.random(), maximize=True),
+            )
+        )
+        journal.get_best_node(use_val_metric_only=True)
+
+    return run, 1, {"nodes": args.journal_nodes, "use_val_metric_only": True}
+
+
+def _realistic_journal(args) -> Journal:
+    return node_codec.build_journal(args.realistic_nodes, args.output_lines)
+
+
+@benchmark("serialize.dumps_json")
+def _serialize_dumps(args):
+    journal = _realistic_journal(args)
+    return (
+        lambda: serialize.dumps_json(journal),
+        len(journal),
+        {"nodes": args.realistic_nodes, "output_lines": args.output_lines},
+    )
+
+
+@benchmark("serialize.loads_json")
+def _serialize_loads(args):
+    data = serialize.dumps_json(_realistic_journal(args))
+    return (
+        lambda: serialize.loads_json(data, Journal),
+        args.realistic_nodes,
+        {"nodes": args.realistic_nodes, "output_lines": args.output_lines, "bytes": len(data)},
+    )
+
+
+@benchmark("node.to_dict")
+def _node_to_dict(args):
+    journal = _realistic_journal(args)
+
+    def run():
+        for node in journal.nodes:
+            node.to_dict()
+
+    return run, len(journal), {"output_lines": args.output_lines}
+
+
+@benchmark("node.from_dict")
+def _node_from_dict(args):
+    journal = _realistic_journal(args)
+    dicts = [node.to_dict() for node in journal.nodes]
+
+    def run():
+        for data in dicts:
+            # from_dict consumes the relationship and metric entries
+            Node.from_dict(dict(data), journal)
+
+    return run, len(dicts), {"output_lines": args.output_lines}
+
+
+@benchmark("metric.compare")
+def _metric_compare(args):
+    metrics = _metrics(args.metrics)
+    pairs = list(zip(metrics, metrics[1:]))
+
+    def run():
+        for a, b in pairs:
+            a > b
+
+    return run, len(pairs), {"metrics": args.metrics, "worst_share": 0.2}
+
+
+@benchmark("metric.sort")
+def _metric_sort(args):
+    metrics = _metrics(args.metrics)
+    return (
+        lambda: sorted(metrics, reverse=True),
+        1,
+        {"metrics": args.metrics, "worst_share": 0.2},
+    )
+
+
+@benchmark("metric.max")
+def _metric_max(args):
+    metrics = _metrics(args.metrics)
+    return lambda: max(metrics), 1, {"metrics": args.metrics, "worst_share": 0.2}
+
+
+@benchmark("tree_export.cfg_to_tree_struct")
+def _cfg_to_tree_struct(args):
+    journal = _realistic_journal(args)
+    cfg = SimpleNamespace(exp_name="bench")
+    return (
+        lambda: tree_export.cfg_to_tree_struct(cfg, journal),
+        1,
+        {"nodes": args.realistic_nodes, "output_lines": args.output_lines},
+    )
+
+
+@benchmark("response.trim_long_string")
+def _trim_long_string(args):
+    rng = random.Random(0)
+    # terminal outputs and code, below and above the trimming threshold
+    strings = [
+        "".join(rng.choice("abcdefgh \n") for _ in range(rng.choice((2_000, 200_000))))
+        for _ in range(50)
+    ]
+
+    def run():
+        for s in strings:
+            trim_long_string(s)
+
+    return run, len(strings), {"strings": len(strings), "lengths": [2_000, 200_000]}
+
+
+def measure(setup, args) -> dict:
+    operation, ops_per_call, details = setup(args)
+    timer = timeit.Timer(operation)
+    # calls per timing, so that one timing takes at least min_time
+    loops = 1
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= args.min_time:
+            break
+        loops = max(loops * 2, int(loops * args.min_time / max(elapsed, 1e-9) * 1.1))
+    timings = [t / loops / ops_per_call * 1e6 for t in timer.repeat(args.repeat, loops)]
+    return {
+        "unit": "us/op",
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "loops": loops,
+        "ops_per_loop": ops_per_call,
+        "repeat": args.repeat,
+        **details,
+    }
+
+
+def _git(*command: str) -> str | None:
+    try:
+        return subprocess.run(
+            ["git", *command], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args) -> dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> tuple[dict, list[str]]:
+    """Ratio of the minima (new / baseline) per benchmark in both runs, and the regressions."""
+    ratios, regressions = {}, []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None or not old.get("min"):
+            continue
+        ratios[name] = result["min"] / old["min"]
+        if ratios[name] > threshold:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", help="benchmark name patterns, e.g. 'journal.*'")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="minimum duration of one timing (s)"
+    )
+    parser.add_argument("--journal-nodes", type=int, default=10_000)
+    parser.add_argument(
+        "--realistic-nodes", type=int, default=100, help="nodes with code, output and analyses"
+    )
+    parser.add_argument("--output-lines", type=int, default=400)
+    parser.add_argument("--output-writes", type=int, default=20_000)
+    parser.add_argument("--metrics", type=int, default=10_000)
+    parser.add_argument("--out", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=1.2, help="slowdown ratio reported as regression"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    names = [
+        name
+        for name in BENCHMARKS
+        if not args.only or any(fnmatch.fnmatch(name, p) for p in args.only)
+    ]
+    with _resources:
+        output = {
+            "meta": metadata(args),
+            "results": {name: measure(BENCHMARKS[name], args) for name in names},
+        }
+    regressions = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        ratios, regressions = compare(output["results"], baseline, args.threshold)
+        output["comparison"] = {
+            "baseline_commit": baseline["meta"].get("commit"),
+            "threshold": args.threshold,
+            "ratios": ratios,
+            "regressions": regressions,
+        }
+    text = json.dumps(output, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    print(text)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
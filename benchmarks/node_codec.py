@@ -0,0 +1,170 @@
+"""
+Encode/decode time and payload size of the binary node codec.
+
+Builds a journal of realistic nodes (a few KB of code and plans, hundreds of
+output lines, a traceback, per-dataset metrics and VLM plot analyses) and
+compares, per node, the previous IPC path (`Node.to_dict`, a pickle test, the
+executor's pickle, then unpickle and `Node.from_dict`) with `encode_node` /
+`decode_node`. Also reports the size of the work orders and
+result deltas that replaced full nodes in the worker messages (large fields go
+through a `BlobStore`), and checks that nodes survive the round trip.
+
+Usage:
+    python benchmarks/node_codec.py --nodes 200 --output-lines 400
+"""
+
+import argparse
+import json
+import pickle
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.treesearch.blob_store import BlobStore  # noqa: E402
+from ai_scientist.treesearch.journal import Journal, Node  # noqa: E402
+from ai_scientist.treesearch.utils import codec  # noqa: E402
+from ai_scientist.treesearch.utils.metric import MetricValue  # noqa: E402
+from ai_scientist.treesearch.work_order import (  # noqa: E402
+    make_result_delta,
+    make_work_order,
+)
+
+
+def make_node(i: int, parent: Node | None, output_lines: int, rng) -> Node:
+    code = "\n".join(
+        f"x_{j} = model(batch_{j}).mean()  # step {j}" for j in range(120)
+    )
+    return Node(
+        plan="Train a small transformer and report validation loss. " * 20,
+        overall_plan="Overall plan " * 50,
+        code=code,
+        plot_code=code[:2000],
+        parent=parent,
+        _term_out=[f"epoch {j}: loss={rng.random():.4f}\n" for j in range(output_lines)],
+        exec_time=rng.uniform(10, 600),
+        exc_type=None if i % 3 else "RuntimeError",
+        exc_info=None if i % 3 else {"args": ["CUDA out of memory"]},
+        exc_stack=None
+        if i % 3
+        else [("runfile.py", 10 + j, "train", "loss.backward()") for j in range(8)],
+        exec_resources={"cpu_user": 12.5, "peak_rss_mb": 812.0, "threads_spawned": 4},
+        analysis="The model converges but overfits after epoch 5. " * 5,
+        metric=MetricValue(
+            value={
+                "metric_names": [
+                    {
+                        "metric_name": "validation loss",
+                        "lower_is_better": True,
+                        "description": "cross entropy",
+                        "data": [
+                            {
+                                "dataset_name": f"ds{d}",
+                                "final_value": rng.random(),
+                                "best_value": rng.random(),
+                            }
+                            for d in range(3)
+                        ],
+                    }
+                ]
+            },
+            maximize=False,
+            name="validation loss",
+        ),
+        is_buggy=i % 3 == 0,
+        is_buggy_plots=False,
+        plots=[f"plot_{j}.png" for j in range(4)],
+        plot_analyses=[{"analysis": "Loss decreases steadily. " * 5} for _ in range(4)],
+        vlm_feedback_summary=["Plots look reasonable."],
+        datasets_successfully_tested=["ds0", "ds1"],
+    )
+
+
+def build_journal(num_nodes: int, output_lines: int) -> Journal:
+    rng = random.Random(0)
+    journal = Journal()
+    for i in range(num_nodes):
+        parent = rng.choice(journal.nodes) if i >= 3 else None
+        journal.append(make_node(i, parent, output_lines, rng))
+    return journal
+
+
+def old_ipc(node: Node, journal: Journal) -> tuple[Node, int]:
+    data = node.to_dict()
+    pickle.dumps(data)  # _safe_pickle_test
+    payload = pickle.dumps(data)  # ProcessPoolExecutor
+    return Node.from_dict(pickle.loads(payload), journal), len(payload)
+
+
+def new_ipc(node: Node, journal: Journal) -> tuple[Node, int]:
+    payload = pickle.dumps(codec.encode_node(node))
+    return codec.decode_node(pickle.loads(payload), journal), len(payload)
+
+
+def time_per_call(fn, args_list) -> tuple[float, int]:
+    start = time.perf_counter()
+    size = 0
+    for args in args_list:
+        size += fn(*args)[1]
+    return (time.perf_counter() - start) / len(args_list) * 1e6, size // len(args_list)
+
+
+def check_roundtrip(journal: Journal) -> None:
+    for node in journal.nodes[:20]:
+        decoded = codec.decode_node(codec.encode_node(node), journal)
+        assert decoded.id == node.id and decoded.code == node.code
+        assert decoded.metric == node.metric and decoded.parent is node.parent
+        assert decoded._term_out == node._term_out
+        assert [tuple(f) for f in decoded.exc_stack or []] == [
+            tuple(f) for f in node.exc_stack or []
+        ]
+    # the dict form of `Node.to_dict` is still accepted
+    node = journal.nodes[-1]
+    legacy = codec.decode_node(node.to_dict(), journal)
+    assert legacy.id == node.id and legacy.code == node.code
+
+
+def bench(num_nodes: int, output_lines: int) -> dict:
+    journal = build_journal(num_nodes, output_lines)
+    check_roundtrip(journal)
+    args_list = [(node, journal) for node in journal.nodes]
+    old_us, old_size = time_per_call(old_ipc, args_list)
+    new_us, new_size = time_per_call(new_ipc, args_list)
+
+    with tempfile.TemporaryDirectory() as blob_dir:
+        blobs = BlobStore(blob_dir)
+        start = time.perf_counter()
+        order_bytes = [len(pickle.dumps(make_work_order(n, blobs))) for n in journal.nodes]
+        delta_bytes = [len(pickle.dumps(make_result_delta(n, blobs))) for n in journal.nodes]
+        messages_us = (time.perf_counter() - start) / num_nodes * 1e6
+
+    return {
+        "nodes": num_nodes,
+        "output_lines": output_lines,
+        "worker_messages": {
+            "work_order_bytes": sum(order_bytes) // num_nodes,
+            "result_delta_bytes": sum(delta_bytes) // num_nodes,
+            "order_and_delta_us": messages_us,
+        },
+        "node_ipc": {
+            "to_dict_pickle_us": old_us,
+            "codec_us": new_us,
+            "to_dict_pickle_bytes": old_size,
+            "codec_bytes": new_size,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--output-lines", type=int, default=400)
+    args = parser.parse_args()
+    print(json.dumps([bench(n, args.output_lines) for n in args.nodes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Resident memory of journal nodes, with heavy fields in memory and offloaded.
+
+Builds journals of realistic nodes (see `node_codec.py`) and reports the memory
+retained per 1k nodes (traced with tracemalloc) when every field is held in
+memory, and after `Node.offload` moved code, terminal output and analyses to a
+`BlobStore`. Run it on an older checkout to get the numbers of the dict-based
+`Node` (the offloaded case is skipped there).
+
+Usage:
+    python benchmarks/node_memory.py --nodes 1000 --output-lines 400
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ai_scientist.treesearch.blob_store import BlobStore  # noqa: E402
+from ai_scientist.treesearch.journal import Node  # noqa: E402
+from node_codec import build_journal  # noqa: E402
+
+
+def retained_mb(num_nodes: int, output_lines: int, offload: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as blob_dir:
+        journal = build_journal(num_nodes, output_lines)
+        if offload:
+            blobs = BlobStore(blob_dir)
+            for node in journal.nodes:
+                node.offload(blobs)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # (keep the journal alive until measured)
+        del journal
+    return current / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--output-lines", type=int, default=400)
+    args = parser.parse_args()
+
+    per_1k = 1000 / args.nodes
+    results = {
+        "nodes": args.nodes,
+        "output_lines": args.output_lines,
+        "slots": hasattr(Node, "__slots__") and "code" in Node.__slots__,
+        "in_memory_mb_per_1k": retained_mb(args.nodes, args.output_lines, False)
+        * per_1k,
+    }
+    if hasattr(Node, "offload"):
+        results["offloaded_mb_per_1k"] = (
+            retained_mb(args.nodes, args.output_lines, True) * per_1k
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Synthetic memory hogs and CPU spinners against the interpreter's resource limits.
+
+Runs snippets that exceed `max_rss_mb` (resident memory, enforced by the
+sampler), `max_memory_mb` (address space) and `max_cpu_seconds`, and one that
+stays within all three, and checks the reported exception type and the usage
+recorded on the `ExecutionResult` (peak RSS, CPU time). Also checks that the
+memory admission controller gives up after `max_wait` when the host never has
+enough free memory, and doesn't wait when it has. Prints JSON and fails on the
+first check that doesn't hold.
+
+Usage:
+    python benchmarks/resource_limits.py --rss-limit-mb 300 --cpu-limit-s 2
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_scientist.treesearch.interpreter import Interpreter  # noqa: E402
+from ai_scientist.treesearch.parallel_agent import (  # noqa: E402
+    MemoryAdmissionController,
+    get_available_memory_mb,
+)
+
+# touches every page, so the chunks count towards RSS (unlike bytearray(n))
+RSS_HOG = """
+import time
+chunks = []
+for _ in range({chunks}):
+    chunks.append(b"\\1" * (50 * 1024 * 1024))
+    time.sleep(0.05)
+print("not killed")
+"""
+# a single allocation beyond the address space limit
+AS_HOG = """
+data = b"\\1" * ({size_mb} * 1024 * 1024)
+print("not killed")
+"""
+CPU_SPIN = """
+while True:
+    pass
+"""
+WITHIN_LIMITS = """
+import time
+data = b"\\1" * (20 * 1024 * 1024)
+end = time.process_time() + 0.2
+while time.process_time() < end:
+    pass
+print("ok")
+"""
+
+
+def run(working_dir: str, code: str, timeout: int, **limits) -> dict:
+    interpreter = Interpreter(working_dir, timeout=timeout, **limits)
+    t0 = time.time()
+    result = interpreter.run(code, reset_session=True)
+    wall = time.time() - t0
+    interpreter.close()
+    resources = result.resources or {}
+    return {
+        "limits": limits,
+        "exc_type": result.exc_type,
+        "wall_s": wall,
+        "exec_time_s": result.exec_time,
+        "peak_rss_mb": resources.get("peak_rss_mb"),
+        "cpu_s": resources.get("cpu_user", 0) + resources.get("cpu_sys", 0),
+    }
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise AssertionError(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rss-limit-mb", type=int, default=300)
+    parser.add_argument("--as-limit-mb", type=int, default=1024)
+    parser.add_argument("--cpu-limit-s", type=int, default=2)
+    parser.add_argument("--timeout", type=int, default=60)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as working_dir:
+        rss = results["rss_hog"] = run(
+            working_dir,
+            RSS_HOG.format(chunks=4 * args.rss_limit_mb // 50 + 1),
+            args.timeout,
+            max_rss_mb=args.rss_limit_mb,
+        )
+        check(rss["exc_type"] == "MemoryError", f"RSS hog not stopped: {rss}")
+        # the sampler checks 5 times a second, the hog grows by 50MB per 50ms
+        check(
+            args.rss_limit_mb <= rss["peak_rss_mb"] < 3 * args.rss_limit_mb,
+            f"RSS hog peak outside the expected range: {rss}",
+        )
+
+        as_hog = results["address_space_hog"] = run(
+            working_dir,
+            AS_HOG.format(size_mb=2 * args.as_limit_mb),
+            args.timeout,
+            max_memory_mb=args.as_limit_mb,
+        )
+        check(
+            as_hog["exc_type"] == "MemoryError",
+            f"address space hog not stopped: {as_hog}",
+        )
+        check(
+            as_hog["peak_rss_mb"] < args.as_limit_mb,
+            f"address space hog got resident: {as_hog}",
+        )
+
+        cpu = results["cpu_spin"] = run(
+            working_dir, CPU_SPIN, args.timeout, max_cpu_seconds=args.cpu_limit_s
+        )
+        check(
+            cpu["exc_type"] == "ResourceLimitExceeded", f"CPU spin not stopped: {cpu}"
+        )
+        # RLIMIT_CPU has a granularity of one second
+        check(
+            args.cpu_limit_s <= cpu["cpu_s"] <= args.cpu_limit_s + 2,
+            f"CPU spin used an unexpected CPU time: {cpu}",
+        )
+
+        ok = results["within_limits"] = run(
+            working_dir,
+            WITHIN_LIMITS,
+            args.timeout,
+            max_rss_mb=args.rss_limit_mb,
+            max_memory_mb=args.as_limit_mb,
+            max_cpu_seconds=args.cpu_limit_s,
+        )
+        check(ok["exc_type"] is None, f"snippet within the limits failed: {ok}")
+        check(ok["peak_rss_mb"] < args.rss_limit_mb, f"peak above the RSS limit: {ok}")
+
+    available = get_available_memory_mb()
+    check(available is not None, "available host memory unknown")
+    starved = MemoryAdmissionController(
+        min_free_memory_mb=int(available) + 1024**2, poll_interval=0.1, max_wait=0.5
+    ).admit([])
+    check(0.5 <= starved < 1.5, f"admission did not give up after max_wait: {starved}")
+    free = MemoryAdmissionController(
+        min_free_memory_mb=1, poll_interval=0.1, max_wait=0.5
+    ).admit([])
+    check(free < 0.1, f"admission waited with enough free memory: {free}")
+    results["admission"] = {
+        "available_mb": available,
+        "starved_wait_s": starved,
+        "free_wait_s": free,
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""
+Replay of the tree search's node selection on an empirical model of past runs.
+
+Tuning the search (debug_prob, num_drafts, max_debug_depth, num_workers) with
+real runs takes hours per setting. This script learns from the journal.json
+files of earlier runs how long executions take, how often nodes turn out buggy
+(by stage, node kind and depth) and how much a good node improves on its good
+ancestor, then replays the node selection policies of the agent (stages 1
+and 3, see ai_scientist/treesearch/selection.py) in simulated time without
+executing anything. The LLM's choice of the best node is approximated by the
+best metric.
+
+Metrics are compared across runs as the relative improvement over the first
+good node of each journal (positive is better, whatever the metric's direction).
+Node time is the recorded execution plus plotting time, plus --overhead-s for
+everything the journal doesn't record (LLM calls, metric parsing, VLM review).
+Compute is the sum of node times, i.e. worker-seconds.
+
+Reports per configuration (averaged over --trials simulations that share their
+random numbers across configurations):
+- time to the first good node, in wall and compute seconds
+- the best metric vs compute (and wall) time, with the share of trials that
+  have a good node at each point
+
+Usage:
+    python benchmarks/search_replay.py experiments/*/logs/0-run --debug-prob 0.2 0.5 0.8
+    python benchmarks/search_replay.py experiments/*/logs/0-run --policy default bandit
+    python benchmarks/search_replay.py logs/0-run/stage_1_*/journal.json \\
+        --num-workers 2 4 8 --num-drafts 2 3 5 --trials 500 --out replay.json --plot replay.png
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from ai_scientist.treesearch.journal import Journal, Node  # noqa: E402
+from ai_scientist.treesearch.selection import SelectionPolicy, make_policy  # noqa: E402
+from ai_scientist.treesearch.utils import serialize  # noqa: E402
+from ai_scientist.treesearch.utils.config import (  # noqa: E402
+    BanditConfig,
+    SearchConfig,
+)
+from ai_scientist.treesearch.utils.metric import (  # noqa: E402
+    MetricValue,
+    WorstMetricValue,
+)
+
+KINDS = ("draft", "debug", "improve")
+# deeper nodes share the statistics of this depth
+MAX_DEPTH_BUCKET = 4
+# weight of the coarser estimate when a rate is estimated from few nodes
+SHRINKAGE = 2.0
+
+
+def load_journals(paths: list[str]) -> list[tuple[str, Journal]]:
+    """(stage number, journal) of each journal.json file, or of those below each directory."""
+    files = []
+    for path in map(Path, paths):
+        files += sorted(path.glob("**/journal.json")) if path.is_dir() else [path]
+    journals = []
+    for file in files:
+        match = re.search(r"stage_(\d+)_", str(file))
+        journals.append(
+            (match.group(1) if match else "?", serialize.load_json(file, Journal))
+        )
+    return journals
+
+
+def _is_good(node: Node) -> bool:
+    return node.is_buggy is False and node.is_buggy_plots is False
+
+
+def _nearest_good(node: Node | None) -> Node | None:
+    """The node itself if it is good, else its closest good ancestor."""
+    while node is not None and not _is_good(node):
+        node = node.parent
+    return node
+
+
+def _depth(kind: str, parent: Node | None) -> int:
+    """Depth bucket of a new node: debug depth for debug nodes, tree depth otherwise."""
+    if parent is None:
+        return 0
+    if kind == "debug":
+        depth = parent.debug_depth + 1
+    else:
+        depth = parent.subtree_stats.depth + 1
+    return min(depth, MAX_DEPTH_BUCKET)
+
+
+def _backoff(stage: str, kind: str, *rest) -> list[tuple]:
+    """Keys from the most specific to the coarsest."""
+    return [(stage, kind, *rest), (stage, kind), (stage,), ()]
+
+
+class EmpiricalModel:
+    """Execution times, bug rates and metric gains of past nodes, for one stage."""
+
+    def __init__(
+        self, journals: list[tuple[str, Journal]], stage: str, overhead_s: float = 0.0
+    ):
+        self.stage = stage
+        self.overhead_s = overhead_s
+        self.times: dict[tuple, list[float]] = defaultdict(list)
+        # key -> [buggy, plots buggy, executed]
+        self.outcomes: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+        self.fresh_scores: dict[tuple, list[float]] = defaultdict(list)
+        self.gains: dict[tuple, list[float]] = defaultdict(list)
+        self.nodes = 0
+        for journal_stage, journal in journals:
+            self._add_journal(journal_stage, journal)
+        if not self.nodes:
+            raise ValueError("The journals contain no executed nodes")
+
+    def _add_journal(self, stage: str, journal: Journal) -> None:
+        nodes = [
+            n
+            for n in journal.nodes
+            if n.is_buggy is not None and not (n.is_seed_node or n.is_seed_agg_node)
+        ]
+        reference = next(
+            (n for n in nodes if _is_good(n) and _score_of(n, None) is not None), None
+        )
+        for node in nodes:
+            self.nodes += 1
+            kind = node.stage_name
+            buggy = bool(node.is_buggy)
+            for key in _backoff(stage, kind, _depth(kind, node.parent)):
+                counts = self.outcomes[key]
+                counts[0] += buggy
+                counts[1] += not buggy and node.is_buggy_plots is not False
+                counts[2] += 1
+            if node.exec_time is not None:
+                time = node.exec_time + (node.plot_exec_time or 0.0)
+                for key in _backoff(stage, kind, buggy):
+                    self.times[key].append(time)
+            if reference is None or not _is_good(node):
+                continue
+            score = _score_of(node, reference)
+            ancestor = _nearest_good(node.parent)
+            if score is None:
+                continue
+            if ancestor is None:
+                for key in _backoff(stage, kind):
+                    self.fresh_scores[key].append(score)
+            elif (base := _score_of(ancestor, reference)) is not None:
+                for key in _backoff(stage, kind):
+                    self.gains[key].append(score - base)
+
+    def _lookup(self, table: dict, keys: list[tuple]):
+        return next((table[k] for k in keys if table.get(k)), None)
+
+    def outcome_probs(self, kind: str, depth: int) -> tuple[float, float]:
+        """P(buggy) and P(buggy plots | not buggy) of a new node, shrunk toward coarser estimates."""
+        p_bug, p_plots = 0.5, 0.5
+        for key in reversed(_backoff(self.stage, kind, depth)):
+            bugs, plot_bugs, total = self.outcomes.get(key, (0, 0, 0))
+            p_bug = (bugs + SHRINKAGE * p_bug) / (total + SHRINKAGE)
+            p_plots = (plot_bugs + SHRINKAGE * p_plots) / (total - bugs + SHRINKAGE)
+        return p_bug, p_plots
+
+    def sample_time(self, rng: random.Random, kind: str, buggy: bool) -> float:
+        times = self._lookup(self.times, _backoff(self.stage, kind, buggy)) or [0.0]
+        return rng.choice(times) + self.overhead_s
+
+    def sample_score(self, rng: random.Random, kind: str, base: float | None) -> float:
+        """Score of a new good node, given the score of its good ancestor (if any)."""
+        if base is None:
+            scores = self._lookup(self.fresh_scores, _backoff(self.stage, kind))
+            return rng.choice(scores) if scores else 0.0
+        gains = self._lookup(self.gains, _backoff(self.stage, kind))
+        return base + (rng.choice(gains) if gains else 0.0)
+
+    def mean_time(self) -> float:
+        return (
+            statistics.mean(self._lookup(self.times, [(self.stage,), ()]) or [0.0])
+            + self.overhead_s
+        )
+
+    def summary(self) -> dict:
+        """Model of the replayed stage, per node kind."""
+        kinds = {}
+        for kind in KINDS:
+            bugs, plot_bugs, total = self.outcomes.get((self.stage, kind), (0, 0, 0))
+            times = self.times.get((self.stage, kind, False), []) + self.times.get(
+                (self.stage, kind, True), []
+            )
+            gains = self.gains.get((self.stage, kind), [])
+            kinds[kind] = {
+                "nodes": total,
+                "bug_rate": bugs / total if total else None,
+                "bug_rate_by_depth": {
+                    depth: round(self.outcome_probs(kind, depth)[0], 3)
+                    for depth in range(MAX_DEPTH_BUCKET + 1)
+                    if self.outcomes.get((self.stage, kind, depth))
+                },
+                "plots_bug_rate": plot_bugs / (total - bugs) if total > bugs else None,
+                "time_s": _distribution(times),
+                "fresh_score": _distribution(
+                    self.fresh_scores.get((self.stage, kind), [])
+                ),
+                "gain": _distribution(gains),
+            }
+        return {
+            "stage": self.stage,
+            "overhead_s": self.overhead_s,
+            "nodes_all_stages": self.nodes,
+            "kinds": kinds,
+        }
+
+
+def _score_of(node: Node, reference: Node | None) -> float | None:
+    """Relative improvement of the node's metric over the reference's (the node's own metric if None)."""
+    metric = node.metric
+    if metric is None or metric.value is None or isinstance(metric, WorstMetricValue):
+        return None
+    value = metric.get_mean_value()
+    if math.isnan(value):
+        return None
+    if reference is None:
+        return value
+    ref = reference.metric.get_mean_value()
+    scale = abs(ref) or 1.0
+    return (value - ref) / scale if metric._should_maximize() else (ref - value) / scale
+
+
+def _distribution(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": statistics.mean(values),
+        "p10": _percentile(values, 0.1),
+        "p50": _percentile(values, 0.5),
+        "p90": _percentile(values, 0.9),
+    }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Trial:
+    """One simulated search: the journal, the clocks and the progress points."""
+
+    def __init__(
+        self, model: EmpiricalModel, policy: SelectionPolicy, rng: random.Random
+    ):
+        self.model = model
+        self.policy = policy
+        self.rng = rng
+        self.journal = Journal()
+        self.wall = 0.0
+        self.compute = 0.0
+        self.best: float | None = None
+        self.first_good: tuple[float, float] | None = None
+        # (wall, compute, best) whenever the best metric changed
+        self.points: list[tuple[float, float, float]] = []
+
+    def start(
+        self, parent: Node | None
+    ) -> tuple[Node | None, bool, bool, float, float]:
+        """Draw the outcome of expanding `parent`: (parent, buggy, plots buggy, score, time)."""
+        kind = (
+            "draft" if parent is None else ("debug" if parent.is_buggy else "improve")
+        )
+        p_bug, p_plots = self.model.outcome_probs(kind, _depth(kind, parent))
+        buggy = self.rng.random() < p_bug
+        plots_buggy = not buggy and self.rng.random() < p_plots
+        score = 0.0
+        if not buggy:
+            ancestor = _nearest_good(parent)
+            base = ancestor.metric.value - 1.0 if ancestor is not None else None
+            score = self.model.sample_score(self.rng, kind, base)
+        return (
+            parent,
+            buggy,
+            plots_buggy,
+            score,
+            self.model.sample_time(self.rng, kind, buggy),
+        )
+
+    def finish(self, outcome) -> None:
+        parent, buggy, plots_buggy, score, time = outcome
+        self.compute += time
+        node = Node(
+            code="",
+            parent=parent,
+            is_buggy=buggy,
+            is_buggy_plots=plots_buggy,
+            # on the scale of the real metrics (1 is the first good node), which the
+            # policies compare by relative change
+            metric=(
+                WorstMetricValue() if buggy else MetricValue(1.0 + score, maximize=True)
+            ),
+            exec_time=time - self.model.overhead_s,
+        )
+        self.journal.append(node)
+        if _is_good(node) and (self.best is None or score > self.best):
+            self.best = score
+            self.first_good = self.first_good or (self.wall, self.compute)
+            self.points.append((self.wall, self.compute, score))
+
+    def run_batch(self, num_workers: int, budget: float) -> None:
+        """Select num_workers nodes per step and wait for all of them."""
+        while self.compute < budget:
+            outcomes = [
+                self.start(p) for p in self.policy.select(self.journal, num_workers)
+            ]
+            self.wall += max(o[-1] for o in outcomes)
+            for outcome in outcomes:
+                self.finish(outcome)
+
+    def run_steady(self, num_workers: int, budget: float) -> None:
+        """Refill a worker as soon as its node finished."""
+        running: list[tuple[float, int, tuple]] = []
+        ids = itertools.count()
+        while self.compute < budget:
+            free = num_workers - len(running)
+            for parent in (self.policy.select(self.journal, free) if free else []):
+                outcome = self.start(parent)
+                heapq.heappush(running, (self.wall + outcome[-1], next(ids), outcome))
+            self.wall, _, outcome = heapq.heappop(running)
+            self.finish(outcome)
+
+
+def simulate(model: EmpiricalModel, config: dict, args) -> dict:
+    search = SearchConfig(
+        num_drafts=config["num_drafts"],
+        debug_prob=config["debug_prob"],
+        max_debug_depth=config["max_debug_depth"],
+        policy=config["policy"],
+        bandit=BanditConfig(
+            method=config.get("bandit_method") or "thompson",
+            overhead_s=args.overhead_s,
+        ),
+    )
+    budget = args.budget_hours * 3600
+    first_good, curves, wall = [], [], 0.0
+    for trial_id in range(args.trials):
+        # the same random numbers for every configuration
+        rng = random.Random(args.seed + trial_id)
+        policy = make_policy(search, use_val_metric_only=True, rng=rng)
+        trial = Trial(model, policy, rng)
+        if args.scheduling == "steady":
+            trial.run_steady(config["num_workers"], budget)
+        else:
+            trial.run_batch(config["num_workers"], budget)
+        first_good.append(trial.first_good)
+        curves.append(trial.points)
+        wall = max(wall, trial.wall)
+
+    found = [f for f in first_good if f is not None]
+    return {
+        "config": config,
+        "time_to_first_good": {
+            "found_share": len(found) / args.trials,
+            "wall_s": _distribution([f[0] for f in found]),
+            "compute_s": _distribution([f[1] for f in found]),
+        },
+        "best_vs_compute": _curve(curves, budget, args.points, axis=1),
+        "best_vs_wall": _curve(curves, wall, args.points, axis=0),
+    }
+
+
+def _curve(curves: list[list[tuple]], end: float, points: int, axis: int) -> dict:
+    """Mean best score (over the trials that have one) and the share of such trials, at `points` times up to `end`."""
+    grid = [end * (i + 1) / points for i in range(points)]
+    best, found = [], []
+    for x in grid:
+        values = [
+            next((p[2] for p in reversed(points) if p[axis] <= x), None)
+            for points in curves
+        ]
+        values = [v for v in values if v is not None]
+        best.append(statistics.mean(values) if values else None)
+        found.append(len(values) / len(curves))
+    key = "wall_h" if axis == 0 else "compute_h"
+    return {key: [x / 3600 for x in grid], "best": best, "found_share": found}
+
+
+def plot(results: list[dict], path: str) -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(12, 4.5))
+    for result in results:
+        label = ", ".join(f"{k}={v}" for k, v in result["config"].items())
+        for ax, (name, x) in zip(
+            axes, (("best_vs_compute", "compute_h"), ("best_vs_wall", "wall_h"))
+        ):
+            curve = result[name]
+            ax.plot(curve[x], curve["best"], label=label)
+            ax.set_xlabel(x.replace("_h", " hours"))
+    axes[0].set_ylabel("best metric (relative to first good node)")
+    axes[1].legend(fontsize="x-small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "journals", nargs="+", help="journal.json files or run log directories"
+    )
+    parser.add_argument(
+        "--stage", default="1", help="stage whose statistics are replayed"
+    )
+    parser.add_argument("--debug-prob", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--num-drafts", type=int, nargs="+", default=[3])
+    parser.add_argument("--max-debug-depth", type=int, nargs="+", default=[3])
+    parser.add_argument("--num-workers", type=int, nargs="+", default=[4])
+    parser.add_argument(
+        "--policy", nargs="+", choices=("default", "bandit"), default=["default"]
+    )
+    parser.add_argument(
+        "--bandit-method", nargs="+", choices=("thompson", "ucb"), default=["thompson"]
+    )
+    parser.add_argument("--scheduling", choices=("batch", "steady"), default="batch")
+    parser.add_argument(
+        "--overhead-s",
+        type=float,
+        default=0.0,
+        help="per-node time not recorded in the journal",
+    )
+    parser.add_argument(
+        "--budget-hours",
+        type=float,
+        help="compute budget per trial (worker-hours), defaults to 60 average nodes",
+    )
+    parser.add_argument("--points", type=int, default=20, help="points per curve")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the results to this file")
+    parser.add_argument("--plot", help="plot the best-metric curves to this image")
+    args = parser.parse_args()
+    # the agent's log goes to stdout, next to the results
+    logging.getLogger("ai-scientist").setLevel(logging.ERROR)
+
+    model = EmpiricalModel(load_journals(args.journals), args.stage, args.overhead_s)
+    if model.mean_time() <= 0:
+        parser.error("the journals record no execution times, pass --overhead-s")
+    if args.budget_hours is None:
+        args.budget_hours = 60 * model.mean_time() / 3600
+    policies = [
+        (
+            {"policy": "bandit", "bandit_method": method}
+            if policy == "bandit"
+            else {"policy": policy}
+        )
+        for policy in args.policy
+        for method in (args.bandit_method if policy == "bandit" else [None])
+    ]
+    configs = [
+        policy
+        | dict(
+            zip(("debug_prob", "num_drafts", "max_debug_depth", "num_workers"), values)
+        )
+        for policy in policies
+        for values in itertools.product(
+            args.debug_prob, args.num_drafts, args.max_debug_depth, args.num_workers
+        )
+    ]
+    results = [simulate(model, config, args) for config in configs]
+    output = {
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "plot")},
+        "model": model.summary(),
+        "results": results,
+    }
+    text = json.dumps(output, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    if args.plot:
+        plot(results, args.plot)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
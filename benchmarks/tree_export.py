@@ -0,0 +1,90 @@
+"""
+Per-step time of the tree visualization export as the journal grows.
+
+Grows a journal of realistic nodes (see `node_codec.py`) one node per step and,
+like `save_run`, exports it after every step with `tree_export.generate`. Reports
+the mean export time per step over windows of the run, next to a full export
+that inlines every node's details into tree_data.json and tree_plot.html (the
+export before it became incremental), and how often the cached layout was reused.
+
+Usage:
+    python benchmarks/tree_export.py --nodes 1000 --window 100
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ai_scientist.treesearch.journal import Journal  # noqa: E402
+from ai_scientist.treesearch.utils import tree_export  # noqa: E402
+from node_codec import make_node  # noqa: E402
+
+
+def full_export(cfg, journal: Journal, out_path: Path) -> None:
+    tree_struct = tree_export.cfg_to_tree_struct(cfg, journal, out_path)
+    with open(out_path.parent / "tree_data.json", "w") as f:
+        json.dump(tree_struct, f)
+    with open(out_path, "w") as f:
+        f.write(tree_export.generate_html(json.dumps(tree_struct)))
+
+
+def run(num_nodes: int, window: int, output_lines: int, export) -> tuple[list[float], dict]:
+    """Mean export time (ms) per window of steps."""
+    rng = random.Random(0)
+    cfg = SimpleNamespace(exp_name="bench")
+    journal = Journal()
+    times = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        out_path = Path(log_dir) / "stage_1_bench" / "tree_plot.html"
+        out_path.parent.mkdir()
+        for i in range(num_nodes):
+            # mostly children of recent nodes, like the search expanding good nodes
+            parent = rng.choice(journal.nodes[-20:]) if i >= 3 else None
+            journal.append(make_node(i, parent, output_lines, rng))
+            start = time.perf_counter()
+            export(cfg, journal, out_path)
+            times.append(time.perf_counter() - start)
+        stats = json.loads((out_path.parent / "tree_data.json").read_text()).get(
+            "export_stats"
+        )
+    means = [
+        sum(times[i : i + window]) / len(times[i : i + window]) * 1e3
+        for i in range(0, num_nodes, window)
+    ]
+    return means, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--output-lines", type=int, default=400)
+    parser.add_argument(
+        "--skip-full", action="store_true", help="only run the incremental export"
+    )
+    args = parser.parse_args()
+
+    incremental, stats = run(args.nodes, args.window, args.output_lines, tree_export.generate)
+    results = {
+        "nodes": args.nodes,
+        "window": args.window,
+        "incremental_ms_per_step": incremental,
+        "export_stats": stats,
+    }
+    if not args.skip_full:
+        results["full_ms_per_step"], _ = run(
+            args.nodes, args.window, args.output_lines, full_export
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,12 @@ from ai_scientist.perform_icbinb_writeup import (
 )
 from ai_scientist.perform_llm_review import perform_review, load_paper
 from ai_scientist.perform_vlm_review import perform_imgs_cap_ref_review
-from ai_scientist.utils.token_tracker import token_tracker
+from ai_scientist.utils import llm_cache, llm_clients, rate_limiter
+from ai_scientist.utils.token_tracker import (
+    configure_telemetry,
+    set_stage,
+    token_tracker,
+)
 
 
 def print_time():
@@ -37,6 +42,20 @@ def save_token_tracker(idea_dir):
         json.dump(token_tracker.get_summary(), f)
     with open(osp.join(idea_dir, "token_tracker_interactions.json"), "w") as f:
         json.dump(token_tracker.get_interactions(), f)
+    # by stage and call site, over the tree search workers too
+    with open(osp.join(idea_dir, "token_tracker_aggregates.json"), "w") as f:
+        json.dump(token_tracker.get_aggregates(), f, indent=2)
+    cache = llm_cache.get_cache()
+    if cache is not None:
+        with open(osp.join(idea_dir, "llm_cache_stats.json"), "w") as f:
+            json.dump(cache.stats(), f)
+    limiter = rate_limiter.get_limiter()
+    if limiter is not None:
+        with open(osp.join(idea_dir, "rate_limiter_stats.json"), "w") as f:
+            json.dump(limiter.stats(), f)
+    # connection pools of this process (writeup, review, ...)
+    with open(osp.join(idea_dir, "llm_client_stats.json"), "w") as f:
+        json.dump(llm_clients.stats(), f)
 
 
 def parse_arguments():
@@ -122,6 +141,36 @@ def parse_arguments():
         action="store_true",
         help="If set, skip the review process",
     )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        metavar="LOG_DIR",
+        help="Log directory of an interrupted run (<idea_dir>/logs/0-run) to continue "
+        "from its journal log, in the same idea directory",
+    )
+    parser.add_argument(
+        "--llm_cache",
+        type=str,
+        default=None,
+        choices=llm_cache.MODES,
+        help="LLM response cache mode: record responses, replay a recorded run offline, or off "
+        f"(defaults to ${llm_cache.ENV_MODE}, or off)",
+    )
+    parser.add_argument(
+        "--llm_cache_dir",
+        type=str,
+        default=None,
+        help=f"Directory of the LLM response cache (defaults to {llm_cache.DEFAULT_DIR})",
+    )
+    parser.add_argument(
+        "--rate_limits",
+        type=str,
+        default=None,
+        help="Host-wide LLM rate limits shared by all processes, e.g. "
+        '"gpt-4o*=500:300000,claude-*=50:40000" (model pattern=requests/min:tokens/min, '
+        f"defaults to ${rate_limiter.ENV_LIMITS})",
+    )
     return parser.parse_args()
 
 
@@ -177,6 +226,21 @@ if __name__ == "__main__":
     args = parse_arguments()
     os.environ["AI_SCIENTIST_ROOT"] = os.path.dirname(os.path.abspath(__file__))
     print(f"Set AI_SCIENTIST_ROOT to {os.environ['AI_SCIENTIST_ROOT']}")
+    if args.llm_cache is not None or args.llm_cache_dir is not None:
+        llm_cache.configure(
+            mode=args.llm_cache or os.environ.get(llm_cache.ENV_MODE, "off"),
+            cache_dir=args.llm_cache_dir or os.environ.get(llm_cache.ENV_DIR),
+            ttl_hours=os.environ.get(llm_cache.ENV_TTL_HOURS),
+            max_size_mb=os.environ.get(llm_cache.ENV_MAX_SIZE_MB),
+        )
+    # sets the run id shared by the worker processes, see utils/llm_cache.py
+    llm_cache.get_cache()
+    if args.rate_limits is not None or os.environ.get(rate_limiter.ENV_LIMITS):
+        # (also resets the statistics of the shared buckets for this run)
+        rate_limiter.configure(
+            args.rate_limits or os.environ[rate_limiter.ENV_LIMITS],
+            os.environ.get(rate_limiter.ENV_DIR),
+        )
 
     # Check available GPUs and adjust parallel processes if necessary
     available_gpus = get_available_gpus()
@@ -188,10 +252,15 @@ if __name__ == "__main__":
 
     idea = ideas[args.idea_idx]
 
-    date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    idea_dir = f"experiments/{date}_{idea['Name']}_attempt_{args.attempt_id}"
+    if args.resume is not None:
+        # <idea_dir>/logs/<run>
+        idea_dir = osp.dirname(osp.dirname(osp.abspath(args.resume)))
+    else:
+        date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        idea_dir = f"experiments/{date}_{idea['Name']}_attempt_{args.attempt_id}"
     print(f"Results will be saved in {idea_dir}")
     os.makedirs(idea_dir, exist_ok=True)
+    configure_telemetry(osp.join(idea_dir, "llm_telemetry"))
 
     # Convert idea json to markdown file
     idea_path_md = osp.join(idea_dir, "idea.md")
@@ -247,7 +316,8 @@ if __name__ == "__main__":
         idea_path_json,
     )
 
-    perform_experiments_bfts(idea_config_path)
+    set_stage("experiments")
+    perform_experiments_bfts(idea_config_path, resume=args.resume)
     experiment_results_dir = osp.join(idea_dir, "logs/0-run/experiment_results")
     if os.path.exists(experiment_results_dir):
         shutil.copytree(
@@ -256,6 +326,7 @@ if __name__ == "__main__":
             dirs_exist_ok=True,
         )
 
+    set_stage("plot_aggregation")
     aggregate_plots(base_folder=idea_dir, model=args.model_agg_plots)
 
     shutil.rmtree(osp.join(idea_dir, "experiment_results"))
@@ -264,11 +335,13 @@ if __name__ == "__main__":
 
     if not args.skip_writeup:
         writeup_success = False
+        set_stage("citations")
         citations_text = gather_citations(
             idea_dir,
             num_cite_rounds=args.num_cite_rounds,
             small_model=args.model_citation,
         )
+        set_stage("writeup")
         for attempt in range(args.writeup_retries):
             print(f"Writeup attempt {attempt+1} of {args.writeup_retries}")
             if args.writeup_type == "normal":
@@ -295,6 +368,7 @@ if __name__ == "__main__":
 
     if not args.skip_review and not args.skip_writeup:
         # Perform paper review if the paper exists
+        set_stage("review")
         pdf_path = find_pdf_path_for_review(idea_dir)
         if os.path.exists(pdf_path):
             print("Paper found at: ", pdf_path)
@@ -310,6 +384,8 @@ if __name__ == "__main__":
                 json.dump(review_img_cap_ref, f, indent=4)
             print("Paper review completed.")
 
+    save_token_tracker(idea_dir)
+
     print("Start cleaning up processes")
     # Kill all mp and torch processes associated with this experiment
     import psutil